@@ -1,17 +1,49 @@
 from __future__ import annotations
 
+import importlib
 from typing import Optional
-from datetime import datetime
-from apikeyper.database import APIKeyDB, DEFAULT_DB_FILEPATH
-from apikeyper.__about__ import __DEFAULT_DATA_DIR__ as DEFAULT_DATA_DIR
-from pathlib import Path
+from apikeyper.telemetry.metrics import METRICS
 import os
 
 
 """
 This module defines a class, APIKeyPER, as a wrapper for APIKeyDB to manage API keys. 
+
+Importing the package is kept cheap for short-lived processes: the database layer (sqlite3 and the logging engine),
+the data directory lookup and the subpackages are only imported when they are first used. `APIKeyDB`,
+`DEFAULT_DB_FILEPATH`, `DEFAULT_DATA_DIR` and the subpackages are still available as attributes of the package; they
+are imported on first access (see `__getattr__`).
 """
 
+# The attributes imported on first access, and the module each one comes from.
+_LAZY_ATTRIBUTES = {
+    'APIKeyDB': ('apikeyper.database', 'APIKeyDB'),
+    'DEFAULT_DB_FILEPATH': ('apikeyper.database', 'DEFAULT_DB_FILEPATH'),
+    'DEFAULT_DATA_DIR': ('apikeyper.__about__', '__DEFAULT_DATA_DIR__'),
+}
+
+_LAZY_SUBMODULES = ('config', 'crypt', 'database', 'log_engine', 'telemetry', 'ui', 'utils')
+
+
+def __getattr__(name: str):
+    """
+    Import the lazy attributes and subpackages of the package on first access (PEP 562).
+    """
+    if name in _LAZY_ATTRIBUTES:
+        module, attribute = _LAZY_ATTRIBUTES[name]
+        value = getattr(importlib.import_module(module), attribute)
+    elif name in _LAZY_SUBMODULES:
+        value = importlib.import_module(f'{__name__}.{name}')
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY_ATTRIBUTES, *_LAZY_SUBMODULES})
+
 
 class APIKeyPER:
     """
@@ -21,21 +53,27 @@ class APIKeyPER:
         db (APIKeyDB): An instance of the APIKeyDB class for managing API keys.
     """
 
-    def __init__(self, db_file_path: Optional[str] = None) -> None:
+    def __init__(self, db_file_path: Optional[str] = None, check_same_thread: bool = True) -> None:
         """
         Initializes the APIKeyPER with a APIKeyDB instance connected to the specified SQLite database file.
 
         Parameters:
             db_file_path: The path to the SQLite database file. If None, uses the unified default path.
+            check_same_thread: Whether only the creating thread may use the database connection. Pass False only if
+                access is serialized by the caller.
         """
+        from pathlib import Path
+        from apikeyper.database import APIKeyDB, DEFAULT_DB_FILEPATH
+
         if db_file_path is None:
             db_file_path = DEFAULT_DB_FILEPATH
 
         if not Path(db_file_path).parent.exists():
             os.makedirs(Path(db_file_path).parent)
 
-        self.db = APIKeyDB(db_file_path)
+        self.db = APIKeyDB(db_file_path, check_same_thread=check_same_thread)
 
+    @METRICS.operation('api', 'add_key')
     def add_key(self, service: str, api_key: str, key_name: str = 'default', status: str = 'active', added: Optional[str] = None) -> None:
         """
         Add a key to database associated with a service.
@@ -61,6 +99,7 @@ class APIKeyPER:
         
         self.db.add_key(service, key_name, api_key, added, status)
 
+    @METRICS.operation('api', 'get_key')
     def get_key(self, service: str) -> Optional[str]:
         """
         Retrieves an API key for a specific service from the database.
@@ -73,6 +112,20 @@ class APIKeyPER:
         """
         return self.db.get_key(service)
 
+    @METRICS.operation('api', 'get_keys')
+    def get_keys(self, services) -> dict:
+        """
+        Retrieves the API keys of several services in one batched query.
+
+        Parameters:
+            services: The services to retrieve the keys for.
+
+        Returns:
+            A dict with the API key row of each service that has one.
+        """
+        return self.db.get_keys(services)
+
+    @METRICS.operation('api', 'delete_key')
     def delete_key(self, service: str, key_name: Optional[str] = None) -> None:
         """
         Deletes an API key for a specific service from the database.
@@ -83,6 +136,7 @@ class APIKeyPER:
         """
         self.db.delete_key(service, key_name)
 
+    @METRICS.operation('api', 'list_services')
     def list_services(self) -> list[str]:
         """
         Lists all unique services in the database.
@@ -91,3 +145,32 @@ class APIKeyPER:
             A list of all unique services.
         """
         return self.db.list_services()
+
+
+def warmup(raise_on_missing: bool = False, close_connections: bool = True) -> list[str]:
+    """
+    Load the API keys of every service used with `apikey_required` or `apikey_required_class`, with one batched query
+    per database. Call it at process start, or before forking workers, after the decorated code is imported.
+
+    Parameters:
+        raise_on_missing: Raise `MissingAPIKeyError` if any service has no key.
+        close_connections: Close the database connections afterward, keeping the loaded keys.
+
+    Returns:
+        The services that have no key.
+    """
+    from apikeyper.utils.registry import warmup as warmup_registry
+
+    return warmup_registry(raise_on_missing=raise_on_missing, close_connections=close_connections)
+
+
+def stats() -> dict:
+    """
+    Read the operation metrics of the process: latency histograms and error counts of the database, API, encryption
+    and decorator operations. They are only recorded while metrics are enabled (`APIKEYPER_METRICS=1`, or
+    `apikeyper.telemetry.metrics.METRICS.enable()`).
+
+    Returns:
+        For each metric name, its type, help text and samples (see `MetricsRegistry.stats`).
+    """
+    return METRICS.stats()
@@ -7,13 +7,16 @@ File:
 """
 from argparse import ArgumentParser
 
+from apikeyper.telemetry.profiling import add_profile_arguments
+
 
 class Arguments(ArgumentParser):
     """
     A custom ArgumentParser for managing API keys associated with different services.
 
     Subclasses ArgumentParser to provide methods for parsing command line arguments
-    related to managing API keys.
+    related to managing API keys. Each command takes the `--profile` options, which profile it (see
+    `apikeyper.telemetry.profiling.add_profile_arguments`).
 
     Properties:
         parsed:
@@ -22,7 +25,7 @@ class Arguments(ArgumentParser):
     def __init__(self, *args, **kwargs):
         super().__init__(description='APIKeyPER - API Key Personal Encrypted Reliquary')
         self.__parsed = None
-        subparsers = self.add_subparsers(dest='command')
+        subparsers = self.add_subparsers(dest='command', parser_class=ArgumentParser)
 
         add_parser = subparsers.add_parser('add')
         add_parser.add_argument(
@@ -36,15 +39,16 @@ class Arguments(ArgumentParser):
             type=str,
             help='API key for the service.'
         )
+        add_profile_arguments(add_parser)
 
 
 
 
 
 
-    def parse(self, force=False):
+    def parse(self, args=None, force=False):
         if (self.__parsed and force) or not self.__parsed:
-            self.__parsed = self.parse_args()
+            self.__parsed = self.parse_args(args)
         return self.parsed
 
     @property
@@ -62,3 +66,6 @@ Permission is hereby granted, free of charge, to any person obtaining a copy of
 The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
 
 THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+
+ARGUMENTS = Arguments()
@@ -10,27 +10,58 @@ import json
 import os
 import shutil
 import importlib
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 
 
 from apikeyper.log_engine import LOG_DEVICE as ROOT_LOGGER
+from apikeyper.telemetry.metrics import METRICS
+from apikeyper.telemetry.profiling import PROFILING
+from apikeyper.telemetry.tracing import TRACING
 
 LOGGER = ROOT_LOGGER.get_child()
 LOG = LOGGER.logger
-LOG.debug(f'Starting {LOG.name}')
+LOG.debug('Starting %s', LOG.name)
 
 
 from apikeyper.crypt.encryption_key import (
     EncryptionKey,
 )  # Assuming EncryptionKey is stored in this module
+from apikeyper.crypt.batch import BatchCrypt, DEFAULT_CHUNK_SIZE
+from apikeyper.crypt import container
+from apikeyper.crypt.container import COMPRESSION_NONE, FORMAT_BINARY, FORMAT_TEXT
+from apikeyper.crypt.envelope import Envelope, DEFAULT_DATA_KEY_CACHE_SIZE
+from apikeyper.crypt.rotation import rotate_file, DEFAULT_ROTATION_BATCH_SIZE
+from apikeyper.crypt.stream import DEFAULT_SEGMENT_SIZE, decrypt_stream, encrypt_stream, stream_length
 
 
 class CryptDB:
     """
     A class that represents an encrypted database. This database supports encryption using Fernet symmetric encryption.
+
+    Each `[name, value]` record is encrypted with its own random data key, and only the data keys are wrapped by the
+    master key (envelope encryption), so rotating the master key re-wraps the small data keys instead of re-encrypting
+    every secret.
+
+    Records are stored in a compact, versioned binary container (see :mod:`apikeyper.crypt.container`), optionally
+    compressed before encryption. Each record is encrypted as a chunked stream of fixed-size segments (see
+    :mod:`apikeyper.crypt.stream`), so the file can be decrypted and parsed record by record with bounded memory, and a
+    single record can be read without decrypting the others. A small index of record offsets, encrypted with its own
+    data key, lets :meth:`get` find a record directly; the full `data` dict is only decrypted when it is first used.
+    Files written by older versions (binary format versions 1 and 2, one record per line, or the whole database as a
+    single JSON token) are still read transparently and are converted on the next save.
     """
 
-    def __init__(self, file_path=None, encryption_key=None):
+    def __init__(
+        self,
+        file_path=None,
+        encryption_key=None,
+        previous_keys=None,
+        data_key_cache_size=DEFAULT_DATA_KEY_CACHE_SIZE,
+        file_format=FORMAT_BINARY,
+        compression=COMPRESSION_NONE,
+        segment_size=DEFAULT_SEGMENT_SIZE,
+        max_workers=None,
+    ):
         """
         Initialize a new CryptDB instance.
 
@@ -39,6 +70,17 @@ class CryptDB:
                 Defaults to None, which will use a default path based on appdirs.
             encryption_key (EncryptionKey, optional): The encryption key used for encrypting and decrypting the database.
                 Defaults to None, which will generate a new key.
+            previous_keys (list[bytes], optional): Older master keys that may still be used for decrypting, e.g. while
+                a key rotation is in progress. New data is always encrypted with `encryption_key`.
+            data_key_cache_size (int, optional): The maximum number of unwrapped data keys kept in memory.
+            file_format (str, optional): The format written on save, 'binary' (default) or the older 'text' format.
+            compression (str, optional): The compression applied to each record before encryption when saving in the
+                binary format: 'none' (default), 'zlib' or 'zstd' (requires the 'zstandard' package).
+            segment_size (int, optional): The plaintext size of each encrypted segment when saving in the binary
+                format. Bounds the memory needed to decrypt a record. Defaults to 64 KiB.
+            max_workers (int, optional): The number of threads that encrypt and decrypt records when saving and
+                loading the binary format (see :class:`BatchCrypt`). Defaults to the number of CPUs; 1 works on the
+                calling thread only.
         """
 
         if file_path is None:
@@ -52,40 +94,327 @@ class CryptDB:
         if encryption_key is None:
             encryption_key = EncryptionKey("file")
 
+        if file_format not in (FORMAT_BINARY, FORMAT_TEXT):
+            raise ValueError(f"Unknown file format: {file_format}")
+        if compression not in container.COMPRESSION_CODES:
+            raise ValueError(f"Unknown compression: {compression}")
+        if segment_size < 1:
+            raise ValueError("segment_size must be at least 1")
+
+        self.file_format = file_format
+        self.compression = compression
+        self.segment_size = segment_size
+        self.max_workers = max_workers
         self.encryption_key = encryption_key
+        self.previous_keys = list(previous_keys or [])
 
-        self.cipher_suite = Fernet(self.encryption_key.key)
+        self.cipher_suite = self.__build_cipher_suite()
+        self.envelope = Envelope(self.cipher_suite, data_key_cache_size)
 
-        # If the encrypted DB file exists, load and decrypt it
-        if os.path.exists(self.file_path):
-            with open(self.file_path, "rb") as file:
-                encrypted_data = file.read()
-            decrypted_data = self.decrypt(encrypted_data)
-            self.data = json.loads(decrypted_data)
-        else:
-            self.data = {}
+        # The wrapped data key of each record, so that saving does not generate and wrap a new one every time.
+        self.__data_keys = {}
 
+        # The record offsets of an indexed file, along with the file size and mtime they were read for.
+        self.__index = None
+
+        # Decrypted on first access; see `data`.
+        self.__data = None
+
+    @property
+    def data(self):
+        """
+        dict: The decrypted database. The encrypted file is only loaded the first time this is accessed, so reading a
+        few records with :meth:`get` never decrypts the whole file.
+        """
+        if self.__data is None:
+            self.__data = self.load() if os.path.exists(self.file_path) else {}
+        return self.__data
+
+    @data.setter
+    def data(self, data):
+        self.__data = data
+
+    @property
+    def keys(self):
+        """
+        list[bytes]: The current master key followed by any previous keys still accepted for decryption.
+        """
+        return [self.encryption_key.key, *self.previous_keys]
+
+    def __build_cipher_suite(self):
+        if not self.previous_keys:
+            return Fernet(self.encryption_key.key)
+
+        return MultiFernet([Fernet(key) for key in self.keys])
+
+    @METRICS.operation('crypt', 'save')
     def save(self):
         """
         Save the current database state to the encrypted file.
-        """
 
-        with open(self.file_path, "wb") as file:
-            encrypted_data = self.encrypt(json.dumps(self.data))
-            file.write(encrypted_data)
+        The new contents are written to a temporary file that then replaces the database file, so readers never see
+        a partially written database. In the binary format, the records are encrypted in parallel by a
+        :class:`BatchCrypt` engine and written in order.
+        """
 
+        with TRACING.span("apikeyper.crypt.save", {"file_path": str(self.file_path)}) as span:
+            span.set_attribute("record_count", len(self.data))
+
+            data_keys = {}
+            offsets = {}
+            temp_path = f"{self.file_path}.tmp"
+
+            binary = self.file_format == FORMAT_BINARY
+
+            with open(temp_path, "wb") as file:
+                if binary:
+                    container.write_header(file, self.compression)
+
+                    records = ((self.__data_keys.get(name), name, value) for name, value in self.data.items())
+                    sealed = self.batch(self.max_workers).seal_records(records, self.compression, self.segment_size)
+                    for name, (wrapped_key, payload) in zip(self.data, sealed):
+                        data_keys[name] = wrapped_key
+                        offsets[name] = file.tell()
+                        container.write_record(file, wrapped_key, (payload,), len(payload))
+                else:
+                    for name, value in self.data.items():
+                        if (wrapped_key := self.__data_keys.get(name)) is None:
+                            wrapped_key = self.envelope.new_data_key()
+
+                        data_keys[name] = wrapped_key
+                        file.write(self.envelope.seal(wrapped_key, json.dumps([name, value])) + b"\n")
+
+                if binary:
+                    index_offset = file.tell()
+                    self.__write_record(file, self.envelope.new_data_key(), container.pack_index(offsets))
+                    container.write_index_offset(file, index_offset)
+
+            os.replace(temp_path, self.file_path)
+            self.__data_keys = data_keys
+            self.__index = None
+
+    def __write_record(self, file, wrapped_key, record):
+        container.write_record(
+            file,
+            wrapped_key,
+            encrypt_stream(self.envelope.data_key(wrapped_key), (record,), self.segment_size),
+            stream_length(len(record), self.segment_size),
+        )
+
+    def __decrypt_payload(self, file, wrapped_key, length):
+        return decrypt_stream(self.envelope.data_key(wrapped_key), file.read, length)
+
+    @METRICS.operation('crypt', 'load')
+    @PROFILING.operation('crypt.load')
     def load(self):
         """
-        Load the database state from the encrypted file.
+        Load the database state from the encrypted file. The records of binary files are decrypted in parallel by a
+        :class:`BatchCrypt` engine.
 
         Returns:
             dict: The decrypted and deserialized database data.
         """
 
+        with TRACING.span("apikeyper.crypt.load", {"file_path": str(self.file_path)}) as span:
+            data = dict(self.__read_records(self.batch(self.max_workers)))
+            span.set_attribute("record_count", len(data))
+            return data
+
+    def iter_records(self):
+        """
+        Decrypt the encrypted file one record at a time.
+
+        Only one record (and, in the binary format, one segment of it) is held in memory at a time, on top of whatever
+        the caller keeps.
+
+        Yields:
+            tuple: The name and value of each record, in file order.
+        """
+
+        return self.__read_records()
+
+    def __read_records(self, batch=None):
+        # With a batch engine, a bounded window of encrypted records is read ahead and decrypted in parallel.
         with open(self.file_path, "rb") as file:
-            encrypted_data = file.read()
-        decrypted_data = self.decrypt(encrypted_data)
-        return json.loads(decrypted_data)
+            if not container.is_container(file):
+                yield from self.__iter_text_records(file)
+                return
+
+            version, compression = container.read_header(file)
+            if version == 1:
+                yield from self.__iter_sealed_records(file, compression)
+                return
+
+            end = container.read_index_offset(file) if version >= container.INDEXED_VERSION else None
+            if batch is not None:
+                payloads = (
+                    (wrapped_key, container.read_payload(file, length))
+                    for wrapped_key, length in container.iter_records(file, end)
+                )
+                for wrapped_key, name, value in batch.open_records(payloads, compression):
+                    self.__data_keys[name] = wrapped_key
+                    yield name, value
+                return
+
+            for wrapped_key, length in container.iter_records(file, end):
+                name, value = container.unpack_record_stream(
+                    self.__decrypt_payload(file, wrapped_key, length), compression
+                )
+                self.__data_keys[name] = wrapped_key
+                yield name, value
+
+    @METRICS.operation('crypt', 'get')
+    def get(self, name, default=None):
+        """
+        Get the value of a single record.
+
+        If `data` has not been loaded yet, only the file's index and the requested record are decrypted.
+
+        Args:
+            name (str): The record name.
+            default (optional): The value returned if there is no such record. Defaults to None.
+
+        Returns:
+            The record value, or `default`.
+        """
+
+        if self.__data is not None:
+            return self.__data.get(name, default)
+
+        if not os.path.exists(self.file_path):
+            return default
+
+        try:
+            return self.read_record(name)
+        except KeyError:
+            return default
+
+    @METRICS.operation('crypt', 'read_record')
+    def read_record(self, name):
+        """
+        Decrypt a single record from the encrypted file without decrypting the values of the others.
+
+        In indexed binary files, the record is located through the index. In binary files without an index, only the
+        first segment of every other record is decrypted to learn its name; the rest of it is skipped.
+
+        Args:
+            name (str): The record name.
+
+        Returns:
+            The record value.
+
+        Raises:
+            KeyError: If there is no record with that name.
+        """
+
+        with open(self.file_path, "rb") as file:
+            version, compression = container.read_header(file) if container.is_container(file) else (None, None)
+
+            if version is not None and version >= container.INDEXED_VERSION:
+                if (offset := self.__read_index(file).get(name)) is None:
+                    raise KeyError(name)
+
+                file.seek(offset)
+                wrapped_key, length = container.read_record_frame(file)
+                record_name, value = container.unpack_record_stream(
+                    self.__decrypt_payload(file, wrapped_key, length), compression
+                )
+                if record_name != name:
+                    raise container.ContainerError(f"Index entry for {name!r} points to {record_name!r}")
+
+                self.__data_keys[name] = wrapped_key
+                return value
+
+            if version is not None and version >= 2:
+                for wrapped_key, length in container.iter_records(file):
+                    segments = self.__decrypt_payload(file, wrapped_key, length)
+                    record_name, kind, value = container.read_record_name(segments)
+                    if record_name == name:
+                        self.__data_keys[name] = wrapped_key
+                        return container.read_record_value(kind, value, segments, compression)
+
+                raise KeyError(name)
+
+        for record_name, value in self.iter_records():
+            if record_name == name:
+                return value
+
+        raise KeyError(name)
+
+    def __read_index(self, file):
+        # The index is cached for as long as the file looks unchanged.
+        stat = os.fstat(file.fileno())
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if self.__index is not None and self.__index[0] == signature:
+            return self.__index[1]
+
+        file.seek(container.read_index_offset(file))
+        wrapped_key, length = container.read_record_frame(file)
+        offsets = container.unpack_index(b"".join(self.__decrypt_payload(file, wrapped_key, length)))
+
+        self.__index = (signature, offsets)
+        return offsets
+
+    def __iter_sealed_records(self, file, compression):
+        # Binary format version 1: each record is a single Fernet token.
+        for sealed in container.iter_sealed(file):
+            wrapped_key, record = self.envelope.open(sealed)
+            name, value = container.unpack_record(record, compression, version=1)
+            self.__data_keys[name] = wrapped_key
+            yield name, value
+
+    def __iter_text_records(self, file):
+        for sealed in (line.strip() for line in file if line.strip()):
+            wrapped_key, record = self.envelope.open(sealed)
+
+            if isinstance(record := json.loads(record), dict):
+                # A file written before records were encrypted individually.
+                yield from record.items()
+                continue
+
+            name, value = record
+            if wrapped_key is not None:
+                self.__data_keys[name] = wrapped_key
+            yield name, value
+
+    @METRICS.operation('crypt', 'rotate_master_key')
+    def rotate_master_key(self, new_key, batch_size=DEFAULT_ROTATION_BATCH_SIZE, progress=None, **kwargs):
+        """
+        Re-wrap the database file's data keys under a new master key.
+
+        The records' data keys are re-wrapped in bounded batches, without exposing any plaintext; the encrypted records
+        themselves are copied over untouched. The original file stays readable until it is atomically replaced, and a
+        journal lets an interrupted rotation to the same key resume where it stopped (see `rotate_file`).
+        Afterwards, this instance uses the new key and keeps the old key(s) as `previous_keys` so that tokens produced
+        before the rotation remain readable.
+
+        Args:
+            new_key (EncryptionKey): The new master key.
+            batch_size (int, optional): The number of records whose data keys are re-wrapped per batch.
+            progress (Callable[[int, int], None], optional): Called with (records done, total records) after each batch.
+            **kwargs: Passed to :class:`BatchCrypt` (e.g. `max_workers`).
+
+        Returns:
+            int: The number of records rotated.
+        """
+
+        old_keys = self.keys
+
+        if os.path.exists(self.file_path):
+            rotated = rotate_file(self.file_path, new_key.key, old_keys, batch_size, progress, **kwargs)
+        else:
+            rotated = 0
+
+        LOG.info('Rotated %d records in %s to a new master key.', rotated, self.file_path)
+
+        self.encryption_key = new_key
+        self.previous_keys = [key for key in old_keys if key != new_key.key]
+        self.cipher_suite = self.__build_cipher_suite()
+        self.envelope = Envelope(self.cipher_suite, self.envelope.cache.maxsize)
+        # The wrapped data keys on disk changed; new ones are generated on the next save.
+        self.__data_keys = {}
+        self.__index = None
+        return rotated
 
     def delete(self):
         """
@@ -105,6 +434,7 @@ class CryptDB:
         shutil.move(self.file_path, new_path)
         self.file_path = new_path
 
+    @METRICS.operation('crypt', 'export')
     def export(self, export_path):
         """
         Export the decrypted database data to a JSON or XML file.
@@ -116,6 +446,7 @@ class CryptDB:
         with open(export_path, "w") as file:
             json.dump(self.data, file, indent=4)
 
+    @METRICS.operation('crypt', 'encrypt')
     def encrypt(self, message):
         """
         Encrypt a message using the Fernet symmetric encryption.
@@ -129,6 +460,7 @@ class CryptDB:
 
         return self.cipher_suite.encrypt(message.encode("utf-8"))
 
+    @METRICS.operation('crypt', 'decrypt')
     def decrypt(self, encrypted_message):
         """
         Decrypt an encrypted message using the Fernet symmetric encryption.
@@ -142,10 +474,58 @@ class CryptDB:
 
         return self.cipher_suite.decrypt(encrypted_message).decode("utf-8")
 
+    def batch(self, max_workers=None, chunk_size=DEFAULT_CHUNK_SIZE, use_processes=False):
+        """
+        Create a batch crypto engine that uses this database's encryption key.
+
+        Args:
+            max_workers (int, optional): The number of workers. Defaults to the number of CPUs.
+            chunk_size (int, optional): The number of messages handed to a worker at once.
+            use_processes (bool, optional): Use a process pool instead of a thread pool. Defaults to False.
+
+        Returns:
+            BatchCrypt: The batch crypto engine.
+        """
+
+        return BatchCrypt(
+            self.keys if self.previous_keys else self.encryption_key.key,
+            max_workers=max_workers,
+            chunk_size=chunk_size,
+            use_processes=use_processes,
+        )
+
+    def encrypt_many(self, messages, **kwargs):
+        """
+        Encrypt many messages in parallel using the Fernet symmetric encryption.
+
+        Args:
+            messages (Iterable[str]): The messages to be encrypted.
+            **kwargs: Passed to :meth:`batch`.
+
+        Returns:
+            Iterator[bytes]: The encrypted messages, in input order.
+        """
+
+        return self.batch(**kwargs).encrypt_many(messages)
+
+    def decrypt_many(self, encrypted_messages, **kwargs):
+        """
+        Decrypt many encrypted messages in parallel using the Fernet symmetric encryption.
+
+        Args:
+            encrypted_messages (Iterable[bytes]): The encrypted messages to be decrypted.
+            **kwargs: Passed to :meth:`batch`.
+
+        Returns:
+            Iterator[str]: The decrypted messages, in input order.
+        """
+
+        return self.batch(**kwargs).decrypt_many(encrypted_messages)
+
 
 # Usage:
 # db = CryptDB("encrypted_path.db")
-# data = db.load()
+# value = db.get("service")
 # db.data["new_key"] = "new_value"
 # db.save()
 # db.export("exported_data.json")
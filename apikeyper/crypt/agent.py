@@ -0,0 +1,359 @@
+"""
+Project: APIKeyPER
+Author: Inspyre Softworks - https://inspyre.tech
+Created: 10/19/2026
+File:
+  Name: agent.py
+  Filepath: apikeyper/crypt
+
+This module implements a local key agent, in the spirit of `ssh-agent`. The agent loads (unlocks) the master key once
+and serves it, along with encrypt/decrypt requests, to other processes of the same user over a Unix socket. Short-lived
+processes then skip the key file, keyring, SFTP server or KDF entirely::
+
+    python -m apikeyper.crypt.agent start --storage password --detach
+    python -m apikeyper.crypt.agent status
+    python -m apikeyper.crypt.agent stop
+
+Clients use the 'agent' storage method of `EncryptionKey`. The socket is created with mode 0600 in a directory of its
+own (`agent/` in the data directory, by default) with mode 0700; the agent refuses to start in a directory that other
+users own or can reach. Where the platform supports it, connections from other users are refused. The agent exits
+after `idle_timeout` seconds without a request.
+
+The protocol is one JSON request and one JSON response per connection, each on a single line.
+"""
+import base64
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+from typing import Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from apikeyper.__about__ import __DEFAULT_DATA_DIR__ as DEFAULT_DATA_DIR
+from apikeyper.crypt.backends import READ, KeyBackend
+
+
+AGENT_SOCKET_ENV = "APIKEYPER_AGENT_SOCK"
+DEFAULT_AGENT_SOCKET = os.path.join(DEFAULT_DATA_DIR, 'agent', 'agent.sock')
+DEFAULT_IDLE_TIMEOUT = 15 * 60
+DEFAULT_CLIENT_TIMEOUT = 5
+DEFAULT_START_TIMEOUT = 10
+
+MAX_REQUEST_SIZE = 1024 * 1024
+
+
+class AgentError(RuntimeError):
+    """
+    Raised when the key agent cannot be reached or refuses a request.
+    """
+
+
+def default_socket_path() -> str:
+    """
+    Get the agent socket path: `$APIKEYPER_AGENT_SOCK` if set, else `agent.sock` in the data directory.
+    """
+    return os.environ.get(AGENT_SOCKET_ENV) or DEFAULT_AGENT_SOCKET
+
+
+def _peer_uid(connection):
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+
+    credentials = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", credentials)[1]
+
+
+class _AgentHandler(socketserver.StreamRequestHandler):
+    # Requests are tiny and handled one at a time; a stalled client must not hold up the others for long.
+    timeout = DEFAULT_CLIENT_TIMEOUT
+
+    def handle(self):
+        peer_uid = _peer_uid(self.connection)
+        if peer_uid is not None and peer_uid != os.getuid():
+            self._respond({"ok": False, "error": "permission denied"})
+            return
+
+        try:
+            request = json.loads(self.rfile.readline(MAX_REQUEST_SIZE))
+            response = self.server.agent.handle(request)
+        except (OSError, ValueError, KeyError, TypeError, InvalidToken) as e:
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+        self._respond(response)
+
+    def _respond(self, response):
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class _AgentServer(socketserver.UnixStreamServer):
+
+    def __init__(self, agent, socket_path):
+        self.agent = agent
+        self.idle = False
+        super().__init__(socket_path, _AgentHandler)
+
+    def server_bind(self):
+        # Never let the socket exist, even briefly, with permissions wider than 0600.
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+
+    def handle_timeout(self):
+        self.idle = True
+
+
+class KeyAgent:
+    """
+    Serves a master key to local client processes over a Unix socket.
+
+    Attributes:
+        socket_path (str): The path of the agent's Unix socket.
+        idle_timeout (float): Seconds without a request after which the agent exits. None disables the timeout.
+    """
+
+    def __init__(self, key: bytes, socket_path: Optional[str] = None, idle_timeout: Optional[float] = DEFAULT_IDLE_TIMEOUT):
+        """
+        Args:
+            key (bytes): The unlocked master key.
+            socket_path (str, optional): The path of the Unix socket. Defaults to :func:`default_socket_path`.
+            idle_timeout (float, optional): Seconds without a request after which the agent exits. Defaults to 15
+                minutes; None disables the timeout.
+        """
+        self.__key = key
+        self.__cipher = Fernet(key)
+        self.socket_path = socket_path or default_socket_path()
+        self.idle_timeout = idle_timeout
+        self.__stopping = False
+        self.__server = None
+
+    def handle(self, request: dict) -> dict:
+        """
+        Handle a single request.
+
+        Args:
+            request (dict): The request. Its 'op' is one of 'ping', 'key', 'encrypt', 'decrypt' or 'stop'.
+
+        Returns:
+            dict: The response.
+        """
+        op = request["op"]
+
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if op == "key":
+            return {"ok": True, "key": self.__key.decode("utf-8")}
+        if op == "encrypt":
+            token = self.__cipher.encrypt(base64.b64decode(request["data"]))
+            return {"ok": True, "token": token.decode("utf-8")}
+        if op == "decrypt":
+            data = self.__cipher.decrypt(request["token"].encode("utf-8"))
+            return {"ok": True, "data": base64.b64encode(data).decode("utf-8")}
+        if op == "stop":
+            self.__stopping = True
+            return {"ok": True}
+
+        raise ValueError(f"Unknown op: {op}")
+
+    def _prepare_socket(self):
+        directory = os.path.dirname(os.path.abspath(self.socket_path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+        # makedirs leaves an existing directory as it is, and it may be shared: refuse rather than change it.
+        info = os.stat(directory)
+        if info.st_uid != os.getuid():
+            raise AgentError(f"{directory} is not owned by the current user")
+        if (mode := stat.S_IMODE(info.st_mode)) & 0o077:
+            raise AgentError(
+                f"{directory} has mode {mode:04o}, so other users can reach the socket; put the socket in a directory "
+                f"of its own with mode 0700"
+            )
+
+        if os.path.exists(self.socket_path):
+            if AgentClient(self.socket_path).is_running():
+                raise AgentError(f"An agent is already listening on {self.socket_path}")
+            if not stat.S_ISSOCK(os.lstat(self.socket_path).st_mode):
+                raise AgentError(f"{self.socket_path} exists and is not a socket")
+            # A stale socket left behind by an agent that did not exit cleanly.
+            os.remove(self.socket_path)
+
+    def serve(self) -> None:
+        """
+        Listen for requests until stopped or idle for `idle_timeout` seconds. The socket is removed on exit.
+        """
+        self._prepare_socket()
+        self.__server = _AgentServer(self, self.socket_path)
+        self.__server.timeout = self.idle_timeout
+
+        try:
+            os.chmod(self.socket_path, 0o600)
+            while not (self.__stopping or self.__server.idle):
+                self.__server.handle_request()
+        finally:
+            self.__server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+
+class AgentClient:
+    """
+    Talks to a running :class:`KeyAgent`.
+
+    Attributes:
+        socket_path (str): The path of the agent's Unix socket.
+        timeout (float): The socket timeout, in seconds.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = DEFAULT_CLIENT_TIMEOUT):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+
+    def request(self, op: str, **fields) -> dict:
+        """
+        Send a request to the agent.
+
+        Args:
+            op (str): The operation.
+            **fields: The request fields.
+
+        Returns:
+            dict: The response.
+
+        Raises:
+            AgentError: If the agent cannot be reached or the request fails.
+        """
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.settimeout(self.timeout)
+                connection.connect(self.socket_path)
+                connection.sendall(json.dumps({"op": op, **fields}).encode("utf-8") + b"\n")
+                with connection.makefile("rb") as reader:
+                    line = reader.readline(MAX_REQUEST_SIZE)
+        except OSError as e:
+            raise AgentError(f"Could not reach the key agent at {self.socket_path}: {e}") from e
+
+        if not line:
+            raise AgentError("The key agent closed the connection")
+
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise AgentError(response.get("error", "Request failed"))
+        return response
+
+    def is_running(self) -> bool:
+        try:
+            self.request("ping")
+        except AgentError:
+            return False
+        return True
+
+    def get_key(self) -> bytes:
+        return self.request("key")["key"].encode("utf-8")
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self.request("encrypt", data=base64.b64encode(data).decode("utf-8"))["token"].encode("utf-8")
+
+    def decrypt(self, token: bytes) -> bytes:
+        return base64.b64decode(self.request("decrypt", token=token.decode("utf-8"))["data"])
+
+    def stop(self) -> None:
+        self.request("stop")
+
+
+def get_key_from_agent(socket_path: Optional[str] = None) -> bytes:
+    """
+    Retrieve the encryption key from a running key agent.
+
+    Args:
+        socket_path (str, optional): The path of the agent's Unix socket. Defaults to :func:`default_socket_path`.
+
+    Returns:
+        bytes: The encryption key.
+    """
+    return AgentClient(socket_path).get_key()
+
+
+class AgentBackend(KeyBackend):
+    """
+    Gets the key from a running key agent (`agent_socket`).
+    """
+
+    # The agent is itself the in-memory copy; keys from it are not handed to another agent.
+    capabilities = frozenset({READ})
+
+    def load(self, encryption_key):
+        return get_key_from_agent(encryption_key.agent_socket)
+
+
+def main(argv=None):
+    parser = ArgumentParser(description='Run a local agent that serves the unlocked master key.')
+    parser.add_argument('command', choices=['start', 'stop', 'status'])
+    parser.add_argument('--socket', default=None, help='The Unix socket path.')
+    parser.add_argument('--storage', default='file',
+                        help="The storage method the master key is loaded from, or 'stdin' to read the key itself.")
+    parser.add_argument('--key-file', default=None, help="The key file, for the 'file' storage method.")
+    parser.add_argument('--salt-file', default=None, help="The salt file, for the 'password' storage method.")
+    parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help='Seconds without a request after which the agent exits (0 to disable).')
+    parser.add_argument('--detach', action='store_true', help='Unlock the key, then keep serving in the background.')
+    args = parser.parse_args(argv)
+
+    client = AgentClient(args.socket)
+
+    if args.command == 'status':
+        running = client.is_running()
+        print(f'Agent {"running" if running else "not running"} on {client.socket_path}')
+        return running
+
+    if args.command == 'stop':
+        client.stop()
+        return True
+
+    if args.storage == 'stdin':
+        key = sys.stdin.buffer.readline().strip()
+    else:
+        from apikeyper.crypt.backends import BACKENDS, CACHEABLE
+        from apikeyper.crypt.encryption_key import EncryptionKey
+
+        if CACHEABLE not in BACKENDS.capabilities(args.storage):
+            parser.error(f"keys from the {args.storage!r} storage cannot be kept by the agent")
+
+        key = EncryptionKey(args.storage, key_file=args.key_file, salt_file=args.salt_file).key
+
+    if args.detach:
+        # Hand the unlocked key to a background copy of this command through its stdin, never through argv or env.
+        command = [sys.executable, '-m', 'apikeyper.crypt.agent', 'start', '--storage', 'stdin',
+                   '--idle-timeout', str(args.idle_timeout), *(['--socket', args.socket] if args.socket else [])]
+        process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+        process.stdin.write(key + b"\n")
+        process.stdin.close()
+
+        # Only report success once the agent answers on its socket.
+        deadline = time.monotonic() + DEFAULT_START_TIMEOUT
+        while not client.is_running():
+            if (code := process.poll()) is not None:
+                parser.exit(1, f'Agent failed to start on {client.socket_path} (exit code {code})\n')
+            if time.monotonic() > deadline:
+                process.terminate()
+                parser.exit(1, f'Agent did not answer on {client.socket_path} within {DEFAULT_START_TIMEOUT} s\n')
+            time.sleep(0.05)
+
+        print(f'Agent started (pid {process.pid}) on {client.socket_path}')
+        return True
+
+    KeyAgent(key, args.socket, args.idle_timeout or None).serve()
+    return True
+
+
+if __name__ == "__main__":
+    main()
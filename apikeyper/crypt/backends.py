@@ -0,0 +1,219 @@
+"""
+Project: APIKeyPER
+Author: Inspyre Softworks - https://inspyre.tech
+Created: 10/19/2026
+File:
+  Name: backends.py
+  Filepath: apikeyper/crypt
+
+This module holds the registry of key-storage backends used by `EncryptionKey`. A backend is a :class:`KeyBackend`
+subclass registered under a storage-method name. The registry only stores `"module:attribute"` references and imports
+a backend the first time it is used, so backends that are never used (and their dependencies, such as `paramiko` or
+`keyring`) are never imported.
+
+Third-party packages add backends through the `apikeyper.key_backends` entry-point group::
+
+    [project.entry-points."apikeyper.key_backends"]
+    vault = "my_package.vault:VaultBackend"
+
+Each backend can be timed on its own::
+
+    python -m apikeyper.crypt.backends
+    python -m apikeyper.crypt.backends --benchmark file --rounds 20
+"""
+import importlib
+import threading
+import time
+from argparse import ArgumentParser
+from importlib.metadata import entry_points
+from typing import Dict, FrozenSet, List, Union
+
+from apikeyper.telemetry.profiling import add_profile_arguments, run_profiled
+
+
+ENTRY_POINT_GROUP = "apikeyper.key_backends"
+
+READ = "read"
+WRITE = "write"
+CACHEABLE = "cacheable"
+
+BUILTIN_BACKENDS = {
+    "agent": "apikeyper.crypt.agent:AgentBackend",
+    "env": "apikeyper.crypt.encryption_key:EnvBackend",
+    "file": "apikeyper.crypt.encryption_key:FileBackend",
+    "keyring": "apikeyper.crypt.encryption_key:KeyringBackend",
+    "password": "apikeyper.crypt.kdf:PasswordBackend",
+    "sftp": "apikeyper.crypt.sftp:SFTPBackend",
+}
+
+
+class KeyBackend:
+    """
+    Base class for key-storage backends.
+
+    Attributes:
+        name (str): The storage-method name the backend is registered under.
+        capabilities (frozenset): What the backend supports: READ (load a key), WRITE (store a key), and CACHEABLE (a
+            loaded key may be kept in memory, e.g. by the key agent, instead of being loaded again).
+    """
+
+    name: str = None
+    capabilities: FrozenSet[str] = frozenset()
+
+    def load(self, encryption_key) -> bytes:
+        """
+        Load the master key.
+
+        Args:
+            encryption_key (EncryptionKey): The key being loaded, holding the storage settings.
+
+        Returns:
+            bytes: The master key.
+        """
+        raise NotImplementedError(f"The {self.name!r} key storage cannot load keys")
+
+    def store(self, encryption_key, key: bytes) -> None:
+        """
+        Store the master key.
+
+        Args:
+            encryption_key (EncryptionKey): The key holding the storage settings.
+            key (bytes): The master key.
+        """
+        raise NotImplementedError(f"The {self.name!r} key storage cannot store keys")
+
+
+class BackendRegistry:
+    """
+    A registry of key-storage backends, imported lazily.
+    """
+
+    def __init__(self, builtins: Dict[str, str] = None, group: str = ENTRY_POINT_GROUP):
+        """
+        Args:
+            builtins (dict, optional): Backend references by name. Defaults to the built-in backends.
+            group (str, optional): The entry-point group to discover more backends in. None disables discovery.
+        """
+        self.group = group
+        self._targets = dict(BUILTIN_BACKENDS if builtins is None else builtins)
+        self._backends = {}
+        self._discovered = group is None
+        self._lock = threading.Lock()
+
+    def _discover(self):
+        if self._discovered:
+            return
+
+        for entry_point in entry_points(group=self.group):
+            # Explicit registrations win over installed plugins.
+            self._targets.setdefault(entry_point.name, entry_point.value)
+        self._discovered = True
+
+    def register(self, name: str, backend: Union[str, type]) -> None:
+        """
+        Register a backend.
+
+        Args:
+            name (str): The storage-method name.
+            backend (str or type): A `"module:attribute"` reference, or the backend class itself.
+        """
+        with self._lock:
+            self._targets[name] = backend
+            self._backends.pop(name, None)
+
+    def names(self) -> List[str]:
+        """
+        list[str]: The names of all known backends, without importing them.
+        """
+        with self._lock:
+            self._discover()
+            return sorted(self._targets)
+
+    def get(self, name: str) -> KeyBackend:
+        """
+        Get a backend, importing it on first use.
+
+        Args:
+            name (str): The storage-method name.
+
+        Returns:
+            KeyBackend: The backend.
+
+        Raises:
+            ValueError: If no backend is registered under that name.
+        """
+        if (backend := self._backends.get(name)) is not None:
+            return backend
+
+        with self._lock:
+            if name not in self._targets:
+                self._discover()
+            if (target := self._targets.get(name)) is None:
+                raise ValueError(f"Unknown key_storage method: {name}")
+
+            if isinstance(target, str):
+                module, _, attribute = target.partition(":")
+                target = getattr(importlib.import_module(module), attribute)
+
+            backend = self._backends[name] = target()
+            if backend.name is None:
+                backend.name = name
+            return backend
+
+    def capabilities(self, name: str) -> FrozenSet[str]:
+        return self.get(name).capabilities
+
+
+BACKENDS = BackendRegistry()
+
+
+def benchmark_backend(storage_method: str, rounds: int = 10, **key_options) -> dict:
+    """
+    Time key loading with one backend, on its own.
+
+    Args:
+        storage_method (str): The backend name.
+        rounds (int, optional): The number of key loads. Defaults to 10.
+        **key_options: Passed to `EncryptionKey` (e.g. `key_file`).
+
+    Returns:
+        dict: The backend's import time and the best and mean load times, in seconds.
+    """
+    from apikeyper.crypt.encryption_key import EncryptionKey
+
+    registry = BackendRegistry()
+    start = time.perf_counter()
+    registry.get(storage_method)
+    import_seconds = time.perf_counter() - start
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        EncryptionKey(storage_method, backends=registry, **key_options)
+        timings.append(time.perf_counter() - start)
+
+    return {"import": import_seconds, "best": min(timings), "mean": sum(timings) / len(timings)}
+
+
+def main(argv=None):
+    parser = ArgumentParser(description='List key-storage backends and their capabilities, or benchmark one.')
+    parser.add_argument('--benchmark', metavar='NAME', help='Time key loading with the named backend.')
+    parser.add_argument('--rounds', type=int, default=10, help='The number of key loads to time.')
+    parser.add_argument('--key-file', default=None, help="The key file, for the 'file' backend.")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        options = {'key_file': args.key_file} if args.key_file else {}
+        result = run_profiled(args, f'backend-{args.benchmark}', benchmark_backend, args.benchmark, args.rounds, **options)
+        print(f'{args.benchmark}: import {result["import"] * 1000:.2f} ms, '
+              f'load best {result["best"] * 1000:.3f} ms, mean {result["mean"] * 1000:.3f} ms')
+        return result
+
+    for name in BACKENDS.names():
+        print(f'{name:<12}{", ".join(sorted(BACKENDS.capabilities(name)))}')
+    return BACKENDS.names()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Project: APIKeyPER
+Author: Inspyre Softworks - https://inspyre.tech
+Created: 10/19/2026
+File:
+  Name: batch.py
+  Filepath: apikeyper/crypt
+
+This module provides batch encryption and decryption for large sets of secrets. Work is split into chunks and fanned
+out to a thread pool (the `cryptography` primitives release the GIL) or, optionally, a process pool. Results are
+yielded in input order as soon as they are ready, and only a bounded number of chunks are in flight at any time, so
+callers can stream thousands of records without holding every ciphertext in memory.
+
+Besides plain Fernet messages, the engine seals and opens `CryptDB` container records (`seal_records` and
+`open_records`): each worker unwraps or generates a record's data key and encrypts or decrypts the record itself, which
+is what `CryptDB.save` and `CryptDB.load` use.
+
+Usage example::
+
+    batch = BatchCrypt(encryption_key.key)
+    tokens = list(batch.encrypt_many(["secret-1", "secret-2"]))
+    plain = list(batch.decrypt_many(tokens))
+"""
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import chain, islice
+from typing import Iterable, Iterator, Union
+
+from cryptography.fernet import Fernet, MultiFernet
+
+from apikeyper.crypt import container
+from apikeyper.crypt.envelope import rewrap
+from apikeyper.crypt.stream import DEFAULT_SEGMENT_SIZE, decrypt_stream, encrypt_stream
+
+
+DEFAULT_CHUNK_SIZE = 64
+"""The number of messages handed to a worker at once."""
+
+_PROCESS_CIPHER = None
+
+
+def _build_cipher(keys):
+    """
+    Build a Fernet cipher from one key, or a MultiFernet from a list of keys.
+
+    Args:
+        keys (bytes or list[bytes]): The key(s). When a list is given, the first key encrypts and all keys decrypt.
+
+    Returns:
+        Fernet or MultiFernet: The cipher.
+    """
+    if isinstance(keys, (bytes, str)):
+        return Fernet(keys)
+
+    return MultiFernet([Fernet(key) for key in keys])
+
+
+def _encrypt_chunk(cipher_suite, chunk):
+    return [cipher_suite.encrypt(message.encode("utf-8")) for message in chunk]
+
+
+def _decrypt_chunk(cipher_suite, chunk):
+    return [cipher_suite.decrypt(token).decode("utf-8") for token in chunk]
+
+
+def _rotate_chunk(cipher_suite, chunk):
+    return [rewrap(cipher_suite, token) for token in chunk]
+
+
+def _seal_records_chunk(cipher_suite, chunk, compression, segment_size):
+    sealed = []
+    for wrapped_key, name, value in chunk:
+        if wrapped_key is None:
+            data_key = Fernet.generate_key()
+            wrapped_key = cipher_suite.encrypt(data_key)
+        else:
+            data_key = cipher_suite.decrypt(wrapped_key)
+
+        record = container.pack_record(name, value, compression)
+        sealed.append((wrapped_key, b"".join(encrypt_stream(data_key, (record,), segment_size))))
+    return sealed
+
+
+def _open_records_chunk(cipher_suite, chunk, compression):
+    records = []
+    for wrapped_key, payload in chunk:
+        segments = decrypt_stream(cipher_suite.decrypt(wrapped_key), io.BytesIO(payload).read, len(payload))
+        records.append((wrapped_key, *container.unpack_record_stream(segments, compression)))
+    return records
+
+
+def _init_process_worker(keys):
+    """
+    Build the cipher once per worker process, so keys are not pickled along with every chunk.
+    """
+    global _PROCESS_CIPHER
+    _PROCESS_CIPHER = _build_cipher(keys)
+
+
+def _process_encrypt_chunk(chunk):
+    return _encrypt_chunk(_PROCESS_CIPHER, chunk)
+
+
+def _process_decrypt_chunk(chunk):
+    return _decrypt_chunk(_PROCESS_CIPHER, chunk)
+
+
+def _process_rotate_chunk(chunk):
+    return _rotate_chunk(_PROCESS_CIPHER, chunk)
+
+
+def _process_seal_records_chunk(chunk, compression, segment_size):
+    return _seal_records_chunk(_PROCESS_CIPHER, chunk, compression, segment_size)
+
+
+def _process_open_records_chunk(chunk, compression):
+    return _open_records_chunk(_PROCESS_CIPHER, chunk, compression)
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class BatchCrypt:
+    """
+    Encrypts and decrypts many messages in parallel while preserving input order.
+
+    Attributes:
+        keys (bytes or list[bytes]): The Fernet key, or a list of keys for MultiFernet.
+        max_workers (int): The number of workers in the pool.
+        chunk_size (int): The number of messages handed to a worker at once.
+        use_processes (bool): Whether to use a process pool instead of a thread pool.
+    """
+
+    def __init__(
+        self,
+        keys: Union[bytes, list],
+        max_workers: int = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        use_processes: bool = False,
+    ):
+        """
+        Initialize a new BatchCrypt instance.
+
+        Args:
+            keys (bytes or list[bytes]): The Fernet key, or a list of keys. With a list, the first key encrypts and
+                every key is tried when decrypting.
+            max_workers (int, optional): The number of workers. Defaults to the number of CPUs.
+            chunk_size (int, optional): The number of messages handed to a worker at once. Defaults to 64.
+            use_processes (bool, optional): Use a process pool instead of a thread pool. Defaults to False.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        self.keys = keys
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.use_processes = use_processes
+        self.cipher_suite = _build_cipher(keys)
+
+    def encrypt_many(self, messages: Iterable[str]) -> Iterator[bytes]:
+        """
+        Encrypt many messages.
+
+        Args:
+            messages (Iterable[str]): The messages to encrypt. May be a generator.
+
+        Yields:
+            bytes: The encrypted messages, in input order.
+        """
+        return self._run(_encrypt_chunk, _process_encrypt_chunk, messages)
+
+    def decrypt_many(self, tokens: Iterable[bytes]) -> Iterator[str]:
+        """
+        Decrypt many encrypted messages.
+
+        Args:
+            tokens (Iterable[bytes]): The encrypted messages. May be a generator.
+
+        Yields:
+            str: The decrypted messages, in input order.
+        """
+        return self._run(_decrypt_chunk, _process_decrypt_chunk, tokens)
+
+    def rotate_many(self, tokens: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Re-encrypt many encrypted messages under the first key. Requires a list of keys.
+
+        For envelope-sealed records, only the wrapped data key is re-encrypted; the record itself is left as is.
+
+        Args:
+            tokens (Iterable[bytes]): The encrypted messages or sealed records, encrypted under any of the keys. May be
+                a generator.
+
+        Yields:
+            bytes: The re-encrypted messages, in input order.
+        """
+        if not isinstance(self.cipher_suite, MultiFernet):
+            raise TypeError("rotate_many requires a list of keys")
+
+        return self._run(_rotate_chunk, _process_rotate_chunk, tokens)
+
+    def seal_records(
+        self,
+        records: Iterable[tuple],
+        compression: str = container.COMPRESSION_NONE,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+    ) -> Iterator[tuple]:
+        """
+        Encrypt many `CryptDB` container records, each under its own data key, wrapped by the first key.
+
+        Args:
+            records (Iterable[tuple]): The (wrapped data key, name, value) of each record. A record whose wrapped data
+                key is None gets a new data key. May be a generator.
+            compression (str, optional): The compression applied to each record before encryption. Defaults to 'none'.
+            segment_size (int, optional): The plaintext size of each encrypted segment. Defaults to 64 KiB.
+
+        Yields:
+            tuple: The wrapped data key and encrypted payload of each record, in input order, ready for
+                `container.write_record`.
+        """
+        return self._run(
+            partial(_seal_records_chunk, compression=compression, segment_size=segment_size),
+            partial(_process_seal_records_chunk, compression=compression, segment_size=segment_size),
+            records,
+        )
+
+    def open_records(
+        self,
+        payloads: Iterable[tuple],
+        compression: str = container.COMPRESSION_NONE,
+    ) -> Iterator[tuple]:
+        """
+        Decrypt many `CryptDB` container records.
+
+        Args:
+            payloads (Iterable[tuple]): The wrapped data key and encrypted payload of each record. May be a generator.
+            compression (str, optional): The compression the records were written with. Defaults to 'none'.
+
+        Yields:
+            tuple: The wrapped data key, name and value of each record, in input order.
+        """
+        return self._run(
+            partial(_open_records_chunk, compression=compression),
+            partial(_process_open_records_chunk, compression=compression),
+            payloads,
+        )
+
+    def _run(self, thread_func, process_func, items):
+        chunks = _chunked(items, self.chunk_size)
+
+        # A single chunk is not worth starting a pool for.
+        head = list(islice(chunks, 2))
+        chunks = chain(head, chunks)
+
+        if self.max_workers == 1 or len(head) < 2:
+            for chunk in chunks:
+                yield from thread_func(self.cipher_suite, chunk)
+            return
+
+        if self.use_processes:
+            executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_process_worker,
+                initargs=(self.keys,),
+            )
+            func = process_func
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            func = partial(thread_func, self.cipher_suite)
+
+        # Keep a bounded window of chunks in flight so huge inputs are streamed rather than queued up front.
+        max_pending = self.max_workers * 2
+        pending = deque()
+
+        try:
+            for chunk in chunks:
+                pending.append(executor.submit(func, chunk))
+                if len(pending) >= max_pending:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
@@ -0,0 +1,439 @@
+"""
+Project: APIKeyPER
+Author: Inspyre Softworks - https://inspyre.tech
+Created: 10/19/2026
+File:
+  Name: container.py
+  Filepath: apikeyper/crypt
+
+This module implements the versioned binary container used by `CryptDB` files.
+
+Layout::
+
+    header:  magic b"AKPR" | format version (uint8) | compression (uint8)
+    records: wrapped data key length (uint32) | wrapped data key | payload length (uint32) | payload
+
+Wrapped keys are Fernet tokens stored as raw bytes instead of base64 text. The record plaintext is struct-packed rather
+than JSON-encoded::
+
+    name length (uint16) | name | value kind (uint8) | value
+
+so string values, by far the most common, never go through the JSON parser. The value may be compressed with zlib or
+zstd before encryption.
+
+In format version 2 and later, the payload is a chunked stream (see :mod:`apikeyper.crypt.stream`), so a record can be
+decrypted and parsed with bounded memory, and its name can be read from the first segment alone. In version 1, the
+payload is a raw Fernet token and compression covers the whole plaintext.
+
+Format version 3 appends an index after the records, so a single record can be found without touching the others::
+
+    index:   a record (with its own data key) whose plaintext is, per record: name length (uint16) | name | offset (uint64)
+    trailer: index offset (uint64)
+"""
+import base64
+import importlib
+import json
+import os
+import struct
+import zlib
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+
+from apikeyper.crypt.envelope import SEPARATOR
+
+
+MAGIC = b"AKPR"
+FORMAT_VERSION = 3
+INDEXED_VERSION = 3
+
+FORMAT_BINARY = "binary"
+FORMAT_TEXT = "text"
+
+COMPRESSION_NONE = "none"
+COMPRESSION_ZLIB = "zlib"
+COMPRESSION_ZSTD = "zstd"
+COMPRESSION_CODES = {COMPRESSION_NONE: 0, COMPRESSION_ZLIB: 1, COMPRESSION_ZSTD: 2}
+COMPRESSION_NAMES = {code: name for name, code in COMPRESSION_CODES.items()}
+
+HEADER = struct.Struct(">4sBB")
+LENGTH = struct.Struct(">I")
+NAME_LENGTH = struct.Struct(">H")
+MAX_NAME_LENGTH = 2 ** (8 * NAME_LENGTH.size) - 1
+OFFSET = struct.Struct(">Q")
+
+VALUE_STR = 0
+VALUE_JSON = 1
+
+
+class ContainerError(ValueError):
+    """
+    Raised when a file is not a valid `CryptDB` container.
+    """
+
+
+def is_container(file: BinaryIO) -> bool:
+    """
+    Check whether a file starts with the container magic. The file position is left unchanged.
+
+    Args:
+        file (BinaryIO): The file, opened for binary reading.
+
+    Returns:
+        bool: True if the file is a binary container.
+    """
+    position = file.tell()
+    magic = file.read(len(MAGIC))
+    file.seek(position)
+    return magic == MAGIC
+
+
+def write_header(file: BinaryIO, compression: str = COMPRESSION_NONE, version: int = FORMAT_VERSION) -> None:
+    file.write(HEADER.pack(MAGIC, version, COMPRESSION_CODES[compression]))
+
+
+def read_header(file: BinaryIO) -> Tuple[int, str]:
+    """
+    Read and validate the container header.
+
+    Args:
+        file (BinaryIO): The file, positioned at the start of the header.
+
+    Returns:
+        tuple: The format version and the compression name.
+    """
+    raw = file.read(HEADER.size)
+    if len(raw) != HEADER.size:
+        raise ContainerError("Truncated container header")
+
+    magic, version, compression = HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise ContainerError("Not an APIKeyPER container")
+    if version > FORMAT_VERSION:
+        raise ContainerError(f"Unsupported container format version: {version}")
+    if compression not in COMPRESSION_NAMES:
+        raise ContainerError(f"Unknown compression code: {compression}")
+
+    return version, COMPRESSION_NAMES[compression]
+
+
+def write_record(file: BinaryIO, wrapped_key: bytes, payload: Iterable[bytes], payload_length: int) -> None:
+    """
+    Write a record to the container.
+
+    Args:
+        file (BinaryIO): The file, opened for binary writing.
+        wrapped_key (bytes): The wrapped data key, as a base64 Fernet token, or empty.
+        payload (Iterable[bytes]): The encrypted payload, in chunks.
+        payload_length (int): The total payload length.
+    """
+    wrapped_key = base64.urlsafe_b64decode(wrapped_key) if wrapped_key else b""
+    file.write(LENGTH.pack(len(wrapped_key)) + wrapped_key + LENGTH.pack(payload_length))
+
+    written = 0
+    for chunk in payload:
+        file.write(chunk)
+        written += len(chunk)
+
+    if written != payload_length:
+        raise ContainerError(f"Record payload is {written} bytes, expected {payload_length}")
+
+
+def read_record_frame(file: BinaryIO) -> Tuple[bytes, int]:
+    """
+    Read the framing of the record at the current file position, leaving the file positioned at its payload.
+
+    Args:
+        file (BinaryIO): The file, opened for binary reading.
+
+    Returns:
+        tuple: The wrapped data key (a base64 Fernet token, or empty) and the payload length.
+    """
+    wrapped_key = _read_exact(file, LENGTH.unpack(_read_exact(file, LENGTH.size))[0])
+    (payload_length,) = LENGTH.unpack(_read_exact(file, LENGTH.size))
+    return base64.urlsafe_b64encode(wrapped_key) if wrapped_key else b"", payload_length
+
+
+def read_payload(file: BinaryIO, payload_length: int) -> bytes:
+    """
+    Read a whole record payload, from the position `read_record_frame` or `iter_records` leaves the file at.
+
+    Args:
+        file (BinaryIO): The file, opened for binary reading.
+        payload_length (int): The payload length.
+
+    Returns:
+        bytes: The encrypted payload.
+    """
+    return _read_exact(file, payload_length)
+
+
+def iter_records(file: BinaryIO, end: Optional[int] = None) -> Iterator[Tuple[bytes, int]]:
+    """
+    Iterate over the records of a container, starting at the current file position (after the header).
+
+    Each time a record is yielded, the file is positioned at the start of its payload, and the caller may read any
+    part of it. The next iteration seeks past the payload, so unread payloads are skipped without being read.
+
+    Args:
+        file (BinaryIO): The file, opened for binary reading.
+        end (int, optional): The offset at which the records end (e.g. the index offset). Defaults to the end of file.
+
+    Yields:
+        tuple: The wrapped data key (a base64 Fernet token, or empty) and the payload length.
+    """
+    position = file.tell()
+    while end is None or position < end:
+        file.seek(position)
+        if end is None and not file.read(1):
+            return
+
+        file.seek(position)
+        wrapped_key, payload_length = read_record_frame(file)
+
+        position = file.tell() + payload_length
+        yield wrapped_key, payload_length
+
+
+def write_index_offset(file: BinaryIO, offset: int) -> None:
+    file.write(OFFSET.pack(offset))
+
+
+def read_index_offset(file: BinaryIO) -> int:
+    """
+    Read the index offset from the trailer of an indexed container. The file position is left unchanged.
+
+    Args:
+        file (BinaryIO): The file, opened for binary reading.
+
+    Returns:
+        int: The offset of the index record.
+    """
+    position = file.tell()
+    size = file.seek(0, os.SEEK_END)
+    if size < HEADER.size + OFFSET.size:
+        raise ContainerError("Truncated container index")
+
+    file.seek(size - OFFSET.size)
+    (offset,) = OFFSET.unpack(file.read(OFFSET.size))
+    file.seek(position)
+
+    if not HEADER.size <= offset < size - OFFSET.size:
+        raise ContainerError("Invalid container index offset")
+    return offset
+
+
+def pack_index(offsets: Dict[str, int]) -> bytes:
+    """
+    Pack a record index.
+
+    Args:
+        offsets (dict): The file offset of each record, by name.
+
+    Returns:
+        bytes: The packed index.
+    """
+    entries = []
+    for name, offset in offsets.items():
+        name = name.encode("utf-8")
+        entries.append(NAME_LENGTH.pack(len(name)) + name + OFFSET.pack(offset))
+    return b"".join(entries)
+
+
+def unpack_index(data: bytes) -> Dict[str, int]:
+    """
+    Unpack a record index packed by :func:`pack_index`.
+
+    Args:
+        data (bytes): The packed index.
+
+    Returns:
+        dict: The file offset of each record, by name.
+    """
+    offsets = {}
+    position = 0
+    while position < len(data):
+        (name_length,) = NAME_LENGTH.unpack_from(data, position)
+        position += NAME_LENGTH.size
+        name = data[position:position + name_length].decode("utf-8")
+        position += name_length
+        (offsets[name],) = OFFSET.unpack_from(data, position)
+        position += OFFSET.size
+
+    return offsets
+
+
+def write_sealed(file: BinaryIO, sealed: bytes) -> None:
+    """
+    Write a format version 1 sealed record (``<wrapped key> <token>``, or a bare token) to the container.
+
+    Args:
+        file (BinaryIO): The file, opened for binary writing.
+        sealed (bytes): The sealed record, as produced by :meth:`Envelope.seal`.
+    """
+    wrapped_key, separator, token = sealed.partition(SEPARATOR)
+    if not separator:
+        wrapped_key, token = b"", wrapped_key
+
+    wrapped_key = base64.urlsafe_b64decode(wrapped_key) if wrapped_key else b""
+    token = base64.urlsafe_b64decode(token)
+    file.write(LENGTH.pack(len(wrapped_key)) + wrapped_key + LENGTH.pack(len(token)) + token)
+
+
+def _read_exact(file, size):
+    data = file.read(size)
+    if len(data) != size:
+        raise ContainerError("Truncated container record")
+    return data
+
+
+def iter_sealed(file: BinaryIO) -> Iterator[bytes]:
+    """
+    Iterate over the sealed records of a format version 1 container, starting at the current file position (after
+    the header).
+
+    Args:
+        file (BinaryIO): The file, opened for binary reading.
+
+    Yields:
+        bytes: Each sealed record, in the form accepted by :meth:`Envelope.open`.
+    """
+    while raw_length := file.read(LENGTH.size):
+        if len(raw_length) != LENGTH.size:
+            raise ContainerError("Truncated container record")
+
+        wrapped_key = _read_exact(file, LENGTH.unpack(raw_length)[0])
+        token = _read_exact(file, LENGTH.unpack(_read_exact(file, LENGTH.size))[0])
+
+        token = base64.urlsafe_b64encode(token)
+        yield base64.urlsafe_b64encode(wrapped_key) + SEPARATOR + token if wrapped_key else token
+
+
+def _zstd():
+    try:
+        return importlib.import_module("zstandard")
+    except ImportError as e:
+        raise ImportError("zstd compression requires the 'zstandard' package") from e
+
+
+def compress(data: bytes, compression: str) -> bytes:
+    if compression == COMPRESSION_ZLIB:
+        return zlib.compress(data)
+    if compression == COMPRESSION_ZSTD:
+        return _zstd().ZstdCompressor().compress(data)
+    return data
+
+
+def decompress(data: bytes, compression: str) -> bytes:
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(data)
+    if compression == COMPRESSION_ZSTD:
+        return _zstd().ZstdDecompressor().decompress(data)
+    return data
+
+
+def pack_record(name: str, value, compression: str = COMPRESSION_NONE, version: int = FORMAT_VERSION) -> bytes:
+    """
+    Pack a `[name, value]` record into bytes.
+
+    Args:
+        name (str): The record name.
+        value: The record value. Strings are stored as-is; anything else is JSON-encoded.
+        compression (str, optional): The compression to apply. Defaults to none.
+        version (int, optional): The container format version to pack for.
+
+    Returns:
+        bytes: The packed record.
+
+    Raises:
+        ValueError: If the name is longer than `MAX_NAME_LENGTH` (65535) bytes in UTF-8.
+    """
+    name = name.encode("utf-8")
+    if len(name) > MAX_NAME_LENGTH:
+        raise ValueError(f"Record name is {len(name)} bytes in UTF-8; at most {MAX_NAME_LENGTH} are allowed")
+
+    if isinstance(value, str):
+        kind, value = VALUE_STR, value.encode("utf-8")
+    else:
+        kind, value = VALUE_JSON, json.dumps(value).encode("utf-8")
+
+    prefix = NAME_LENGTH.pack(len(name)) + name + bytes((kind,))
+    if version == 1:
+        return compress(prefix + value, compression)
+
+    # The name stays uncompressed, so it can be read from the first stream segment alone.
+    return prefix + compress(value, compression)
+
+
+def read_record_name(chunks: Iterator[bytes]) -> Tuple[str, int, bytes]:
+    """
+    Read the name and value kind from the start of a packed record, consuming as few chunks as possible.
+
+    Args:
+        chunks (Iterator[bytes]): The packed record, in chunks (e.g. decrypted stream segments).
+
+    Returns:
+        tuple: The record name, the value kind, and the part of the value already read.
+    """
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) < NAME_LENGTH.size:
+            continue
+
+        (name_length,) = NAME_LENGTH.unpack_from(buffer)
+        end = NAME_LENGTH.size + name_length
+        if len(buffer) > end:
+            return buffer[NAME_LENGTH.size:end].decode("utf-8"), buffer[end], buffer[end + 1:]
+
+    raise ContainerError("Truncated record")
+
+
+def read_record_value(kind: int, head: bytes, chunks: Iterable[bytes], compression: str = COMPRESSION_NONE):
+    """
+    Read the rest of a packed record, after :func:`read_record_name`.
+
+    Args:
+        kind (int): The value kind returned by :func:`read_record_name`.
+        head (bytes): The part of the value already read.
+        chunks (Iterable[bytes]): The remaining chunks of the record.
+        compression (str, optional): The compression that was applied to the value. Defaults to none.
+
+    Returns:
+        The record value.
+    """
+    value = decompress(b"".join((head, *chunks)), compression).decode("utf-8")
+    return value if kind == VALUE_STR else json.loads(value)
+
+
+def unpack_record_stream(chunks: Iterable[bytes], compression: str = COMPRESSION_NONE) -> Tuple[str, object]:
+    """
+    Unpack a record packed by :func:`pack_record` (format version 2) from a stream of chunks.
+
+    Args:
+        chunks (Iterable[bytes]): The packed record, in chunks.
+        compression (str, optional): The compression that was applied to the value. Defaults to none.
+
+    Returns:
+        tuple: The record name and value.
+    """
+    chunks = iter(chunks)
+    name, kind, head = read_record_name(chunks)
+    return name, read_record_value(kind, head, chunks, compression)
+
+
+def unpack_record(data: bytes, compression: str = COMPRESSION_NONE, version: int = FORMAT_VERSION) -> Tuple[str, object]:
+    """
+    Unpack a record packed by :func:`pack_record`.
+
+    Args:
+        data (bytes): The packed record.
+        compression (str, optional): The compression that was applied. Defaults to none.
+        version (int, optional): The container format version the record was packed for.
+
+    Returns:
+        tuple: The record name and value.
+    """
+    if version == 1:
+        data = decompress(data, compression)
+        compression = COMPRESSION_NONE
+
+    return unpack_record_stream((data,), compression)
@@ -12,9 +12,13 @@ import os
 
 from cryptography.fernet import Fernet
 from apikeyper.__about__ import __DEFAULT_DATA_DIR__ as DEFAULT_DATA_DIR
+from apikeyper.crypt.backends import BACKENDS, CACHEABLE, READ, WRITE, KeyBackend
+from apikeyper.crypt.kdf import DEFAULT_CACHE_TTL
+from apikeyper.telemetry.tracing import TRACING
 
 
 DEFAULT_KEY_FILEPATH = os.path.join(DEFAULT_DATA_DIR, 'key.pem')
+DEFAULT_KEY_ENV = 'APIKEYPER_MASTER_KEY'
 
 
 def get_key_from_file(key_file):
@@ -34,6 +38,7 @@ def get_key_from_file(key_file):
     else:
         # Generate key and save it to file
         key = Fernet.generate_key()
+        os.makedirs(os.path.dirname(os.path.abspath(key_file)), exist_ok=True)
         with open(key_file, "wb") as key_f:
             key_f.write(key)
         return key
@@ -57,32 +62,59 @@ def get_key_from_keyring():
     return key
 
 
-def get_key_from_sftp(sftp_details):
+def get_key_from_sftp(sftp_details, **kwargs):
+    """
+    Retrieve the encryption key from an SFTP server. See :func:`apikeyper.crypt.sftp.get_key_from_sftp`.
     """
-    Retrieve the encryption key from an SFTP server.
 
-    Args:
-        sftp_details (dict): A dictionary containing the connection details for the SFTP server.
+    from apikeyper.crypt.sftp import get_key_from_sftp
 
-    Returns:
-        bytes: The encryption key.
+    return get_key_from_sftp(sftp_details, **kwargs)
+
+
+class FileBackend(KeyBackend):
+    """
+    Stores the key in a file (`key_file`, or `key.pem` in the data directory). A new key is generated if the file
+    does not exist.
     """
 
-    paramiko = importlib.import_module("paramiko")
+    capabilities = frozenset({READ, WRITE, CACHEABLE})
 
-    transport = paramiko.Transport((sftp_details["host"], sftp_details["port"]))
-    transport.connect(
-        username=sftp_details["username"], password=sftp_details["password"]
-    )
-    sftp = transport.open_sftp()
+    def load(self, encryption_key):
+        return get_key_from_file(encryption_key.key_file or DEFAULT_KEY_FILEPATH)
 
-    with sftp.file(sftp_details["remote_key_path"], "r") as remote_file:
-        key = remote_file.read().encode("utf-8")
+    def store(self, encryption_key, key):
+        with open(encryption_key.key_file or DEFAULT_KEY_FILEPATH, "wb") as file:
+            file.write(key)
 
-    sftp.close()
-    transport.close()
 
-    return key
+class KeyringBackend(KeyBackend):
+    """
+    Stores the key in the system's keyring. A new key is generated if there is none.
+    """
+
+    capabilities = frozenset({READ, WRITE, CACHEABLE})
+
+    def load(self, encryption_key):
+        return get_key_from_keyring()
+
+    def store(self, encryption_key, key):
+        keyring = importlib.import_module("keyring")
+        keyring.set_password("cryptdb", "encryption_key", key.decode("utf-8"))
+
+
+class EnvBackend(KeyBackend):
+    """
+    Reads the key from an environment variable: `$APIKEYPER_MASTER_KEY`, or the one named by the `env_var` option.
+    """
+
+    capabilities = frozenset({READ})
+
+    def load(self, encryption_key):
+        name = encryption_key.backend_options.get("env_var", DEFAULT_KEY_ENV)
+        if not (key := os.environ.get(name)):
+            raise KeyError(f"The environment variable {name} is not set")
+        return key.encode("utf-8")
 
 
 class EncryptionKey:
@@ -90,7 +122,21 @@ class EncryptionKey:
     A class that represents an encryption key. This class supports multiple storage methods.
     """
 
-    def __init__(self, storage_method, key_file=None, sftp_details=None):
+    def __init__(
+        self,
+        storage_method,
+        key_file=None,
+        sftp_details=None,
+        password=None,
+        salt_file=None,
+        kdf=None,
+        kdf_params=None,
+        cache_ttl=DEFAULT_CACHE_TTL,
+        agent_socket=None,
+        sftp_cache_ttl=None,
+        backends=None,
+        **backend_options,
+    ):
         """
         Initialize a new EncryptionKey instance.
 
@@ -98,11 +144,35 @@ class EncryptionKey:
             storage_method (str): The method used for key storage.
             key_file (str, optional): The path to the file that stores the encryption key.
             sftp_details (dict, optional): A dictionary containing the connection details for the SFTP server.
+            password (str, optional): The master password for the 'password' storage method. If None, the user is
+                prompted unless a derived key is still cached.
+            salt_file (str, optional): The path to the file that stores the salt and KDF parameters for the
+                'password' storage method.
+            kdf (str, optional): The KDF ('scrypt' or 'pbkdf2') used when creating a new salt file.
+            kdf_params (dict, optional): The KDF cost parameters used when creating a new salt file.
+            cache_ttl (float, optional): Seconds to cache a password-derived key in memory.
+            agent_socket (str, optional): The Unix socket of the key agent for the 'agent' storage method. Defaults to
+                `$APIKEYPER_AGENT_SOCK`, or `agent.sock` in the data directory.
+            sftp_cache_ttl (float, optional): Seconds to use a key cached on disk (encrypted) instead of contacting
+                the SFTP server. After that, the cache is revalidated against the remote file. Defaults to None, which
+                disables the cache.
+            backends (BackendRegistry, optional): The registry to look `storage_method` up in. Defaults to the
+                global registry, which includes backends installed through entry points.
+            **backend_options: Options for other backends (e.g. `env_var` for the 'env' storage method).
         """
 
         self.storage_method = storage_method
         self.key_file = key_file
         self.sftp_details = sftp_details
+        self.salt_file = salt_file
+        self.kdf = kdf
+        self.kdf_params = kdf_params
+        self.cache_ttl = cache_ttl
+        self.agent_socket = agent_socket
+        self.sftp_cache_ttl = sftp_cache_ttl
+        self.backend_options = backend_options
+        self.backend = (backends or BACKENDS).get(storage_method)
+        self.__password = password
 
         # Load the encryption key from the specified storage method
         self.key = self._load_key()
@@ -115,14 +185,33 @@ class EncryptionKey:
             bytes: The encryption key.
         """
 
-        if self.storage_method == "file":
-            return get_key_from_file(self.key_file)
-        elif self.storage_method == "keyring":
-            return get_key_from_keyring()
-        elif self.storage_method == "sftp":
-            return get_key_from_sftp(self.sftp_details)
-        else:
-            raise ValueError(f"Unknown key_storage method: {self.storage_method}")
+        if READ not in self.backend.capabilities:
+            raise ValueError(f"The {self.storage_method!r} key storage cannot load keys")
+
+        with TRACING.span("apikeyper.encryption_key.load", {"storage_method": self.storage_method}):
+            return self.backend.load(self)
+
+    def take_password(self):
+        """
+        Hand over the password given to the constructor, for backends that need one. The password is forgotten
+        afterwards.
+
+        Returns:
+            str or None: The password.
+        """
+
+        password, self.__password = self.__password, None
+        return password
+
+    def store(self):
+        """
+        Store the encryption key using its storage method (e.g. to create the key file or keyring entry).
+        """
+
+        if WRITE not in self.backend.capabilities:
+            raise ValueError(f"The {self.storage_method!r} key storage cannot store keys")
+
+        self.backend.store(self, self.key)
 
     def export_to_file(self, key_file):
         """
@@ -151,16 +240,6 @@ class EncryptionKey:
             sftp_details (dict): A dictionary containing the connection details for the SFTP server.
         """
 
-        paramiko = importlib.import_module("paramiko")
-
-        transport = paramiko.Transport((sftp_details["host"], sftp_details["port"]))
-        transport.connect(
-            username=sftp_details["username"], password=sftp_details["password"]
-        )
-        sftp = transport.open_sftp()
-
-        with sftp.file(sftp_details["remote_key_path"], "w") as remote_file:
-            remote_file.write(self.key.decode("utf-8"))
+        from apikeyper.crypt.sftp import put_key_to_sftp
 
-        sftp.close()
-        transport.close()
+        put_key_to_sftp(sftp_details, self.key, cache_ttl=self.sftp_cache_ttl)
@@ -0,0 +1,174 @@
+"""
+Project: APIKeyPER
+Author: Inspyre Softworks - https://inspyre.tech
+Created: 10/19/2026
+File:
+  Name: envelope.py
+  Filepath: apikeyper/crypt
+
+This module implements envelope encryption for `CryptDB`. Every record (one per service) is encrypted with its own
+random data-encryption key (DEK), and only the DEKs are encrypted ("wrapped") by the master key. Rotating the master key
+therefore only re-wraps the small DEKs, and decrypting one service never touches the keys of another.
+
+A sealed record is stored as ``<wrapped DEK> <record token>``. Unwrapped DEKs are kept in a bounded LRU cache.
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+from cryptography.fernet import Fernet
+
+
+SEPARATOR = b" "
+DEFAULT_DATA_KEY_CACHE_SIZE = 256
+
+
+class DataKeyCache:
+    """
+    A thread-safe, bounded LRU cache mapping wrapped data keys to their unwrapped values.
+
+    Attributes:
+        maxsize (int): The maximum number of unwrapped keys kept in memory.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_DATA_KEY_CACHE_SIZE):
+        if maxsize < 0:
+            raise ValueError("maxsize must not be negative")
+
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, wrapped_key: bytes) -> Optional[bytes]:
+        with self._lock:
+            data_key = self._entries.get(wrapped_key)
+            if data_key is not None:
+                self._entries.move_to_end(wrapped_key)
+            return data_key
+
+    def put(self, wrapped_key: bytes, data_key: bytes) -> None:
+        if self.maxsize == 0:
+            return
+
+        with self._lock:
+            self._entries[wrapped_key] = data_key
+            self._entries.move_to_end(wrapped_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class Envelope:
+    """
+    Seals and opens records with per-record data keys wrapped by a master cipher.
+
+    Attributes:
+        master_cipher (Fernet or MultiFernet): The cipher that wraps and unwraps data keys.
+        cache (DataKeyCache): The cache of unwrapped data keys.
+    """
+
+    def __init__(self, master_cipher, cache_size: int = DEFAULT_DATA_KEY_CACHE_SIZE):
+        """
+        Args:
+            master_cipher (Fernet or MultiFernet): The cipher that wraps and unwraps data keys.
+            cache_size (int, optional): The maximum number of unwrapped data keys kept in memory. Defaults to 256.
+        """
+        self.master_cipher = master_cipher
+        self.cache = DataKeyCache(cache_size)
+
+    def new_data_key(self) -> bytes:
+        """
+        Generate a new random data key.
+
+        Returns:
+            bytes: The data key, wrapped by the master cipher.
+        """
+        data_key = Fernet.generate_key()
+        wrapped_key = self.master_cipher.encrypt(data_key)
+        self.cache.put(wrapped_key, data_key)
+        return wrapped_key
+
+    def data_key(self, wrapped_key: bytes) -> bytes:
+        """
+        Unwrap a data key, using the cache when possible.
+
+        Args:
+            wrapped_key (bytes): The wrapped data key.
+
+        Returns:
+            bytes: The data key.
+        """
+        if (data_key := self.cache.get(wrapped_key)) is None:
+            data_key = self.master_cipher.decrypt(wrapped_key)
+            self.cache.put(wrapped_key, data_key)
+        return data_key
+
+    def data_cipher(self, wrapped_key: bytes) -> Fernet:
+        """
+        Get the Fernet cipher for a wrapped data key.
+
+        Args:
+            wrapped_key (bytes): The wrapped data key.
+
+        Returns:
+            Fernet: The data key's cipher.
+        """
+        return Fernet(self.data_key(wrapped_key))
+
+    def seal(self, wrapped_key: bytes, plaintext: Union[str, bytes]) -> bytes:
+        """
+        Encrypt a record with a data key.
+
+        Args:
+            wrapped_key (bytes): The wrapped data key to encrypt with.
+            plaintext (str or bytes): The record. Strings are UTF-8 encoded.
+
+        Returns:
+            bytes: The sealed record.
+        """
+        if isinstance(plaintext, str):
+            plaintext = plaintext.encode("utf-8")
+
+        return wrapped_key + SEPARATOR + self.data_cipher(wrapped_key).encrypt(plaintext)
+
+    def open(self, sealed: bytes) -> Tuple[Optional[bytes], bytes]:
+        """
+        Decrypt a sealed record. Records encrypted directly with the master key (written before envelope encryption
+        was introduced) are decrypted with the master cipher.
+
+        Args:
+            sealed (bytes): The sealed record.
+
+        Returns:
+            tuple: The wrapped data key (None for records without one) and the decrypted record bytes.
+        """
+        wrapped_key, separator, token = sealed.partition(SEPARATOR)
+        if not separator:
+            return None, self.master_cipher.decrypt(sealed)
+
+        return wrapped_key, self.data_cipher(wrapped_key).decrypt(token)
+
+
+def rewrap(master_cipher, sealed: bytes) -> bytes:
+    """
+    Re-wrap the data key of a sealed record under the first key of a MultiFernet, leaving the record itself as is.
+    Records without a data key are re-encrypted in full.
+
+    Args:
+        master_cipher (MultiFernet): The cipher holding the new key first, followed by the old key(s).
+        sealed (bytes): The sealed record.
+
+    Returns:
+        bytes: The sealed record with its data key re-wrapped.
+    """
+    wrapped_key, separator, token = sealed.partition(SEPARATOR)
+    if not separator:
+        return master_cipher.rotate(sealed)
+
+    return master_cipher.rotate(wrapped_key) + SEPARATOR + token
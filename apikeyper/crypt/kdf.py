@@ -0,0 +1,330 @@
+"""
+Project: APIKeyPER
+Author: Inspyre Softworks - https://inspyre.tech
+Created: 10/19/2026
+File:
+  Name: kdf.py
+  Filepath: apikeyper/crypt
+
+This module derives Fernet master keys from passwords. It supports scrypt and PBKDF2, stores the salt and the KDF
+cost parameters next to the default key file, and keeps derived keys in a small in-memory cache with a TTL so that
+repeated `CryptDB` opens in one session do not re-run the (deliberately slow) KDF.
+
+It can also be run as a small benchmark command that picks KDF parameters for a target unlock latency::
+
+    python -m apikeyper.crypt.kdf --kdf scrypt --target-ms 250
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from argparse import ArgumentParser
+from typing import Optional, Union
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+from apikeyper.__about__ import __DEFAULT_DATA_DIR__ as DEFAULT_DATA_DIR
+from apikeyper.crypt.backends import CACHEABLE, READ, KeyBackend
+from apikeyper.telemetry.profiling import add_profile_arguments, run_profiled
+
+
+SCRYPT = "scrypt"
+PBKDF2 = "pbkdf2"
+
+DEFAULT_KDF = SCRYPT
+DEFAULT_KDF_PARAMS = {
+    SCRYPT: {"n": 2**15, "r": 8, "p": 1},
+    PBKDF2: {"iterations": 600_000},
+}
+
+DEFAULT_SALT_FILEPATH = os.path.join(DEFAULT_DATA_DIR, 'key.salt')
+DEFAULT_CACHE_TTL = 300
+SALT_LENGTH = 16
+
+KEY_LENGTH = 32
+MAX_SCRYPT_N = 2**20
+
+
+def derive_key(password: Union[str, bytes], salt: bytes, kdf: str = DEFAULT_KDF, **params) -> bytes:
+    """
+    Derive a Fernet key from a password.
+
+    Args:
+        password (str or bytes): The password.
+        salt (bytes): The salt.
+        kdf (str, optional): Either 'scrypt' or 'pbkdf2'. Defaults to 'scrypt'.
+        **params: The KDF cost parameters ('n', 'r', 'p' for scrypt, 'iterations' for PBKDF2). Missing parameters
+            fall back to the defaults.
+
+    Returns:
+        bytes: The url-safe base64-encoded key, ready for `Fernet`.
+    """
+    if isinstance(password, str):
+        password = password.encode("utf-8")
+
+    if kdf not in DEFAULT_KDF_PARAMS:
+        raise ValueError(f"Unknown KDF: {kdf}")
+
+    params = {**DEFAULT_KDF_PARAMS[kdf], **params}
+
+    if kdf == SCRYPT:
+        derivation = Scrypt(salt=salt, length=KEY_LENGTH, n=params["n"], r=params["r"], p=params["p"])
+    else:
+        derivation = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=KEY_LENGTH,
+            salt=salt,
+            iterations=params["iterations"],
+        )
+
+    return base64.urlsafe_b64encode(derivation.derive(password))
+
+
+def load_kdf_settings(salt_file: str) -> Optional[dict]:
+    """
+    Load the KDF name, salt and cost parameters from a salt file.
+
+    Args:
+        salt_file (str): Path to the salt file.
+
+    Returns:
+        dict or None: The settings ('kdf', 'salt', 'params'), or None if the file does not exist.
+    """
+    if not os.path.exists(salt_file):
+        return None
+
+    with open(salt_file, "r") as file:
+        settings = json.load(file)
+
+    settings["salt"] = base64.b64decode(settings["salt"])
+    return settings
+
+
+def save_kdf_settings(salt_file: str, kdf: str, salt: bytes, params: dict) -> dict:
+    """
+    Save the KDF name, salt and cost parameters to a salt file.
+
+    Args:
+        salt_file (str): Path to the salt file.
+        kdf (str): The KDF name.
+        salt (bytes): The salt.
+        params (dict): The KDF cost parameters.
+
+    Returns:
+        dict: The saved settings.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(salt_file)), exist_ok=True)
+
+    with open(salt_file, "w") as file:
+        json.dump({"kdf": kdf, "salt": base64.b64encode(salt).decode("ascii"), "params": params}, file)
+
+    return {"kdf": kdf, "salt": salt, "params": params}
+
+
+class DerivedKeyCache:
+    """
+    A thread-safe, in-memory cache of derived keys with a time-to-live.
+
+    Entries are keyed by the salt file and remember a keyed digest of the password that unlocked them, never the
+    password itself.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(salt: bytes, password: Union[str, bytes]) -> bytes:
+        if isinstance(password, str):
+            password = password.encode("utf-8")
+        return hmac.new(salt, password, hashlib.sha256).digest()
+
+    def get(self, cache_key, salt: bytes, password=None) -> Optional[bytes]:
+        """
+        Fetch a derived key.
+
+        Args:
+            cache_key: The cache key (normally the salt file path).
+            salt (bytes): The salt used for the entry.
+            password (str, optional): If given, the entry is only returned if it was unlocked by this password.
+
+        Returns:
+            bytes or None: The derived key, or None on a miss or expired entry.
+        """
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return None
+
+            expires, entry_salt, digest, key = entry
+            if expires <= time.monotonic() or entry_salt != salt:
+                del self._entries[cache_key]
+                return None
+
+        if password is not None and not hmac.compare_digest(digest, self._digest(salt, password)):
+            return None
+
+        return key
+
+    def put(self, cache_key, salt: bytes, password, key: bytes, ttl: float = DEFAULT_CACHE_TTL) -> None:
+        """
+        Store a derived key.
+
+        Args:
+            cache_key: The cache key (normally the salt file path).
+            salt (bytes): The salt used to derive the key.
+            password (str): The password used to derive the key.
+            key (bytes): The derived key.
+            ttl (float, optional): Seconds to keep the key. A TTL of 0 or less disables caching.
+        """
+        if ttl <= 0:
+            return
+
+        entry = (time.monotonic() + ttl, salt, self._digest(salt, password), key)
+        with self._lock:
+            self._entries[cache_key] = entry
+
+    def clear(self) -> None:
+        """
+        Forget every cached key.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+KEY_CACHE = DerivedKeyCache()
+
+
+def get_key_from_password(
+    password: Optional[str] = None,
+    salt_file: Optional[str] = None,
+    kdf: Optional[str] = None,
+    kdf_params: Optional[dict] = None,
+    cache_ttl: float = DEFAULT_CACHE_TTL,
+) -> bytes:
+    """
+    Derive the encryption key from a password. If no salt file exists yet, a new salt is generated and stored along
+    with the KDF name and cost parameters; otherwise the stored settings are used.
+
+    Args:
+        password (str, optional): The password. If None and no key is cached, the user is prompted.
+        salt_file (str, optional): Path to the salt file. Defaults to 'key.salt' in the data directory.
+        kdf (str, optional): The KDF to use when creating a new salt file. Defaults to 'scrypt'.
+        kdf_params (dict, optional): The KDF cost parameters to use when creating a new salt file.
+        cache_ttl (float, optional): Seconds to cache the derived key. Defaults to 300.
+
+    Returns:
+        bytes: The encryption key.
+    """
+
+    salt_file = salt_file or DEFAULT_SALT_FILEPATH
+    cache_key = os.path.abspath(salt_file)
+
+    settings = load_kdf_settings(salt_file)
+    if settings is None:
+        kdf = kdf or DEFAULT_KDF
+        params = {**DEFAULT_KDF_PARAMS[kdf], **(kdf_params or {})}
+        settings = save_kdf_settings(salt_file, kdf, os.urandom(SALT_LENGTH), params)
+
+    salt = settings["salt"]
+
+    if (key := KEY_CACHE.get(cache_key, salt, password)) is not None:
+        return key
+
+    if password is None:
+        from apikeyper.ui import UserInputHandler
+
+        password = UserInputHandler().get_password(prompt="Enter master password")
+
+    key = derive_key(password, salt, settings["kdf"], **settings["params"])
+    KEY_CACHE.put(cache_key, salt, password, key, cache_ttl)
+    return key
+
+
+class PasswordBackend(KeyBackend):
+    """
+    Derives the key from the master password; see :func:`get_key_from_password`.
+    """
+
+    capabilities = frozenset({READ, CACHEABLE})
+
+    def load(self, encryption_key):
+        return get_key_from_password(
+            encryption_key.take_password(),
+            salt_file=encryption_key.salt_file,
+            kdf=encryption_key.kdf,
+            kdf_params=encryption_key.kdf_params,
+            cache_ttl=encryption_key.cache_ttl,
+        )
+
+
+def benchmark_kdf(kdf: str = DEFAULT_KDF, rounds: int = 1, **params) -> float:
+    """
+    Measure how long one key derivation takes with the given parameters.
+
+    Args:
+        kdf (str, optional): Either 'scrypt' or 'pbkdf2'. Defaults to 'scrypt'.
+        rounds (int, optional): The number of derivations to average over. Defaults to 1.
+        **params: The KDF cost parameters.
+
+    Returns:
+        float: The average time of one derivation, in seconds.
+    """
+    salt = os.urandom(SALT_LENGTH)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        derive_key(b"benchmark-password", salt, kdf, **params)
+    return (time.perf_counter() - start) / rounds
+
+
+def calibrate_kdf(target_seconds: float = 0.25, kdf: str = DEFAULT_KDF) -> dict:
+    """
+    Pick KDF cost parameters that take roughly `target_seconds` to unlock on this machine.
+
+    For scrypt, the work factor 'n' is doubled until the target is reached. For PBKDF2, the iteration count is
+    extrapolated from a short measurement.
+
+    Args:
+        target_seconds (float, optional): The target unlock latency. Defaults to 0.25.
+        kdf (str, optional): Either 'scrypt' or 'pbkdf2'. Defaults to 'scrypt'.
+
+    Returns:
+        dict: The chosen parameters, plus the measured 'seconds'.
+    """
+    if kdf == SCRYPT:
+        params = {**DEFAULT_KDF_PARAMS[SCRYPT], "n": 2**12}
+        elapsed = benchmark_kdf(kdf, **params)
+        while elapsed < target_seconds and params["n"] < MAX_SCRYPT_N:
+            params["n"] *= 2
+            elapsed = benchmark_kdf(kdf, **params)
+    elif kdf == PBKDF2:
+        sample = 20_000
+        per_iteration = benchmark_kdf(kdf, iterations=sample) / sample
+        params = {"iterations": max(sample, int(target_seconds / per_iteration) // 1000 * 1000)}
+        elapsed = benchmark_kdf(kdf, **params)
+    else:
+        raise ValueError(f"Unknown KDF: {kdf}")
+
+    return {**params, "seconds": elapsed}
+
+
+def main(argv=None):
+    parser = ArgumentParser(description='Pick KDF parameters for a target unlock latency.')
+    parser.add_argument('--kdf', choices=[SCRYPT, PBKDF2], default=DEFAULT_KDF, help='The KDF to calibrate.')
+    parser.add_argument('--target-ms', type=float, default=250, help='The target unlock latency in milliseconds.')
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    result = run_profiled(args, 'kdf', calibrate_kdf, args.target_ms / 1000, args.kdf)
+    seconds = result.pop("seconds")
+    print(f'{args.kdf}: {json.dumps(result)} ({seconds * 1000:.0f} ms per unlock)')
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Project: APIKeyPER
+Author: Inspyre Softworks - https://inspyre.tech
+Created: 10/19/2026
+File:
+  Name: rotation.py
+  Filepath: apikeyper/crypt
+
+This module rotates the master key of a `CryptDB` file by re-wrapping each record's data key with
+`MultiFernet.rotate`, in bounded batches. The encrypted records themselves are copied over untouched, chunk by chunk,
+to a side file, so neither plaintext nor whole records accumulate in memory, and readers keep using the original file
+until it is atomically replaced at the end. A journal records how many batches are done, so an interrupted run resumes
+where it stopped instead of starting over, as long as the file has not been rewritten in between.
+"""
+import hashlib
+import json
+import os
+from typing import Callable, Optional
+
+from apikeyper.crypt import container
+from apikeyper.crypt.batch import BatchCrypt
+
+
+DEFAULT_ROTATION_BATCH_SIZE = 256
+COPY_CHUNK_SIZE = 64 * 1024
+
+ROTATING_SUFFIX = ".rotating"
+JOURNAL_SUFFIX = ".rotating.json"
+
+
+def key_fingerprint(key: bytes) -> str:
+    """
+    Compute a short, non-reversible identifier for a key, suitable for storing in the rotation journal.
+
+    Args:
+        key (bytes): The key.
+
+    Returns:
+        str: The fingerprint.
+    """
+    return hashlib.sha256(key).hexdigest()[:16]
+
+
+def source_signature(file_path: str) -> list:
+    """
+    Identify the current contents of a file cheaply, so a rotation journal is only trusted for the file it was
+    written for. Saving a `CryptDB` replaces its file, which changes the signature.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        list[int]: The file's inode, size and modification time (in nanoseconds).
+    """
+    info = os.stat(file_path)
+    return [info.st_ino, info.st_size, info.st_mtime_ns]
+
+
+def _load_journal(journal_path, fingerprint, signature):
+    if not os.path.exists(journal_path):
+        return None
+
+    with open(journal_path, "r") as file:
+        journal = json.load(file)
+
+    return journal if journal.get("key") == fingerprint and journal.get("source") == signature else None
+
+
+def _save_journal(journal_path, fingerprint, signature, done, offset):
+    temp_path = f"{journal_path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump({"key": fingerprint, "source": signature, "done": done, "offset": offset}, file)
+    os.replace(temp_path, journal_path)
+
+
+def _iter_lines(file):
+    return (line.strip() for line in file if line.strip())
+
+
+def _write_line(file, sealed, _):
+    file.write(sealed + b"\n")
+
+
+def _write_sealed(file, sealed, _):
+    container.write_sealed(file, sealed)
+
+
+def _iter_payloads(file, end=None):
+    # Yield each wrapped key along with where its record starts and its (still encrypted) payload lives.
+    start = file.tell()
+    for wrapped_key, length in container.iter_records(file, end):
+        position = file.tell()
+        yield wrapped_key, (start, position, length)
+        start = position + length
+
+
+def _copy_payload(source):
+    def write(target, wrapped_key, location):
+        start, position, length = location
+        # Re-wrapped keys have the same size, so records keep their offsets and the index stays valid.
+        if target.tell() != start:
+            raise container.ContainerError("Record offsets changed during rotation")
+        container.write_record(target, wrapped_key, _read_chunks(source, position, length), length)
+
+    return write
+
+
+def _read_chunks(file, position, length):
+    file.seek(position)
+    while length > 0:
+        chunk = file.read(min(length, COPY_CHUNK_SIZE))
+        if not chunk:
+            raise container.ContainerError("Truncated container record")
+        length -= len(chunk)
+        yield chunk
+
+
+def _open_records(file):
+    """
+    Position `file` at its first record and return an iterator of (sealed record or wrapped key, payload location)
+    pairs, a record writer and the container header (version, compression and index offset; None for text files).
+    """
+    if not container.is_container(file):
+        return ((line, None) for line in _iter_lines(file)), _write_line, None
+
+    version, compression = container.read_header(file)
+    if version == 1:
+        return ((sealed, None) for sealed in container.iter_sealed(file)), _write_sealed, (version, compression, None)
+
+    index_offset = container.read_index_offset(file) if version >= container.INDEXED_VERSION else None
+    return _iter_payloads(file, index_offset), _copy_payload(file), (version, compression, index_offset)
+
+
+def rotate_file(
+    file_path: str,
+    new_key: bytes,
+    old_keys: list,
+    batch_size: int = DEFAULT_ROTATION_BATCH_SIZE,
+    progress: Optional[Callable[[int, int], None]] = None,
+    **batch_kwargs,
+) -> int:
+    """
+    Re-wrap the data keys of a `CryptDB` file under a new key, journaling each batch.
+
+    The data keys are re-wrapped in batches of `batch_size` and written, with their records copied over untouched, to
+    `<file_path>.rotating`; after each batch the output is flushed to disk and the journal `<file_path>.rotating.json`
+    is updated. When every record is done, the side file replaces the original atomically. If a journal for the same
+    new key and the same source file (see `source_signature`) is found, the rotation resumes after the last completed
+    batch; a journal left by a rotation of a file that has since been rewritten is discarded, with its side file.
+
+    The file keeps its format. Files in the older formats (version 1 containers and one-record-per-line text), whose
+    records have no separate data key, have each sealed record rotated whole instead.
+
+    Args:
+        file_path (str): The path to the encrypted database file.
+        new_key (bytes): The new master key.
+        old_keys (list[bytes]): The key(s) the records may currently be encrypted with.
+        batch_size (int, optional): The number of records handled per batch. Defaults to 256.
+        progress (Callable[[int, int], None], optional): Called with (records done, total records) after each batch.
+        **batch_kwargs: Passed to :class:`BatchCrypt` (e.g. `max_workers`).
+
+    Returns:
+        int: The number of records rotated.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
+    rotating_path = f"{file_path}{ROTATING_SUFFIX}"
+    journal_path = f"{file_path}{JOURNAL_SUFFIX}"
+    fingerprint = key_fingerprint(new_key)
+    signature = source_signature(file_path)
+    batch = BatchCrypt([new_key, *old_keys], **batch_kwargs)
+
+    with open(file_path, "rb") as source:
+        records, _, _ = _open_records(source)
+        total = sum(1 for _ in records)
+
+    journal = _load_journal(journal_path, fingerprint, signature)
+    if journal is None:
+        # Nothing to resume, or the journal belongs to another key or an older version of the file: start over.
+        for path in (journal_path, rotating_path):
+            if os.path.exists(path):
+                os.remove(path)
+    done, offset = (journal["done"], journal["offset"]) if journal else (0, 0)
+
+    with open(file_path, "rb") as source, open(rotating_path, "ab") as target:
+        records, write_record, header = _open_records(source)
+
+        # Drop anything written after the last journaled batch.
+        target.truncate(offset)
+        target.seek(offset)
+        if offset == 0 and header is not None:
+            version, compression, _ = header
+            container.write_header(target, compression, version)
+
+        for _ in range(done):
+            next(records)
+
+        while done < total:
+            chunk = [record for _, record in zip(range(batch_size), records)]
+            if not chunk:
+                break
+
+            rotated = batch.rotate_many(sealed for sealed, _ in chunk)
+            for token, (_, location) in zip(rotated, chunk):
+                write_record(target, token, location)
+
+            target.flush()
+            os.fsync(target.fileno())
+
+            done += len(chunk)
+            _save_journal(journal_path, fingerprint, signature, done, target.tell())
+
+            if progress is not None:
+                progress(done, total)
+
+        if header is not None and (index_offset := header[2]) is not None:
+            # The index has a data key of its own; re-wrap it like any other record's.
+            source.seek(index_offset)
+            records = _iter_payloads(source)
+            wrapped_key, location = next(records)
+            write_record(target, next(batch.rotate_many([wrapped_key])), location)
+            container.write_index_offset(target, index_offset)
+
+    # Forget the journal first: if we crash before the replace, the next run starts over from the intact original
+    # instead of trusting a journal that points past the end of a fresh side file.
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
+    os.replace(rotating_path, file_path)
+    return done
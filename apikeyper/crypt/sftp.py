@@ -0,0 +1,435 @@
+"""
+Project: APIKeyPER
+Author: Inspyre Softworks - https://inspyre.tech
+Created: 10/19/2026
+File:
+  Name: sftp.py
+  Filepath: apikeyper/crypt
+
+This module retrieves and stores master keys on an SFTP server without paying for a new SSH handshake every time.
+
+Sessions are pooled per server and user, kept alive with SSH keepalives, and closed after sitting idle. Connecting
+happens outside the pool lock, so a slow server only holds up the callers waiting for that server. On top of that, the
+remote key can be cached on disk. The cache entry is encrypted with a key derived from the SFTP password by a
+memory-hard KDF (scrypt by default, see `apikeyper.crypt.kdf`), so it is useless without the credentials and
+brute-forcing the password from it is expensive. The derived key is kept in memory for a few minutes, so the KDF does
+not run on every load. The entry is validated against the remote file's mtime and size: within `cache_ttl` no network
+access happens at all, and after that, a single `stat` call decides whether the key has to be downloaded again.
+"""
+import atexit
+import base64
+import hashlib
+import importlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from apikeyper.__about__ import __DEFAULT_DATA_DIR__ as DEFAULT_DATA_DIR
+from apikeyper.crypt.backends import CACHEABLE, READ, WRITE, KeyBackend
+from apikeyper.crypt.kdf import DEFAULT_KDF, DEFAULT_KDF_PARAMS, KEY_CACHE, derive_key
+
+
+DEFAULT_KEEPALIVE = 30
+DEFAULT_MAX_IDLE = 300
+DEFAULT_SFTP_CACHE_DIR = os.path.join(DEFAULT_DATA_DIR, 'sftp_cache')
+
+SALT_LENGTH = 16
+CACHE_FORMAT_VERSION = 2
+
+
+def _server_id(sftp_details):
+    return sftp_details["host"], sftp_details["port"], sftp_details["username"]
+
+
+class _Session:
+    """
+    A pooled SFTP session.
+
+    Attributes:
+        transport (paramiko.Transport): The SSH transport.
+        sftp (paramiko.SFTPClient): The SFTP session.
+        last_used (float): The `time.monotonic()` reading when the session was last returned to the pool.
+        borrowers (int): How many callers are using or waiting for the session. It is never closed while borrowed.
+        retired (bool): Whether the session has been taken out of the pool; the last borrower closes it.
+        lock (threading.Lock): Serializes requests, as an SFTP channel handles one request at a time.
+    """
+
+    __slots__ = ("transport", "sftp", "last_used", "borrowers", "retired", "lock")
+
+    def __init__(self, transport, sftp):
+        self.transport = transport
+        self.sftp = sftp
+        self.last_used = time.monotonic()
+        self.borrowers = 0
+        self.retired = False
+        self.lock = threading.Lock()
+
+
+class SFTPSessionPool:
+    """
+    A thread-safe pool of authenticated SFTP sessions, one per server and credentials.
+
+    The pool lock only guards the bookkeeping. Connections are opened outside of it: the first caller for a server
+    connects, and other callers for the same server wait for that connection instead of opening their own.
+
+    Attributes:
+        keepalive (int): The SSH keepalive interval, in seconds.
+        max_idle (float): Seconds after which an unused session is closed.
+    """
+
+    def __init__(self, keepalive: int = DEFAULT_KEEPALIVE, max_idle: float = DEFAULT_MAX_IDLE):
+        self.keepalive = keepalive
+        self.max_idle = max_idle
+        self._sessions = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _connect(self, sftp_details):
+        paramiko = importlib.import_module("paramiko")
+
+        transport = paramiko.Transport((sftp_details["host"], sftp_details["port"]))
+        try:
+            transport.set_keepalive(self.keepalive)
+            transport.connect(username=sftp_details["username"], password=sftp_details["password"])
+            return transport, paramiko.SFTPClient.from_transport(transport)
+        except BaseException:
+            transport.close()
+            raise
+
+    def _retire(self, server, entry):
+        """
+        Take a session out of the pool. Must be called with the pool lock held.
+
+        Returns:
+            bool: Whether the caller should close the session now (nobody is borrowing it).
+        """
+        if self._sessions.get(server) is entry:
+            del self._sessions[server]
+        entry.retired = True
+        return entry.borrowers == 0
+
+    def _close_idle(self, now):
+        """
+        Take the sessions that have been idle for longer than `max_idle`, and are not borrowed, out of the pool. Must be
+        called with the pool lock held.
+
+        Returns:
+            list[_Session]: The sessions to close, once the lock is released.
+        """
+        idle = [
+            (server, entry) for server, entry in self._sessions.items()
+            if entry.borrowers == 0 and now - entry.last_used > self.max_idle
+        ]
+        return [entry for server, entry in idle if self._retire(server, entry)]
+
+    def _borrow(self, server, sftp_details):
+        while True:
+            with self._lock:
+                to_close = self._close_idle(time.monotonic())
+
+                entry = self._sessions.get(server)
+                if entry is not None and not entry.transport.is_active():
+                    if self._retire(server, entry):
+                        to_close.append(entry)
+                    entry = None
+
+                if entry is not None:
+                    entry.borrowers += 1
+                    pending = connecting = None
+                elif server in self._pending:
+                    pending, connecting = self._pending[server], False
+                else:
+                    pending = self._pending[server] = Future()
+                    connecting = True
+
+            for stale in to_close:
+                _close(stale.transport, stale.sftp)
+
+            if entry is not None:
+                return entry
+
+            if not connecting:
+                # Another caller is connecting to this server; use its session (or fail with its error).
+                pending.result()
+                continue
+
+            try:
+                entry = _Session(*self._connect(sftp_details))
+            except BaseException as e:
+                with self._lock:
+                    del self._pending[server]
+                pending.set_exception(e)
+                raise
+
+            entry.borrowers = 1
+            with self._lock:
+                self._sessions[server] = entry
+                del self._pending[server]
+            pending.set_result(None)
+            return entry
+
+    def _release(self, entry):
+        with self._lock:
+            entry.borrowers -= 1
+            entry.last_used = time.monotonic()
+            close = entry.retired and entry.borrowers == 0
+
+        if close:
+            _close(entry.transport, entry.sftp)
+
+    @contextmanager
+    def session(self, sftp_details: dict):
+        """
+        Borrow an SFTP session, connecting only if there is no live one for this server and user.
+
+        Args:
+            sftp_details (dict): The connection details ('host', 'port', 'username', 'password').
+
+        Yields:
+            paramiko.SFTPClient: The SFTP session.
+        """
+        # Sessions are only shared by callers holding the same credentials.
+        password = hashlib.sha256(sftp_details["password"].encode("utf-8")).digest()
+        server = (*_server_id(sftp_details), password)
+
+        entry = self._borrow(server, sftp_details)
+        try:
+            with entry.lock:
+                try:
+                    yield entry.sftp
+                except BaseException:
+                    if not entry.transport.is_active():
+                        # The connection broke; do not hand it out again.
+                        with self._lock:
+                            self._retire(server, entry)
+                    raise
+        finally:
+            self._release(entry)
+
+    def close_all(self) -> None:
+        """
+        Close every pooled session. Sessions in use are closed when they are returned.
+        """
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+            to_close = [entry for server, entry in sessions.items() if self._retire(server, entry)]
+
+        for entry in to_close:
+            _close(entry.transport, entry.sftp)
+
+
+def _close(transport, sftp):
+    try:
+        sftp.close()
+    finally:
+        transport.close()
+
+
+SFTP_POOL = SFTPSessionPool()
+atexit.register(SFTP_POOL.close_all)
+
+
+class SFTPKeyCache:
+    """
+    An encrypted on-disk cache of keys stored on SFTP servers.
+
+    Each entry is encrypted with a key derived from the SFTP password and a random salt by `derive_key`, with the KDF
+    and cost parameters recorded in the entry. Derived keys are kept in `apikeyper.crypt.kdf.KEY_CACHE`, and an entry
+    that is rewritten keeps its salt, so the KDF only runs on the first load of a process (and again after
+    `DEFAULT_CACHE_TTL`).
+
+    Attributes:
+        cache_dir (str): The directory holding the cache entries.
+        ttl (float): Seconds during which a cached key is used without contacting the server.
+        kdf (str): The KDF that protects new entries ('scrypt' or 'pbkdf2').
+        kdf_params (dict): The cost parameters of the KDF.
+    """
+
+    def __init__(self, ttl: float, cache_dir: Optional[str] = None, kdf: str = DEFAULT_KDF,
+                 kdf_params: Optional[dict] = None):
+        self.ttl = ttl
+        self.cache_dir = cache_dir or DEFAULT_SFTP_CACHE_DIR
+        self.kdf = kdf
+        self.kdf_params = {**DEFAULT_KDF_PARAMS[kdf], **(kdf_params or {})}
+
+    def _path(self, sftp_details):
+        host, port, username = _server_id(sftp_details)
+        name = hashlib.sha256(f"{username}@{host}:{port}{sftp_details['remote_key_path']}".encode("utf-8"))
+        return os.path.join(self.cache_dir, f"{name.hexdigest()[:32]}.json")
+
+    def _cipher(self, sftp_details, salt, kdf, params):
+        cache_key = ("sftp", os.path.abspath(self._path(sftp_details)), kdf, tuple(sorted(params.items())))
+        password = sftp_details["password"]
+
+        if (key := KEY_CACHE.get(cache_key, salt, password)) is None:
+            key = derive_key(password, salt, kdf, **params)
+            KEY_CACHE.put(cache_key, salt, password, key)
+        return Fernet(key)
+
+    def _read(self, sftp_details):
+        with open(self._path(sftp_details), "r") as file:
+            entry = json.load(file)
+        if entry.get("version") != CACHE_FORMAT_VERSION:
+            raise ValueError("Unsupported SFTP cache entry")
+        return entry
+
+    def load(self, sftp_details: dict) -> Optional[dict]:
+        """
+        Load a cache entry.
+
+        Args:
+            sftp_details (dict): The connection details and 'remote_key_path'.
+
+        Returns:
+            dict: The entry ('key', 'validator' and 'fetched_at'), or None if there is no usable entry.
+        """
+        try:
+            entry = self._read(sftp_details)
+            cipher = self._cipher(sftp_details, base64.b64decode(entry["salt"]), entry["kdf"], entry["params"])
+            entry["key"] = cipher.decrypt(entry.pop("token").encode("utf-8"))
+        except (OSError, ValueError, KeyError, TypeError, InvalidToken):
+            return None
+
+        return entry
+
+    def store(self, sftp_details: dict, key: bytes, validator: list, fetched_at: Optional[float] = None) -> None:
+        """
+        Store a cache entry.
+
+        Args:
+            sftp_details (dict): The connection details and 'remote_key_path'.
+            key (bytes): The key.
+            validator (list): The remote file's [mtime, size].
+            fetched_at (float, optional): When the key was validated against the server. Defaults to now.
+        """
+        try:
+            # Keep the salt of the current entry, so its derived key (likely cached) stays valid.
+            current = self._read(sftp_details)
+            if current["kdf"] != self.kdf or current["params"] != self.kdf_params:
+                raise ValueError("The KDF settings changed")
+            salt = base64.b64decode(current["salt"])
+        except (OSError, ValueError, KeyError, TypeError):
+            salt = os.urandom(SALT_LENGTH)
+
+        entry = {
+            "version": CACHE_FORMAT_VERSION,
+            "kdf": self.kdf,
+            "params": self.kdf_params,
+            "salt": base64.b64encode(salt).decode("utf-8"),
+            "token": self._cipher(sftp_details, salt, self.kdf, self.kdf_params).encrypt(key).decode("utf-8"),
+            "validator": list(validator),
+            "fetched_at": time.time() if fetched_at is None else fetched_at,
+        }
+
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+        path = self._path(sftp_details)
+        temp_path = f"{path}.tmp"
+        with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as file:
+            json.dump(entry, file)
+        os.replace(temp_path, path)
+
+    def invalidate(self, sftp_details: dict) -> None:
+        try:
+            os.remove(self._path(sftp_details))
+        except FileNotFoundError:
+            pass
+
+
+def _validator(sftp, remote_path):
+    attributes = sftp.stat(remote_path)
+    return [attributes.st_mtime, attributes.st_size]
+
+
+def get_key_from_sftp(
+    sftp_details: dict,
+    cache_ttl: Optional[float] = None,
+    cache_dir: Optional[str] = None,
+    pool: SFTPSessionPool = SFTP_POOL,
+) -> bytes:
+    """
+    Retrieve the encryption key from an SFTP server.
+
+    Args:
+        sftp_details (dict): A dictionary containing the connection details for the SFTP server.
+        cache_ttl (float, optional): Seconds to use a key cached on disk without contacting the server. After that,
+            the cached key is revalidated against the remote file's mtime and size. None (default) disables the cache.
+        cache_dir (str, optional): The cache directory. Defaults to `sftp_cache` in the data directory.
+        pool (SFTPSessionPool, optional): The session pool to use.
+
+    Returns:
+        bytes: The encryption key.
+    """
+    cache = SFTPKeyCache(cache_ttl, cache_dir) if cache_ttl is not None else None
+    entry = cache.load(sftp_details) if cache else None
+
+    if entry is not None and time.time() - entry["fetched_at"] < cache.ttl:
+        return entry["key"]
+
+    remote_path = sftp_details["remote_key_path"]
+    with pool.session(sftp_details) as sftp:
+        validator = _validator(sftp, remote_path) if cache else None
+
+        if entry is not None and entry["validator"] == validator:
+            cache.store(sftp_details, entry["key"], validator)
+            return entry["key"]
+
+        with sftp.file(remote_path, "r") as remote_file:
+            key = remote_file.read()
+
+    key = key.encode("utf-8") if isinstance(key, str) else key
+    if cache:
+        cache.store(sftp_details, key, validator)
+    return key
+
+
+def put_key_to_sftp(
+    sftp_details: dict,
+    key: bytes,
+    cache_ttl: Optional[float] = None,
+    cache_dir: Optional[str] = None,
+    pool: SFTPSessionPool = SFTP_POOL,
+) -> None:
+    """
+    Store the encryption key on an SFTP server.
+
+    Args:
+        sftp_details (dict): A dictionary containing the connection details for the SFTP server.
+        key (bytes): The encryption key.
+        cache_ttl (float, optional): If not None, the on-disk cache is updated with the new key.
+        cache_dir (str, optional): The cache directory. Defaults to `sftp_cache` in the data directory.
+        pool (SFTPSessionPool, optional): The session pool to use.
+    """
+    remote_path = sftp_details["remote_key_path"]
+    with pool.session(sftp_details) as sftp:
+        with sftp.file(remote_path, "w") as remote_file:
+            remote_file.write(key.decode("utf-8"))
+        validator = _validator(sftp, remote_path) if cache_ttl is not None else None
+
+    if cache_ttl is not None:
+        SFTPKeyCache(cache_ttl, cache_dir).store(sftp_details, key, validator)
+    else:
+        SFTPKeyCache(0, cache_dir).invalidate(sftp_details)
+
+
+class SFTPBackend(KeyBackend):
+    """
+    Stores the key on an SFTP server (`sftp_details`), with pooled sessions and an optional on-disk cache
+    (`sftp_cache_ttl`).
+    """
+
+    capabilities = frozenset({READ, WRITE, CACHEABLE})
+
+    def load(self, encryption_key):
+        return get_key_from_sftp(encryption_key.sftp_details, cache_ttl=encryption_key.sftp_cache_ttl)
+
+    def store(self, encryption_key, key):
+        put_key_to_sftp(encryption_key.sftp_details, key, cache_ttl=encryption_key.sftp_cache_ttl)
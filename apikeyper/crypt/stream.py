@@ -0,0 +1,149 @@
+"""
+Project: APIKeyPER
+Author: Inspyre Softworks - https://inspyre.tech
+Created: 10/19/2026
+File:
+  Name: stream.py
+  Filepath: apikeyper/crypt
+
+This module implements chunked, authenticated streaming encryption (the "STREAM" construction) used for `CryptDB`
+records. Plaintext is cut into fixed-size segments and each segment is sealed with AES-256-GCM under its own nonce:
+
+    nonce = nonce prefix (7 bytes) | segment index (uint32) | final-segment flag (1 byte)
+
+The segment key is derived with HKDF from the record's data key and a random per-stream salt. Because the index and
+the final flag are part of the nonce, segments cannot be reordered, dropped or truncated without failing
+authentication, while a reader only ever needs one segment in memory.
+
+Layout::
+
+    header:   segment size (uint32) | salt (16 bytes) | nonce prefix (7 bytes)
+    segments: ciphertext | tag (16 bytes), all of `segment size` plaintext bytes except the last
+"""
+import os
+import struct
+from typing import Callable, Iterable, Iterator
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+
+DEFAULT_SEGMENT_SIZE = 64 * 1024
+
+SALT_SIZE = 16
+NONCE_PREFIX_SIZE = 7
+TAG_SIZE = 16
+HEADER = struct.Struct(f">I{SALT_SIZE}s{NONCE_PREFIX_SIZE}s")
+SEGMENT_INDEX = struct.Struct(">IB")
+
+HKDF_INFO = b"apikeyper stream v1"
+
+
+class StreamError(ValueError):
+    """
+    Raised when an encrypted stream is truncated, tampered with, or decrypted with the wrong key.
+    """
+
+
+def _segment_cipher(key: bytes, salt: bytes) -> AESGCM:
+    return AESGCM(HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=HKDF_INFO).derive(key))
+
+
+def _nonce(prefix: bytes, index: int, final: bool) -> bytes:
+    return prefix + SEGMENT_INDEX.pack(index, final)
+
+
+def stream_length(plaintext_length: int, segment_size: int = DEFAULT_SEGMENT_SIZE) -> int:
+    """
+    Compute the length of the encrypted stream for a plaintext of the given length.
+
+    Args:
+        plaintext_length (int): The plaintext length.
+        segment_size (int, optional): The plaintext segment size.
+
+    Returns:
+        int: The encrypted stream length, header included.
+    """
+    segments = max(1, -(-plaintext_length // segment_size))
+    return HEADER.size + plaintext_length + segments * TAG_SIZE
+
+
+def encrypt_stream(key: bytes, chunks: Iterable[bytes], segment_size: int = DEFAULT_SEGMENT_SIZE) -> Iterator[bytes]:
+    """
+    Encrypt a stream of plaintext chunks.
+
+    Args:
+        key (bytes): The key material (e.g. a record's data key).
+        chunks (Iterable[bytes]): The plaintext, in chunks of any size.
+        segment_size (int, optional): The plaintext segment size. Defaults to 64 KiB.
+
+    Yields:
+        bytes: The header, then one sealed segment at a time.
+    """
+    if segment_size < 1:
+        raise ValueError("segment_size must be at least 1")
+
+    salt = os.urandom(SALT_SIZE)
+    prefix = os.urandom(NONCE_PREFIX_SIZE)
+    aead = _segment_cipher(key, salt)
+
+    yield HEADER.pack(segment_size, salt, prefix)
+
+    index = 0
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        # Only emit segments once more data follows them, so the final segment is never empty unless all of it is.
+        ready = (len(buffer) - 1) // segment_size * segment_size
+        for start in range(0, ready, segment_size):
+            yield aead.encrypt(_nonce(prefix, index, False), bytes(buffer[start:start + segment_size]), None)
+            index += 1
+        del buffer[:ready]
+
+    yield aead.encrypt(_nonce(prefix, index, True), bytes(buffer), None)
+
+
+def decrypt_stream(key: bytes, read: Callable[[int], bytes], length: int) -> Iterator[bytes]:
+    """
+    Decrypt an encrypted stream one segment at a time.
+
+    Args:
+        key (bytes): The key material the stream was encrypted with.
+        read (Callable[[int], bytes]): Reads the given number of bytes of the stream (e.g. `file.read`).
+        length (int): The total length of the encrypted stream.
+
+    Yields:
+        bytes: The plaintext of each segment, in order.
+
+    Raises:
+        StreamError: If the stream is truncated, has been tampered with, or the key is wrong.
+    """
+    header = read(HEADER.size)
+    if len(header) != HEADER.size:
+        raise StreamError("Truncated stream header")
+
+    segment_size, salt, prefix = HEADER.unpack(header)
+    aead = _segment_cipher(key, salt)
+    remaining = length - HEADER.size
+    index = 0
+
+    while True:
+        final = remaining <= segment_size + TAG_SIZE
+        size = remaining if final else segment_size + TAG_SIZE
+
+        segment = read(size)
+        if size < TAG_SIZE or len(segment) != size:
+            raise StreamError("Truncated stream")
+
+        try:
+            yield aead.decrypt(_nonce(prefix, index, final), segment, None)
+        except InvalidTag as e:
+            raise StreamError(f"Segment {index} failed authentication") from e
+
+        if final:
+            return
+
+        remaining -= size
+        index += 1
@@ -1,24 +1,99 @@
 from __future__ import annotations
 
+import functools
+import logging
 import sqlite3
-import json
-import xml.etree.ElementTree as ET
+import time
 from typing import Optional
 from apikeyper.__about__ import __DEFAULT_DATA_DIR__
 from apikeyper.log_engine import Loggable, LOG_DEVICE as ROOT_LOGGER
+from apikeyper.telemetry.metrics import METRICS
+from apikeyper.telemetry.profiling import PROFILING
+from apikeyper.telemetry.tracing import TRACING
 
 
 logger = ROOT_LOGGER.get_child()
 log = logger.logger
 
 DEFAULT_DB_FILEPATH = __DEFAULT_DATA_DIR__.joinpath('apikeyper.db')
-log.debug(f'Default DB filepath is {DEFAULT_DB_FILEPATH}')
+MAX_QUERY_PARAMETERS = 500
+log.debug('Default DB filepath is %s', DEFAULT_DB_FILEPATH)
 
 """
 This module defines a class, APIKeyDB, for managing API keys stored in a SQLite database.
+
+The json and xml modules are only imported by the exports, so that looking up keys does not pay for them.
 """
 
 
+def _row_count(result, cursor):
+    if result is None:
+        # Statements that return nothing (INSERT, DELETE) report the rows they changed.
+        return max(cursor.rowcount, 0)
+    if isinstance(result, (list, dict)):
+        return len(result)
+    return 1
+
+
+def _logged_operation(op, has_service=True):
+    """
+    Record a call of an APIKeyDB method in the 'db' operation metrics (see `apikeyper.telemetry.metrics`), trace it
+    as an 'apikeyper.db.<op>' span with its service and row count (see `apikeyper.telemetry.tracing`), and log it at
+    DEBUG level with its operation name, service and duration as the 'op', 'service' and 'duration_ms' fields of the
+    record (which the JSON log format writes out). When none of those are on, the call is not timed.
+
+    Args:
+        op (str): The operation name.
+        has_service (bool, optional): Whether the first argument of the method is a service name. Defaults to True.
+    """
+    def decorator(method):
+        metrics = METRICS.operation('db', op)
+        span_name = f'apikeyper.db.{op}'
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            debug = log.isEnabledFor(logging.DEBUG)
+            tracing = TRACING.enabled
+            if not (debug or tracing or METRICS.enabled):
+                return method(self, *args, **kwargs)
+
+            service = (args[0] if args else kwargs.get('service')) if has_service else None
+            if not isinstance(service, str):
+                service = None
+
+            span = None
+            if tracing:
+                span = TRACING.tracer.start_span(span_name, {'service': service} if service is not None else None)
+
+            start = time.perf_counter_ns()
+            try:
+                result = method(self, *args, **kwargs)
+                if span is not None:
+                    span.set_attribute('row_count', _row_count(result, self.cursor))
+                return result
+            except Exception as error:
+                if METRICS.enabled:
+                    metrics.errors.inc()
+                if span is not None:
+                    span.record_exception(error)
+                raise
+            finally:
+                duration_ns = time.perf_counter_ns() - start
+                if span is not None:
+                    TRACING.tracer.end_span(span)
+                if METRICS.enabled:
+                    metrics.seconds.observe(duration_ns / 1e9)
+                if debug:
+                    log.debug(
+                        '%s(%s) took %.3f ms', op, service or '', duration_ns / 1e6,
+                        extra={'op': op, 'service': service, 'duration_ms': round(duration_ns / 1e6, 3)},
+                    )
+
+        return wrapper
+
+    return decorator
+
+
 class APIKeyDB:
     """
     This class provides methods to interact with a SQLite database of API keys. It also supports
@@ -30,18 +105,20 @@ class APIKeyDB:
         cursor (sqlite3.Cursor): The cursor for executing SQL statements.
     """
 
-    def __init__(self, db_file_path: Optional[str] = None) -> None:
+    def __init__(self, db_file_path: Optional[str] = None, check_same_thread: bool = True) -> None:
         """
         Initializes the APIKeyDB with a connection to the specified SQLite database file.
 
         Parameters:
             db_file_path: The path to the SQLite database file. If None, uses the default path.
+            check_same_thread: Whether only the creating thread may use the connection. Pass False only if access
+                is serialized by the caller.
         """
         if db_file_path is None:
             db_file_path = DEFAULT_DB_FILEPATH
 
         self.db_file_path = db_file_path
-        self.conn = sqlite3.connect(db_file_path)
+        self.conn = sqlite3.connect(db_file_path, check_same_thread=check_same_thread)
         self.cursor = self.conn.cursor()
         self.cursor.execute(
             """CREATE TABLE IF NOT EXISTS apikeys (
@@ -54,6 +131,7 @@ class APIKeyDB:
                                     PRIMARY KEY (service, key_name))"""
         )
 
+    @_logged_operation('add_key')
     def add_key(self, service: str, key_name: str, key: str, added: str, status: str, revoked_on: Optional[str] = None) -> None:
         """
         Adds a new API key to the database using INSERT OR REPLACE to update existing entries.
@@ -72,6 +150,7 @@ class APIKeyDB:
         )
         self.conn.commit()
 
+    @_logged_operation('get_key')
     def get_key(self, service: str, key_name: Optional[str] = None, only_active: bool = True) -> Optional[str]:
         """
         Retrieves an API key for a specific service from the database.
@@ -102,6 +181,7 @@ class APIKeyDB:
         result = self.cursor.fetchone()
         return result[0] if result else None
 
+    @_logged_operation('delete_key')
     def delete_key(self, service: str, key_name: Optional[str] = None) -> None:
         """
         Deletes an API key for a specific service from the database.
@@ -116,6 +196,7 @@ class APIKeyDB:
             self.cursor.execute("DELETE FROM apikeys WHERE service=?", (service,))
         self.conn.commit()
 
+    @_logged_operation('list_keys_for_service')
     def list_keys_for_service(self, service: str) -> list[tuple]:
         """
         Lists all API keys for a specific service.
@@ -129,6 +210,7 @@ class APIKeyDB:
         self.cursor.execute("SELECT * FROM apikeys WHERE service=?", (service,))
         return self.cursor.fetchall()
 
+    @_logged_operation('list_services')
     def list_services(self) -> list[str]:
         """
         Lists all unique services in the database.
@@ -139,6 +221,7 @@ class APIKeyDB:
         self.cursor.execute("SELECT DISTINCT service FROM apikeys")
         return [service[0] for service in self.cursor.fetchall()]
 
+    @_logged_operation('get_key')
     def get_key(self, service):
         """
         Retrieves the first active API key for a specific service from the database.
@@ -156,6 +239,34 @@ class APIKeyDB:
         )
         return self.cursor.fetchone()
 
+    @_logged_operation('get_keys')
+    def get_keys(self, services) -> dict:
+        """
+        Retrieves the most recent active API key of several services with as few queries as possible.
+
+        Parameters:
+            services: The services (an iterable of names) to retrieve the keys for.
+
+        Returns:
+            The API key row (as returned by `get_key`) of each service that has one, by service.
+        """
+        services = list(dict.fromkeys(services))
+        rows = {}
+
+        # Stay well below SQLite's limit on the number of query parameters.
+        for start in range(0, len(services), MAX_QUERY_PARAMETERS):
+            batch = services[start:start + MAX_QUERY_PARAMETERS]
+            self.cursor.execute(
+                f"SELECT * FROM apikeys WHERE service IN ({','.join('?' * len(batch))}) AND status='active' "
+                "ORDER BY added DESC",
+                batch,
+            )
+            for row in self.cursor.fetchall():
+                rows.setdefault(row[0], row)
+
+        return rows
+
+    @_logged_operation('delete_key')
     def delete_key(self, service):
         """
         Deletes all API keys for a specific service from the database.
@@ -175,6 +286,8 @@ class APIKeyDB:
         """
         self.conn.close()
         
+    @_logged_operation('export_db_as_json', has_service=False)
+    @PROFILING.operation('db.export_db_as_json')
     def export_db_as_json(self, export_path, redact_secrets=True):
         """
         Exports the contents of the database to a JSON file.
@@ -200,9 +313,13 @@ class APIKeyDB:
                 for key in keys
             ]
 
+        import json
+
         with open(export_path, "w") as json_file:
             json.dump(data, json_file, indent=4)
 
+    @_logged_operation('export_db_as_xml', has_service=False)
+    @PROFILING.operation('db.export_db_as_xml')
     def export_db_as_xml(self, export_path, redact_secrets=True):
         """
         Exports the contents of the database to an XML file.
@@ -212,6 +329,8 @@ class APIKeyDB:
             redact_secrets (bool): Whether to redact API key values. Defaults to True for security.
 
         """
+        import xml.etree.ElementTree as ET
+
         root = ET.Element("services")
 
         all_services = self.list_services()
@@ -9,6 +9,13 @@ with support for both console and file outputs, featuring rich, colored console
 also incorporates a Singleton design pattern for the Logger class, ensuring consistent logging behavior across the
 application.
 
+All loggers share one sink (see `apikeyper.log_engine.sink`): a logger only puts its records on a queue, and a
+background listener writes them to a single Rich console handler and a single file handler per log file.
+Importing the module configures nothing and touches no files: levels and the log file come from the environment (or a
+config file it names) and default to WARNING (see `apikeyper.log_engine.settings`), and the log file is only created
+once a record is written to it. Log files are rotated by size and/or time, and rotated segments are compressed in the
+background (see `apikeyper.log_engine.rotation`). Log files are written as text or, for log pipelines, as JSON lines.
+
 Furthermore, the module provides a meta-class 'Loggable' which can be inherited by other classes to instantly equip them
 with logging capabilities.
 
@@ -19,23 +26,25 @@ Key components:
 Dependencies:
     - logging: Standard library module for event logging.
     - RichHandler from rich.logging: Provides rich, colored output for console logs.
-    - inspect: Standard library module for introspecting live objects.
+    - apikeyper.log_engine.sink: The shared queue-based log sink.
+    - sys: `sys._getframe` is used to find the caller of `get_child` without building the whole stack.
     - apikeyper.__about__: Module providing metadata about the APIKeyPER application.
     - apikeyper.log_engine.helpers: Helper functions for the logging engine.
 """
 
-import inspect
 import logging
-from rich.logging import RichHandler
+import sys
 from apikeyper.__about__ import __PROG__ as PROG_NAME
 from apikeyper.log_engine.helpers import (
     translate_to_logging_level,
     clean_module_name,
     CustomFormatter,
 )
+from apikeyper.log_engine.settings import DEFAULT_LEVEL, get_settings
+from apikeyper.log_engine.sink import SINK
 
 
-DEFAULT_LOGGING_LEVEL = logging.DEBUG
+DEFAULT_LOGGING_LEVEL = DEFAULT_LEVEL
 
 
 class Logger:
@@ -72,9 +81,15 @@ class Logger:
     def __init__(
         self,
         name,
-        console_level=DEFAULT_LOGGING_LEVEL,
-        file_level=logging.DEBUG,
-        filename="app.log",
+        console_level=None,
+        file_level=None,
+        filename=None,
+        file_format=None,
+        max_bytes=None,
+        when=None,
+        interval=None,
+        backup_count=None,
+        compress=None,
     ):
         """
         Initializes a logger instance. Sets up console and file handlers and establish logging levels.
@@ -84,22 +99,33 @@ class Logger:
                 The name of the logger.
 
             console_level (logging level object, optional):
-                The logging level for the console. Defaults to DEBUG.
+                The logging level for the console. Defaults to $APIKEYPER_CONSOLE_LOG_LEVEL or $APIKEYPER_LOG_LEVEL,
+                the log config file, or WARNING (see `apikeyper.log_engine.settings`).
                 Must be a member of logging module's set of level constants (like logging.INFO or logging.DEBUG).
 
             file_level (logging level object, optional):
-                The logging level for the file. Defaults to DEBUG.
+                The logging level for the file. Defaults to $APIKEYPER_FILE_LOG_LEVEL or $APIKEYPER_LOG_LEVEL, the log
+                config file, or WARNING.
                 Must be a member of logging module's set of level constants (like logging.INFO or logging.DEBUG).
 
-            filename (str, optional): The name of the log file. Defaults to 'app.log'.
+            filename (str, optional): The name of the log file. Defaults to $APIKEYPER_LOG_FILE, the log config
+                file, or 'app.log'. The file is only created once something is logged to it.
+
+            file_format (str, optional):
+                The format of the log file; see `set_file_format`. Unless given, a new log file uses the format of the
+                logging settings ('text' by default), and a file already in use keeps its format.
+
+            max_bytes, when, interval, backup_count, compress (optional):
+                How the log file is rotated; see `set_rotation`. Unless given, a new log file is rotated as the logging
+                settings say (10 MiB, 5 compressed segments by default), and a file already in use keeps its policy.
         """
         if not hasattr(self, "logger"):
+            settings = get_settings()
             self.__name = name
             self.logger = logging.getLogger(name)
-            self.logger.setLevel(logging.DEBUG)
-            self.__console_level = console_level
-            self.filename = filename
-            self.__file_level = file_level or DEFAULT_LOGGING_LEVEL
+            self.__console_level = settings["console_level"] if console_level is None else console_level
+            self.filename = filename or settings["filename"]
+            self.__file_level = settings["file_level"] if file_level is None else file_level
 
             # Remove existing handlers
             for handler in self.logger.handlers[:]:
@@ -108,47 +134,63 @@ class Logger:
             # Prevent log records from being passed to the handlers of ancestor loggers.
             self.logger.propagate = False
 
+            # Every logger only enqueues its records; the shared sink formats and writes them on its own thread.
+            self.logger.addHandler(SINK.handler)
             self.set_up_console()
             self.set_up_file()
-            self.children = []
+            self.set_rotation(max_bytes, when, interval, backup_count, compress)
+            if file_format is not None:
+                self.set_file_format(file_format)
+            self.__update_route()
+            # Child loggers by their full name.
+            self.children = {}
 
-    def set_up_console(self):
+    @property
+    def console_level(self):
+        return self.__console_level
+
+    @property
+    def file_level(self):
+        return self.__file_level
+
+    @property
+    def rotation(self):
         """
-        Configures and attaches a console handler to the logger. This method uses the RichHandler to produce
-        colored and formatted console outputs.
+        RotationPolicy: How this logger's file is rotated. It is shared by every logger writing to the file.
         """
+        return SINK.rotations[self.filename]
 
-        console_handler = RichHandler(
-            show_level=True,
-            markup=True,
-            rich_tracebacks=True,
-            tracebacks_show_locals=False,
-        )
-        formatter = CustomFormatter(
-            "[green][bold][%(name)s][bold][/green] - %(message)s"
-        )
+    @property
+    def file_format(self):
+        """
+        str: The format of this logger's file, 'text' or 'json'. It is shared by every logger writing to the file.
+        """
+        return SINK.file_formats[self.filename]
 
-        console_handler.setFormatter(formatter)
-        console_handler.setLevel(self.__console_level)
-        self.logger.addHandler(console_handler)
+    def __update_route(self):
+        # Records below both levels are dropped by the logger itself, before they reach the queue.
+        self.logger.setLevel(min(self.__console_level, self.__file_level))
+        SINK.route(self.__name, self.__console_level, self.__file_level, self.filename)
+
+    def set_up_console(self):
+        """
+        Makes sure the shared console handler exists. It uses the RichHandler to produce colored and formatted
+        console outputs, and is shared by all loggers.
+        """
+
+        SINK.set_up_console()
 
     def set_up_file(self):
         """
-        Configures and attaches a file handler to the logger. This ensures that log messages are also written
-        to a specified file.
+        Makes sure the shared file handler for this logger's file exists. This ensures that log messages are also
+        written to a specified file, which is opened only once however many loggers write to it.
         """
 
-        file_handler = logging.FileHandler(self.filename)
-        file_handler.setLevel(self.__file_level)
-        formatter = CustomFormatter(
-            "%(asctime)s - [%(name)s] - %(levelname)s - %(message)s"
-        )
-        file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
+        SINK.set_up_file(self.filename)
 
     def set_level(self, console_level=None, file_level=None):
         """
-        Updates the logging levels for both the console and file handlers. If provided, also updates child loggers.
+        Updates the logging levels for both the console and file output. If provided, also updates child loggers.
 
         Parameters:
             console_level (logging level object, optional):
@@ -159,40 +201,111 @@ class Logger:
         """
 
         if console_level is not None:
-            self.logger.handlers[0].setLevel(console_level)
-            for child in self.children:
+            self.__console_level = console_level
+            for child in self.children.values():
                 child.set_level(console_level=console_level)
 
         if file_level is not None:
-            self.logger.handlers[1].setLevel(file_level)
-            for child in self.children:
+            self.__file_level = file_level
+            for child in self.children.values():
                 child.set_level(file_level=file_level)
 
+        self.__update_route()
+
+    def set_rotation(self, max_bytes=None, when=None, interval=None, backup_count=None, compress=None):
+        """
+        Updates how this logger's file is rotated. Only the given settings are changed, and the change applies to every
+        logger writing to the same file.
+
+        Parameters:
+            max_bytes (int, optional):
+                Rotate the file before it grows past this many bytes. 0 turns size-based rotation off.
+
+            when (str, optional):
+                Also rotate the file every `interval` seconds ('S'), minutes ('M'), hours ('H'), days ('D'), or at
+                'midnight'. An empty string turns time-based rotation off.
+
+            interval (int, optional):
+                The number of `when` units between rotations.
+
+            backup_count (int, optional):
+                The number of rotated segments to keep. 0 keeps them all.
+
+            compress (bool, optional):
+                Whether rotated segments are gzip-compressed, on a background thread.
+
+        Raises:
+            ValueError: If the resulting policy does not make sense.
+        """
+        changes = {
+            "max_bytes": max_bytes,
+            "when": when,
+            "interval": interval,
+            "backup_count": backup_count,
+            "compress": compress,
+        }
+        changes = {key: value for key, value in changes.items() if value is not None}
+        if changes:
+            SINK.set_up_file(self.filename, self.rotation._replace(**changes))
+
+    def set_file_format(self, file_format):
+        """
+        Updates the format of this logger's file, for every logger writing to it.
+
+        Parameters:
+            file_format (str):
+                'text' for plain text lines, or 'json' for JSON lines with the time, level, logger, message, path and
+                line of each record, plus the operation, service and duration of database calls.
+
+        Raises:
+            ValueError: If the format is unknown.
+        """
+        SINK.set_up_file(self.filename, file_format=file_format)
+
     def get_child(self, name=None, console_level=None, file_level=None):
-        console_level = console_level or DEFAULT_LOGGING_LEVEL
+        """
+        Returns the child logger with the given name, creating it on first use.
+
+        Parameters:
+            name (str, optional):
+                The name of the child logger. Defaults to the name of the calling function, method or module.
 
-        # Get the stack frame of the caller
-        caller_frame = inspect.stack()[1]
+            console_level (logging level object, optional):
+                The console logging level of a new child logger. Defaults to this logger's.
+
+            file_level (logging level object, optional):
+                The file logging level of a new child logger. Defaults to this logger's.
+
+        Returns:
+            Logger: The child logger.
+        """
+
+        # Only the caller's frame is needed; unlike inspect.stack(), this reads no source files.
+        caller_frame = sys._getframe(1)
 
         # If no name is provided, use the name of the calling function/method/class
         if name is None:
-            name = caller_frame.function
+            name = caller_frame.f_code.co_name
 
         # Check if the caller is a class or a function/method
-        caller_self = caller_frame.frame.f_locals.get("self", None)
+        caller_self = caller_frame.f_locals.get("self", None)
 
         # Determine the separator
         separator = ":" if caller_self and hasattr(caller_self, name) else "."
         child_logger_name = f"{self.logger.name}{separator}{name}"
 
         # Check if child logger already exists
-        for child in self.children:
-            if child.logger.name == child_logger_name:
-                return child
+        child_logger = self.children.get(child_logger_name)
+        if child_logger is not None:
+            return child_logger
 
         # If child logger doesn't exist, create a new one
-        child_logger = Logger(child_logger_name, console_level, file_level)
-        self.children.append(child_logger)
+        child_logger = self.children[child_logger_name] = Logger(
+            child_logger_name,
+            self.__console_level if console_level is None else console_level,
+            self.__file_level if file_level is None else file_level,
+            self.filename,
+        )
         return child_logger
 
     def get_child_names(self) -> list[str]:
@@ -204,26 +317,38 @@ class Logger:
                  A list containing the names of all child loggers.
         """
 
-        return [child.logger.name for child in self.children]
+        return list(self.children)
 
     def find_child_by_name(
         self,
         name: str,
     ):
-        names = self.get_child_names()
+        """
+        Finds a child logger by its full name (e.g. 'APIKeyPER.ui') or by its name relative to this logger ('ui').
 
+        Parameters:
+            name (str): The name of the child logger.
 
-LOG_DEVICE = Logger(PROG_NAME, DEFAULT_LOGGING_LEVEL)
+        Returns:
+            Logger or None: The child logger, or None if there is no such child.
+        """
+        child = self.children.get(name)
+        if child is None:
+            for separator in ".:":
+                child = self.children.get(f"{self.logger.name}{separator}{name}")
+                if child is not None:
+                    break
+        return child
+
+
+LOG_DEVICE = Logger(PROG_NAME)
 MOD_LOG_DEVICE = LOG_DEVICE.get_child("log_engine")
 MOD_LOGGER = MOD_LOG_DEVICE.logger
-MOD_LOGGER.debug(f"Started logger for {__name__}.")
+MOD_LOGGER.debug("Started logger for %s.", __name__)
 
 add_child = LOG_DEVICE.get_child
 
 
-import inspect
-
-
 def _get_parent_logging_device():
     """
     Determines the parent logging device by inspecting the caller's log_device or parent_log_device attribute.
@@ -231,7 +356,7 @@ def _get_parent_logging_device():
     Returns:
         Logger: The parent logging device.
     """
-    caller_frame = inspect.currentframe().f_back
+    caller_frame = sys._getframe(1)
     caller_locals = caller_frame.f_locals
 
     if "logger" in caller_locals:
@@ -291,9 +416,7 @@ class Loggable:
             self.__is_member__()
 
         if name is None:
-            name = inspect.stack()[1][
-                3
-            ]  # Get the name of the calling function if no name is provided
+            name = sys._getframe(1).f_code.co_name  # Get the name of the calling function if no name is provided
 
         return self.log_device.get_child(name)
 
@@ -306,21 +429,22 @@ class Loggable:
         """
         log_device = self.log_device.get_child("__is_member__")
         log = log_device.logger
+        debug = log.isEnabledFor(logging.DEBUG)
 
-        current_frame = inspect.currentframe()
-        log.debug(f"Current frame: {current_frame}")
-
+        current_frame = sys._getframe()
         caller_frame = current_frame.f_back
-        log.debug(f"Caller frame: {caller_frame}")
-
         caller_self = caller_frame.f_locals.get("self", None)
-        log.debug(f"Caller self: {caller_self}")
 
-        log.debug("Checking if caller is a member of this class...")
+        if debug:
+            log.debug("Current frame: %s", current_frame)
+            log.debug("Caller frame: %s", caller_frame)
+            log.debug("Caller self: %s", caller_self)
+            log.debug("Checking if caller is a member of this class...")
         if not isinstance(caller_self, self.__class__):
             raise PermissionError(
                 "Access denied.\n"
                 f"Method can only be accessed by members of the same class. {caller_self.__class__.__name__} is not such a member"
             )
 
-        log.debug(f"Access granted to {caller_self.__class__.__name__}")
+        if debug:
+            log.debug("Access granted to %s", caller_self.__class__.__name__)
@@ -1,5 +1,7 @@
+import functools
 import logging
 import re
+import time
 from logging import Formatter
 
 
@@ -9,6 +11,29 @@ performing certain string and number operations.
 """
 
 
+IPYTHON_PATHNAME_PATTERN = re.compile(r"<ipython-input-\d+-\w+>|<module>")
+IPYTHON_MODULE_PATTERN = re.compile(r"<ipython-input-\d+-\w+>")
+
+STRUCTURED_FIELDS = ("op", "service", "duration_ms")
+"""Attributes that are copied from a record into its JSON line, when set (with `extra=` on the log call)."""
+
+
+@functools.lru_cache(maxsize=1024)
+def clean_pathname(pathname):
+    """
+    Replaces <ipython-input-...> and <module> patterns in a record's pathname with 'iPython'.
+
+    A program logs from a handful of files, so the result is cached per pathname.
+
+    Args:
+        pathname (str): The pathname to clean.
+
+    Returns:
+        str: The cleaned pathname.
+    """
+    return IPYTHON_PATHNAME_PATTERN.sub("iPython", pathname)
+
+
 class CustomFormatter(Formatter):
     """
     CustomFormatter extends the logging.Formatter class to provide a custom
@@ -27,12 +52,79 @@ class CustomFormatter(Formatter):
             str: The formatted record.
         """
         # Replace <ipython-input-...> pattern in record.pathname
-        record.pathname = re.sub(
-            r"<ipython-input-\d+-\w+>|<module>", "iPython", record.pathname
-        )
+        record.pathname = clean_pathname(record.pathname)
         return super().format(record)
 
 
+class JSONFormatter(Formatter):
+    """
+    Formats each record as one line of JSON, so that log pipelines can ingest it without parsing text.
+
+    Every line has the keys 'time' (ISO 8601, UTC, with milliseconds), 'level', 'logger', 'message', 'path' and
+    'line', followed by the `STRUCTURED_FIELDS` the record has (for example the 'op', 'service' and 'duration_ms' of
+    APIKeyDB calls) and, if there is one, the formatted exception as 'exc'.
+    """
+
+    def __init__(self):
+        import json
+
+        super().__init__()
+        self._encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str).encode
+        self._second = None
+        self._second_text = ""
+
+    def format_time(self, created):
+        """
+        Formats a record's creation time. The date and time are only formatted again when the second changes.
+
+        Args:
+            created (float): The creation time, as a timestamp.
+
+        Returns:
+            str: The time, like '2026-10-19T13:09:32.157Z'.
+        """
+        second = int(created)
+        if second != self._second:
+            self._second_text = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self._second = second
+        return "%s.%03dZ" % (self._second_text, (created - second) * 1000)
+
+    def format(self, record):
+        """
+        Formats a record as a JSON line (without the line break).
+
+        Args:
+            record (logging.LogRecord): The record to format.
+
+        Returns:
+            str: The JSON line.
+        """
+        line = {
+            "time": self.format_time(record.created),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "path": clean_pathname(record.pathname),
+            "line": record.lineno,
+        }
+
+        record_fields = record.__dict__
+        for field in STRUCTURED_FIELDS:
+            value = record_fields.get(field)
+            if value is not None:
+                line[field] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            # Records from the sink's queue carry only the text; their exc_info is dropped when they are enqueued.
+            line["exc"] = record.exc_text
+        if record.stack_info:
+            line["stack"] = self.formatStack(record.stack_info)
+
+        return self._encode(line)
+
+
 def clean_module_name(module_name):
     """
     Replaces <ipython-input-...> pattern in the given module name with 'iPython'.
@@ -43,7 +135,7 @@ def clean_module_name(module_name):
     Returns:
         str: The cleaned module name.
     """
-    return re.sub(r"<ipython-input-\d+-\w+>", "iPython", module_name)
+    return IPYTHON_MODULE_PATTERN.sub("iPython", module_name)
 
 
 def is_number(string, force_integer=False, rounding=None):
@@ -0,0 +1,294 @@
+"""
+This module contains the rotating log file handler of the logging engine.
+
+A log file is rotated when it would grow past a size limit, when a time interval has passed, or both. The rotated
+segment is renamed to `<file>.<YYYYmmdd-HHMMSS>` and then gzip-compressed by a background thread, so neither the
+listener thread nor the logging threads wait on the compression. Only the newest `backup_count` segments are kept.
+
+A `RotationPolicy` describes when to rotate and what to keep::
+
+    RotationPolicy(max_bytes=50 * 1024 * 1024, when="midnight", backup_count=14)
+"""
+
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import traceback
+from typing import NamedTuple, Optional
+
+
+TIME_UNITS = {"S": 1, "M": 60, "H": 60 * 60, "D": 24 * 60 * 60}
+"""The length, in seconds, of the time units `RotationPolicy.when` accepts, besides 'midnight'."""
+
+_STAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+
+class RotationPolicy(NamedTuple):
+    """
+    When a log file is rotated, and how many rotated segments are kept.
+
+    Attributes:
+        max_bytes (int): Rotate before the file would grow past this size. 0 disables size-based rotation.
+        when (str or None): Rotate every `interval` seconds ('S'), minutes ('M'), hours ('H'), days ('D'), or at
+            midnight ('midnight'). None disables time-based rotation.
+        interval (int): The number of `when` units between rotations.
+        backup_count (int): The number of rotated segments to keep. 0 keeps them all.
+        compress (bool): Whether rotated segments are gzip-compressed.
+    """
+
+    max_bytes: int = 10 * 1024 * 1024
+    when: Optional[str] = None
+    interval: int = 1
+    backup_count: int = 5
+    compress: bool = True
+
+
+DEFAULT_ROTATION = RotationPolicy()
+
+
+def check_policy(policy: RotationPolicy) -> RotationPolicy:
+    """
+    Check that a rotation policy makes sense.
+
+    Args:
+        policy (RotationPolicy): The policy.
+
+    Returns:
+        RotationPolicy: The policy, with `when` in upper case (or None, if it was empty).
+
+    Raises:
+        ValueError: If a size, interval or count is negative, or `when` is not a known unit.
+    """
+    if policy.max_bytes < 0 or policy.backup_count < 0:
+        raise ValueError(f"max_bytes and backup_count must not be negative: {policy}")
+    if policy.interval < 1:
+        raise ValueError(f"interval must be at least 1: {policy}")
+
+    if not policy.when:
+        policy = policy._replace(when=None)
+    else:
+        when = policy.when.upper()
+        if when not in TIME_UNITS and when != "MIDNIGHT":
+            raise ValueError(f"Unknown rotation interval {policy.when!r}; use S, M, H, D or midnight.")
+        policy = policy._replace(when=when)
+    return policy
+
+
+def next_rollover(policy: RotationPolicy, start: float) -> Optional[float]:
+    """
+    Work out when a file started at `start` is due for time-based rotation.
+
+    Args:
+        policy (RotationPolicy): The rotation policy.
+        start (float): The time the file was started, as a timestamp.
+
+    Returns:
+        float or None: The time of the next rotation, or None if the policy has no time-based rotation.
+    """
+    if policy.when is None:
+        return None
+
+    if policy.when.upper() == "MIDNIGHT":
+        import datetime
+
+        midnight = datetime.datetime.fromtimestamp(start).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (midnight + datetime.timedelta(days=policy.interval)).timestamp()
+    return start + TIME_UNITS[policy.when.upper()] * policy.interval
+
+
+class Compressor:
+    """
+    Compresses rotated log segments, one at a time, on a background thread that is started on first use.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, path, then=None):
+        """
+        Queue a file for compression.
+
+        Args:
+            path (str): The file. It is replaced by `<path>.gz`.
+            then (callable, optional): Called, on the background thread, once the file is compressed.
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="apikeyper-log-compressor", daemon=True)
+                self._thread.start()
+        self._queue.put((path, then))
+
+    def join(self):
+        """
+        Wait until every queued file is compressed.
+        """
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            path, then = self._queue.get()
+            try:
+                compress_file(path)
+                if then is not None:
+                    then()
+            except Exception:
+                # Same policy as logging.Handler.handleError: report, but never take the process down.
+                if logging.raiseExceptions:
+                    traceback.print_exc(file=sys.stderr)
+            finally:
+                self._queue.task_done()
+
+
+COMPRESSOR = Compressor()
+
+
+def compress_file(path):
+    """
+    Gzip a file into `<path>.gz` and remove the original. The compressed file only appears once it is complete.
+
+    Args:
+        path (str): The file.
+    """
+    import gzip
+    import shutil
+
+    if not os.path.exists(path):
+        return
+
+    temporary = f"{path}.gz.tmp"
+    with open(path, "rb") as source, gzip.open(temporary, "wb") as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+    os.replace(temporary, f"{path}.gz")
+    os.remove(path)
+
+
+class RotatingFileHandler(logging.FileHandler):
+    """
+    A file handler that rotates its file by size and/or time, hands the rotated segments to a background
+    `Compressor`, and deletes the oldest ones.
+
+    The file is opened when the first record is written. The size of the file (in characters, which is bytes for ASCII
+    records) is tracked as records are written, so deciding whether to rotate costs no system call.
+    """
+
+    def __init__(self, filename, policy: RotationPolicy = DEFAULT_ROTATION, compressor: Compressor = None,
+                 encoding="utf-8"):
+        super().__init__(filename, mode="a", encoding=encoding, delay=True)
+        self.compressor = compressor or COMPRESSOR
+        self._size = None
+        self._last_segment = ("", 0)
+        self.policy = check_policy(policy)
+
+        try:
+            started = os.stat(self.baseFilename).st_mtime
+        except FileNotFoundError:
+            started = time.time()
+        self.rollover_at = next_rollover(self.policy, started)
+
+    def set_policy(self, policy: RotationPolicy):
+        """
+        Change the rotation policy. The current file is kept, and the time of the next rotation is counted from now.
+
+        Args:
+            policy (RotationPolicy): The new policy.
+        """
+        policy = check_policy(policy)
+        with self.lock:
+            self.policy = policy
+            self.rollover_at = next_rollover(policy, time.time())
+
+    def should_rollover(self, length: int) -> bool:
+        """
+        Check whether the file must be rotated before `length` more characters are written to it.
+        """
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        return 0 < self.policy.max_bytes < self._size + length and self._size > 0
+
+    def emit(self, record):
+        try:
+            message = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+                self._size = self.stream.tell()
+
+            if self.should_rollover(len(message)):
+                self.doRollover()
+                self.stream = self._open()
+
+            self.stream.write(message)
+            self.stream.flush()
+            self._size += len(message)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def doRollover(self):
+        """
+        Rename the current file to a timestamped segment, queue it for compression, and start a new file.
+        """
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            segment = self._segment_name()
+            os.replace(self.baseFilename, segment)
+            if self.policy.compress:
+                # Segments are only pruned once the previous ones are compressed, so none is removed mid-compression.
+                self.compressor.submit(segment, self.prune)
+            else:
+                self.prune()
+
+        self._size = 0
+        self.rollover_at = next_rollover(self.policy, time.time())
+
+    def _segment_name(self):
+        # Segments rotated within the same second are numbered. The numbers only go up, so a name freed by pruning is
+        # never reused for a newer segment, which would then sort as the oldest.
+        stamp = time.strftime(_STAMP_FORMAT)
+        last_stamp, number = self._last_segment
+        number = number + 1 if stamp == last_stamp else 0
+
+        while True:
+            name = f"{self.baseFilename}.{stamp}" + (f".{number}" if number else "")
+            if not (os.path.exists(name) or os.path.exists(f"{name}.gz")):
+                break
+            number += 1
+
+        self._last_segment = (stamp, number)
+        return name
+
+    def segments(self) -> list:
+        """
+        list[str]: The paths of the rotated segments of this file, oldest first.
+        """
+        directory, basename = os.path.split(self.baseFilename)
+        pattern = re.compile(rf"^{re.escape(basename)}\.(\d{{8}}-\d{{6}})(?:\.(\d+))?(?:\.gz)?$")
+
+        found = []
+        for entry in os.listdir(directory or "."):
+            match = pattern.match(entry)
+            if match:
+                found.append(((match.group(1), int(match.group(2) or 0)), os.path.join(directory, entry)))
+        return [path for _, path in sorted(found)]
+
+    def prune(self):
+        """
+        Delete the oldest rotated segments, keeping `policy.backup_count` of them.
+        """
+        if not self.policy.backup_count:
+            return
+
+        for path in self.segments()[:-self.policy.backup_count]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
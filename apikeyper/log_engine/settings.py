@@ -0,0 +1,241 @@
+"""
+This module works out the logging configuration of the logging engine.
+
+The settings are read once, when the first `Logger` is created, from (in order of precedence):
+
+1. Environment variables:
+    - APIKEYPER_LOG_LEVEL: The level of both the console and the log file.
+    - APIKEYPER_CONSOLE_LOG_LEVEL / APIKEYPER_FILE_LOG_LEVEL: The level of one of them.
+    - APIKEYPER_LOG_FILE: The log file.
+    - APIKEYPER_LOG_FORMAT: The format of the log file: "text" lines or "json" lines.
+    - APIKEYPER_LOG_MAX_BYTES: Rotate the log file before it grows past this size ("10485760", "512K", "50M", "1G").
+    - APIKEYPER_LOG_ROTATE_WHEN / APIKEYPER_LOG_ROTATE_INTERVAL: Also rotate it every INTERVAL units of WHEN (S, M,
+      H, D), or at midnight.
+    - APIKEYPER_LOG_BACKUP_COUNT: The number of rotated segments to keep.
+    - APIKEYPER_LOG_COMPRESS: Whether rotated segments are gzip-compressed ("1"/"0", "true"/"false").
+2. A JSON config file named by $APIKEYPER_LOG_CONFIG, with the keys "level", "console_level", "file_level", "file",
+   "format", "max_bytes", "when", "interval", "backup_count" and "compress".
+3. The defaults: WARNING for both, and `app.log` in text format, rotated at 10 MiB with 5 compressed segments kept (see
+   `apikeyper.log_engine.rotation`).
+
+Levels are level names ("DEBUG", "info", ...) or numbers. Unless a config file is named, reading the settings involves
+no file I/O.
+
+The settings are read when `apikeyper.log_engine` is imported, so a bad value must not make the package unimportable:
+a file format, size, interval, count or flag that is not valid (and a config file that is not valid JSON) is ignored
+with a `RuntimeWarning`, and the next source in the order above, or the default, is used instead.
+"""
+
+import logging
+import os
+import warnings
+from typing import Optional
+
+from apikeyper.log_engine.helpers import translate_to_logging_level
+from apikeyper.log_engine.rotation import DEFAULT_ROTATION, RotationPolicy, check_policy
+
+
+LEVEL_ENV = "APIKEYPER_LOG_LEVEL"
+CONSOLE_LEVEL_ENV = "APIKEYPER_CONSOLE_LOG_LEVEL"
+FILE_LEVEL_ENV = "APIKEYPER_FILE_LOG_LEVEL"
+FILE_ENV = "APIKEYPER_LOG_FILE"
+FORMAT_ENV = "APIKEYPER_LOG_FORMAT"
+CONFIG_ENV = "APIKEYPER_LOG_CONFIG"
+MAX_BYTES_ENV = "APIKEYPER_LOG_MAX_BYTES"
+ROTATE_WHEN_ENV = "APIKEYPER_LOG_ROTATE_WHEN"
+ROTATE_INTERVAL_ENV = "APIKEYPER_LOG_ROTATE_INTERVAL"
+BACKUP_COUNT_ENV = "APIKEYPER_LOG_BACKUP_COUNT"
+COMPRESS_ENV = "APIKEYPER_LOG_COMPRESS"
+
+DEFAULT_LEVEL = logging.WARNING
+DEFAULT_LOG_FILE = "app.log"
+FILE_FORMATS = ("text", "json")
+DEFAULT_FILE_FORMAT = "text"
+
+
+def parse_level(level) -> Optional[int]:
+    """
+    Turn a level name or number into a logging level.
+
+    Args:
+        level (str or int): The level.
+
+    Returns:
+        int or None: The logging level, or None if `level` is empty or not a level.
+    """
+    if level is None or level == "":
+        return None
+    if isinstance(level, int):
+        return level
+    level = str(level).strip()
+    return int(level) if level.isdigit() else translate_to_logging_level(level)
+
+
+_SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(size) -> Optional[int]:
+    """
+    Turn a size in bytes, optionally with a K, M or G suffix (powers of 1024), into a number of bytes.
+
+    Args:
+        size (str or int): The size.
+
+    Returns:
+        int or None: The number of bytes, or None if `size` is empty.
+
+    Raises:
+        ValueError: If `size` is not a size.
+    """
+    if size is None or size == "":
+        return None
+    if isinstance(size, int):
+        return size
+
+    size = str(size).strip().upper().removesuffix("B").removesuffix("I")
+    if size and size[-1] in _SIZE_UNITS:
+        return int(float(size[:-1]) * _SIZE_UNITS[size[-1]])
+    return int(size)
+
+
+def parse_bool(value) -> Optional[bool]:
+    """
+    Turn "1"/"0", "true"/"false", "yes"/"no" or "on"/"off" into a bool.
+
+    Returns:
+        bool or None: The value, or None if `value` is empty or not one of those.
+    """
+    if value is None or isinstance(value, bool):
+        return value
+    return {"1": True, "true": True, "yes": True, "on": True,
+            "0": False, "false": False, "no": False, "off": False}.get(str(value).strip().lower())
+
+
+def _warn(source, value, reason):
+    warnings.warn(f"Ignoring the logging setting {source}={value!r}: {reason}", RuntimeWarning, stacklevel=2)
+
+
+def _read_config_file(path):
+    if not path:
+        return {}
+
+    import json
+
+    try:
+        with open(path, "r") as file:
+            config = json.load(file)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        _warn(CONFIG_ENV, path, f"not a JSON file ({e})")
+        return {}
+    return config if isinstance(config, dict) else {}
+
+
+def parse_file_format(file_format) -> Optional[str]:
+    """
+    Check a log file format.
+
+    Returns:
+        str or None: 'text' or 'json', or None if `file_format` is empty.
+
+    Raises:
+        ValueError: If `file_format` is not one of `FILE_FORMATS`.
+    """
+    if file_format is None or file_format == "":
+        return None
+
+    file_format = str(file_format).strip().lower()
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"use one of {', '.join(FILE_FORMATS)}")
+    return file_format
+
+
+def load_settings(environ=None) -> dict:
+    """
+    Read the logging settings.
+
+    Args:
+        environ (Mapping, optional): The environment. Defaults to `os.environ`.
+
+    Returns:
+        dict: The 'console_level' and 'file_level' (ints), the 'filename', its 'file_format' ('text' or 'json') and its
+            'rotation' (a `RotationPolicy`).
+    """
+    environ = os.environ if environ is None else environ
+    config = _read_config_file(environ.get(CONFIG_ENV))
+
+    def pick(env_name, config_key):
+        # The most specific setting wins, and the environment wins over the config file.
+        candidates = (environ.get(env_name), environ.get(LEVEL_ENV), config.get(config_key), config.get("level"))
+        for candidate in candidates:
+            if (level := parse_level(candidate)) is not None:
+                return level
+        return DEFAULT_LEVEL
+
+    def pick_valid(env_name, config_key, parse, default):
+        # Like `pick`, but a value that does not parse is reported and skipped.
+        for source, candidate in ((env_name, environ.get(env_name)), (f'"{config_key}"', config.get(config_key))):
+            try:
+                if (value := parse(candidate)) is not None:
+                    return value
+            except (TypeError, ValueError) as e:
+                _warn(source, candidate, e)
+        return default
+
+    def pick_rotation(env_name, config_key, parse):
+        def parse_field(value):
+            if (value := parse(value)) is not None:
+                # Check the value on its own, so one bad setting does not discard the others.
+                check_policy(DEFAULT_ROTATION._replace(**{config_key: value}))
+            return value
+
+        return pick_valid(env_name, config_key, parse_field, getattr(DEFAULT_ROTATION, config_key))
+
+    def parse_count(value):
+        return None if value is None or value == "" else int(value)
+
+    def parse_when(value):
+        return None if value is None else str(value).strip() or None
+
+    def parse_flag(value):
+        if (flag := parse_bool(value)) is None and value not in (None, ""):
+            raise ValueError("use 1/0, true/false, yes/no or on/off")
+        return flag
+
+    rotation = RotationPolicy(
+        max_bytes=pick_rotation(MAX_BYTES_ENV, "max_bytes", parse_size),
+        when=pick_rotation(ROTATE_WHEN_ENV, "when", parse_when),
+        interval=pick_rotation(ROTATE_INTERVAL_ENV, "interval", parse_count),
+        backup_count=pick_rotation(BACKUP_COUNT_ENV, "backup_count", parse_count),
+        compress=pick_rotation(COMPRESS_ENV, "compress", parse_flag),
+    )
+
+    return {
+        "console_level": pick(CONSOLE_LEVEL_ENV, "console_level"),
+        "file_level": pick(FILE_LEVEL_ENV, "file_level"),
+        "filename": environ.get(FILE_ENV) or config.get("file") or DEFAULT_LOG_FILE,
+        "file_format": pick_valid(FORMAT_ENV, "format", parse_file_format, DEFAULT_FILE_FORMAT),
+        "rotation": rotation,
+    }
+
+
+_SETTINGS = None
+
+
+def get_settings() -> dict:
+    """
+    Get the logging settings, reading them on first use.
+    """
+    global _SETTINGS
+    if _SETTINGS is None:
+        _SETTINGS = load_settings()
+    return _SETTINGS
+
+
+def reset_settings() -> None:
+    """
+    Forget the settings, so they are read again by the next `get_settings` call.
+    """
+    global _SETTINGS
+    _SETTINGS = None
@@ -0,0 +1,275 @@
+"""
+This module contains the shared log sink of the logging engine.
+
+Every `Logger` hands its records to one handler, which only puts them on a queue. A single background
+`QueueListener` takes them off the queue and routes each record, by logger name, to one shared Rich console handler
+and one file handler per log file. Formatting and writing happen on the listener's thread, and each log file is opened
+once, however many loggers write to it. Only the message (and any traceback) is rendered on the logging thread, when the
+record is enqueued. Log files are rotated by size and/or time, and the rotated segments are
+compressed on a background thread (see `apikeyper.log_engine.rotation`). Each log file is written as text lines or as
+JSON lines (see `apikeyper.log_engine.helpers.JSONFormatter`).
+
+Nothing happens until the first record is logged: the listener thread is started (and `logging.handlers` imported),
+and the handlers are created (so the log file is opened), on first use.
+"""
+
+import atexit
+import copy
+import logging
+import queue
+import threading
+
+from apikeyper.log_engine.helpers import CustomFormatter, JSONFormatter
+from apikeyper.log_engine.rotation import COMPRESSOR, RotatingFileHandler, check_policy
+from apikeyper.log_engine.settings import FILE_FORMATS, get_settings
+
+
+CONSOLE_FORMAT = "[green][bold][%(name)s][bold][/green] - %(message)s"
+FILE_FORMAT = "%(asctime)s - [%(name)s] - %(levelname)s - %(message)s"
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+def file_formatter(file_format):
+    """
+    Create the formatter of a log file format.
+
+    Args:
+        file_format (str): 'text' or 'json'.
+
+    Returns:
+        logging.Formatter: The formatter.
+    """
+    return JSONFormatter() if file_format == "json" else CustomFormatter(FILE_FORMAT)
+
+
+class _EnqueueHandler(logging.Handler):
+    """
+    A handler that enqueues a prepared copy of each record, like `logging.handlers.QueueHandler` (which is not used so
+    that `logging.handlers` is only imported once something is logged).
+    """
+
+    def __init__(self, queue, sink):
+        super().__init__()
+        self.queue = queue
+        self.sink = sink
+
+    def prepare(self, record):
+        """
+        Render the message and the exception text now, on the logging thread: the arguments may change before the
+        listener gets to the record, and a traceback would keep its frames (and their locals) alive on the queue.
+        Unlike `QueueHandler.prepare`, the traceback is kept apart from the message, in `exc_text`, so the file
+        formatters can still place it.
+
+        Args:
+            record (logging.LogRecord): The record.
+
+        Returns:
+            logging.LogRecord: A copy of the record with no arguments and no `exc_info`.
+        """
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        if not self.sink.running:
+            self.sink.start()
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+
+class _Route:
+    __slots__ = ("console_level", "file_level", "filename")
+
+    def __init__(self, console_level, file_level, filename):
+        self.console_level = console_level
+        self.file_level = file_level
+        self.filename = filename
+
+
+class _Dispatcher(logging.Handler):
+    """
+    Runs on the listener thread and hands each record to the console and file handlers its logger is routed to.
+    """
+
+    def __init__(self, sink):
+        super().__init__()
+        self.sink = sink
+
+    def handle(self, record):
+        route = self.sink.routes.get(record.name)
+        if route is None:
+            return False
+
+        if self.sink.console_enabled and record.levelno >= route.console_level:
+            self.sink.console_handler().handle(record)
+
+        if route.filename in self.sink.files and record.levelno >= route.file_level:
+            self.sink.file_handler(route.filename).handle(record)
+        return True
+
+
+class LogSink:
+    """
+    The shared destination of all `Logger` records.
+
+    Attributes:
+        handler (logging.Handler): The handler attached to every logger, which puts records on `queue`.
+        console_enabled (bool): Whether records are written to the console.
+        console (RichHandler): The shared console handler, once created.
+        files (dict): The file handler of each log file (None until created), by file name.
+        rotations (dict): The rotation policy of each log file, by file name.
+        file_formats (dict): The format ('text' or 'json') of each log file, by file name.
+        routes (dict): The console level, file level and file name of each logger, by logger name.
+    """
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.handler = _EnqueueHandler(self.queue, self)
+        self.console_enabled = False
+        self.console = None
+        self.files = {}
+        self.rotations = {}
+        self.file_formats = {}
+        self.routes = {}
+        self._listener = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._listener is not None
+
+    def route(self, name, console_level, file_level, filename):
+        """
+        Set where the records of a logger go.
+
+        Args:
+            name (str): The logger name.
+            console_level (int): The minimum level of records written to the console.
+            file_level (int): The minimum level of records written to the log file.
+            filename (str): The log file.
+        """
+        self.routes[name] = _Route(console_level, file_level, filename)
+
+    def set_up_console(self):
+        """
+        Write records to the console. The console handler is created when the first record is written.
+        """
+        self.console_enabled = True
+
+    def set_up_file(self, filename, rotation=None, file_format=None):
+        """
+        Write records to a log file. The file handler is created, and the file opened, when the first record is
+        written to it.
+
+        Args:
+            filename (str): The log file.
+            rotation (RotationPolicy, optional): When to rotate the file. Replaces the file's current policy if given;
+                otherwise, a new file gets the policy of the logging settings.
+            file_format (str, optional): 'text' or 'json'. Replaces the file's current format if given; otherwise, a
+                new file gets the format of the logging settings.
+
+        Raises:
+            ValueError: If the rotation policy does not make sense, or the format is unknown.
+        """
+        rotation = None if rotation is None else check_policy(rotation)
+        if file_format is not None and file_format not in FILE_FORMATS:
+            raise ValueError(f"Unknown log file format {file_format!r}; use one of {', '.join(FILE_FORMATS)}.")
+
+        with self._lock:
+            self.files.setdefault(filename, None)
+            if file_format is not None:
+                self.file_formats[filename] = file_format
+                if self.files[filename] is not None:
+                    self.files[filename].setFormatter(file_formatter(file_format))
+            else:
+                self.file_formats.setdefault(filename, get_settings()["file_format"])
+            if rotation is not None:
+                self.rotations[filename] = rotation
+                if self.files[filename] is not None:
+                    self.files[filename].set_policy(rotation)
+            else:
+                self.rotations.setdefault(filename, get_settings()["rotation"])
+
+    def console_handler(self):
+        """
+        Get the shared console handler, creating it on first use.
+
+        Returns:
+            RichHandler: The console handler.
+        """
+        with self._lock:
+            if self.console is None:
+                from rich.logging import RichHandler
+
+                console = RichHandler(
+                    show_level=True,
+                    markup=True,
+                    rich_tracebacks=True,
+                    tracebacks_show_locals=False,
+                )
+                console.setFormatter(CustomFormatter(CONSOLE_FORMAT))
+                self.console = console
+            return self.console
+
+    def file_handler(self, filename):
+        """
+        Get the file handler of a log file, creating it on first use.
+
+        Args:
+            filename (str): The log file.
+
+        Returns:
+            RotatingFileHandler: The file handler.
+        """
+        with self._lock:
+            if self.files.get(filename) is None:
+                file_handler = RotatingFileHandler(filename, self.rotations.get(filename, get_settings()["rotation"]))
+                file_handler.setFormatter(
+                    file_formatter(self.file_formats.get(filename, get_settings()["file_format"]))
+                )
+                self.files[filename] = file_handler
+            return self.files[filename]
+
+    def start(self):
+        """
+        Start the listener thread, if it is not running.
+        """
+        with self._lock:
+            if self._listener is None:
+                from logging.handlers import QueueListener
+
+                self._listener = QueueListener(self.queue, _Dispatcher(self))
+                self._listener.start()
+
+    def stop(self):
+        """
+        Write out every queued record, wait for rotated segments to be compressed, and stop the listener thread. It is
+        started again by the next record.
+        """
+        with self._lock:
+            listener, self._listener = self._listener, None
+
+        if listener is not None:
+            listener.stop()
+            for handler in [self.console, *self.files.values()]:
+                if handler is not None:
+                    handler.flush()
+        COMPRESSOR.join()
+
+    def flush(self):
+        """
+        Wait until every record logged so far has been written.
+        """
+        self.stop()
+
+
+SINK = LogSink()
+atexit.register(SINK.stop)
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+__init__.py
+-----------
+Author: tayja
+Date: 10/19/2026
+
+This package holds APIKeyPER's run-time instrumentation:
+
+    - metrics: Counters and latency histograms of database, API, encryption and decorator operations, available
+      through `apikeyper.stats()` and optionally written to a Prometheus text file.
+    - tracing: Hooks that open spans around key resolution, database queries and encryption, with a no-op default
+      and an OpenTelemetry adapter.
+    - profiling: An opt-in profiling mode (`APIKEYPER_PROFILE` or `--profile`) that writes CPU and memory profiles of
+      exports, `CryptDB` loads and key resolution.
+
+Its modules only depend on the standard library, so any part of APIKeyPER can import them without slowing down
+`import apikeyper`.
+"""
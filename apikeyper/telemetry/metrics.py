@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+metrics.py
+----------
+Author: tayja
+Date: 10/19/2026
+
+This module provides the metrics registry of APIKeyPER: counters, and latency histograms with fixed buckets.
+
+`APIKeyDB`, `APIKeyPER`, `CryptDB` and the decorators record every operation in two metric families, labelled with
+the `component` ('db', 'api', 'crypt' or 'decorator') and the `op`:
+
+    - apikeyper_operation_seconds: A histogram of how long the operations take.
+    - apikeyper_operation_errors_total: A counter of the operations that raised.
+
+Metrics are off by default. When they are off, an instrumented call costs one attribute check. Turn them on with
+`METRICS.enable()` or by setting `APIKEYPER_METRICS=1`, then read them with `apikeyper.stats()`::
+
+    from apikeyper.telemetry.metrics import METRICS
+
+    METRICS.enable()
+    ...
+    METRICS.start_prometheus_file("/var/lib/node_exporter/apikeyper.prom", interval=15)
+
+Setting `APIKEYPER_METRICS_FILE` (and optionally `APIKEYPER_METRICS_INTERVAL`, in seconds) turns metrics on and
+writes them to that file in the Prometheus text format, for example for the node exporter's textfile collector.
+
+Recording takes no lock. Every thread updates its own copy of each metric, and reading a metric adds the copies up.
+"""
+
+import atexit
+import bisect
+import functools
+import itertools
+import math
+import os
+import threading
+import time
+import weakref
+from typing import Callable, Dict, Iterable, Tuple
+
+
+ENABLED_ENV = "APIKEYPER_METRICS"
+FILE_ENV = "APIKEYPER_METRICS_FILE"
+INTERVAL_ENV = "APIKEYPER_METRICS_INTERVAL"
+
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+"""The upper bounds, in seconds, of the latency histogram buckets. A last bucket catches everything slower."""
+
+DEFAULT_INTERVAL = 15.0
+
+OPERATION_SECONDS = "apikeyper_operation_seconds"
+OPERATION_ERRORS = "apikeyper_operation_errors_total"
+
+
+class _ThreadMarker:
+    """
+    Lives in a thread's local storage, so it is dropped, and its finalizer runs, when the thread ends.
+    """
+
+    __slots__ = ("__weakref__",)
+
+
+def _fold_shard(sharded_ref, key):
+    sharded = sharded_ref()
+    if sharded is not None:
+        sharded._fold(key)
+
+
+class _Sharded:
+    """
+    A list of numbers that every thread updates in its own copy (shard), without locking. The lock is only taken when
+    a thread makes its first update, when the shards are added up, and when a thread ends: its shard is then folded
+    into a base total, so short-lived threads (`asyncio.to_thread`, executors, a thread per request) do not pile up
+    shards.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._base = [0] * size
+        self._shards = {}
+        self._keys = itertools.count()
+        self._lock = threading.Lock()
+
+    def _shard(self) -> list:
+        try:
+            return self._local.shard
+        except AttributeError:
+            pass
+
+        shard = [0] * self._size
+        marker = _ThreadMarker()
+        with self._lock:
+            key = next(self._keys)
+            self._shards[key] = shard
+        weakref.finalize(marker, _fold_shard, weakref.ref(self), key).atexit = False
+        self._local.marker = marker
+        self._local.shard = shard
+        return shard
+
+    def _fold(self, key) -> None:
+        with self._lock:
+            shard = self._shards.pop(key, None)
+            if shard is not None:
+                self._base = [total + value for total, value in zip(self._base, shard)]
+
+    def _totals(self) -> list:
+        with self._lock:
+            shards = [self._base, *self._shards.values()]
+        return [sum(column) for column in zip(*shards)]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._base = [0] * self._size
+            for shard in self._shards.values():
+                shard[:] = [0] * self._size
+
+
+class Counter(_Sharded):
+    """
+    A number that only goes up, e.g. the number of failed operations.
+    """
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount=1) -> None:
+        """
+        Add to the counter.
+
+        Args:
+            amount (int or float, optional): The amount to add. Defaults to 1.
+        """
+        self._shard()[0] += amount
+
+    @property
+    def value(self):
+        return self._totals()[0]
+
+
+class Histogram(_Sharded):
+    """
+    Counts observations (e.g. durations in seconds) in buckets with fixed upper bounds, and keeps their count and sum.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # One slot per bucket, one for larger values, then the sum and the count.
+        super().__init__(len(self.buckets) + 3)
+
+    def observe(self, value: float) -> None:
+        """
+        Record an observation.
+
+        Args:
+            value (float): The observed value.
+        """
+        shard = self._shard()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-2] += value
+        shard[-1] += 1
+
+    def snapshot(self) -> dict:
+        """
+        Read the histogram.
+
+        Returns:
+            dict: The 'count' and 'sum' of the observations, and the cumulative count of each bucket in 'buckets',
+                by upper bound (the last one being `math.inf`).
+        """
+        totals = self._totals()
+        cumulative, buckets = 0, {}
+        for bound, count in zip((*self.buckets, math.inf), totals):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"count": totals[-1], "sum": totals[-2], "buckets": buckets}
+
+
+class Operation:
+    """
+    The latency histogram and error counter of one instrumented operation.
+    """
+
+    __slots__ = ("registry", "seconds", "errors")
+
+    def __init__(self, registry: "MetricsRegistry", seconds: Histogram, errors: Counter):
+        self.registry = registry
+        self.seconds = seconds
+        self.errors = errors
+
+    def __call__(self, func: Callable) -> Callable:
+        """
+        Wrap a function so that every call is recorded while metrics are enabled.
+        """
+        registry, seconds, errors = self.registry, self.seconds, self.errors
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                seconds.observe(time.perf_counter() - start)
+
+        return wrapper
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels, extra=()) -> str:
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_number(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    The counters and histograms of a process, by name and labels.
+
+    Attributes:
+        enabled (bool): Whether instrumented operations are recorded.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._families = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._writer = None
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def _get(self, kind, factory, name, help_text, labels):
+        key = (name, _label_key(labels))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                family = self._families.setdefault(name, (kind, help_text))
+                if family[0] != kind:
+                    raise ValueError(f"Metric {name!r} is a {family[0]}, not a {kind}.")
+                metric = self._metrics.setdefault(key, factory())
+        return metric
+
+    def counter(self, name: str, help_text: str = "", **labels) -> Counter:
+        """
+        Get a counter, creating it on first use.
+
+        Args:
+            name (str): The metric name.
+            help_text (str, optional): A description of the metric.
+            **labels: The labels of this counter.
+
+        Returns:
+            Counter: The counter.
+        """
+        return self._get("counter", Counter, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str = "", buckets: Iterable[float] = DEFAULT_BUCKETS, **labels) -> Histogram:
+        """
+        Get a histogram, creating it on first use.
+
+        Args:
+            name (str): The metric name.
+            help_text (str, optional): A description of the metric.
+            buckets (Iterable[float], optional): The upper bounds of the buckets of a new histogram.
+            **labels: The labels of this histogram.
+
+        Returns:
+            Histogram: The histogram.
+        """
+        return self._get("histogram", lambda: Histogram(buckets), name, help_text, labels)
+
+    def operation(self, component: str, op: str) -> Operation:
+        """
+        Get the metrics of an operation. The result can also be used as a decorator that records every call.
+
+        Args:
+            component (str): The component, e.g. 'db'.
+            op (str): The operation, e.g. 'get_key'.
+
+        Returns:
+            Operation: The latency histogram and error counter of the operation.
+        """
+        return Operation(
+            self,
+            self.histogram(OPERATION_SECONDS, "How long APIKeyPER operations take.", component=component, op=op),
+            self.counter(OPERATION_ERRORS, "APIKeyPER operations that raised.", component=component, op=op),
+        )
+
+    def reset(self) -> None:
+        """
+        Set every metric back to zero.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+    def _collect(self):
+        with self._lock:
+            families = dict(self._families)
+            metrics = sorted(self._metrics.items())
+
+        for name, (kind, help_text) in sorted(families.items()):
+            samples = [(labels, metric) for (metric_name, labels), metric in metrics if metric_name == name]
+            yield name, kind, help_text, samples
+
+    def stats(self) -> dict:
+        """
+        Read every metric.
+
+        Returns:
+            dict: For each metric name, its 'type', 'help' and 'samples'. Each sample has the 'labels' of one metric
+                and either its 'value' (counters) or its 'count', 'sum' and cumulative 'buckets' (histograms).
+        """
+        result = {}
+        for name, kind, help_text, samples in self._collect():
+            rows = []
+            for labels, metric in samples:
+                row = {"labels": dict(labels)}
+                row.update({"value": metric.value} if kind == "counter" else metric.snapshot())
+                rows.append(row)
+            result[name] = {"type": kind, "help": help_text, "samples": rows}
+        return result
+
+    def render_prometheus(self) -> str:
+        """
+        Write every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics.
+        """
+        lines = []
+        for name, kind, help_text, samples in self._collect():
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+            for labels, metric in samples:
+                if kind == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_number(metric.value)}")
+                    continue
+
+                snapshot = metric.snapshot()
+                for bound, count in snapshot["buckets"].items():
+                    bucket_labels = _format_labels(labels, [("le", _format_number(bound))])
+                    lines.append(f"{name}_bucket{bucket_labels} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(snapshot['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {snapshot['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus_file(self, path) -> None:
+        """
+        Write every metric to a file in the Prometheus text format. The file is replaced in one step, so readers never
+        see a partial file.
+
+        Args:
+            path (str or Path): The file.
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(self.render_prometheus())
+        os.replace(temporary, path)
+
+    def start_prometheus_file(self, path, interval: float = DEFAULT_INTERVAL) -> None:
+        """
+        Write every metric to a Prometheus text file every `interval` seconds, on a background thread, and once more
+        when the process exits. Replaces any file started before.
+
+        Args:
+            path (str or Path): The file.
+            interval (float, optional): Seconds between writes. Defaults to 15.
+        """
+        self.stop_prometheus_file()
+        stopped = threading.Event()
+
+        def run():
+            while not stopped.wait(interval):
+                self.write_prometheus_file(path)
+
+        thread = threading.Thread(target=run, name="apikeyper-metrics-writer", daemon=True)
+        self._writer = (thread, stopped, path)
+        thread.start()
+
+    def stop_prometheus_file(self) -> None:
+        """
+        Stop writing the Prometheus text file, after writing it one last time.
+        """
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            thread, stopped, path = writer
+            stopped.set()
+            thread.join()
+            self.write_prometheus_file(path)
+
+
+def _from_environment(environ=None) -> MetricsRegistry:
+    environ = os.environ if environ is None else environ
+    path = environ.get(FILE_ENV)
+    registry = MetricsRegistry(enabled=bool(path) or environ.get(ENABLED_ENV, "").strip().lower() in ("1", "true", "yes", "on"))
+    if path:
+        registry.start_prometheus_file(path, float(environ.get(INTERVAL_ENV) or DEFAULT_INTERVAL))
+    return registry
+
+
+METRICS = _from_environment()
+atexit.register(METRICS.stop_prometheus_file)
+
+
+def stats() -> dict:
+    """
+    Read every metric of the process (see `MetricsRegistry.stats`).
+    """
+    return METRICS.stats()
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+profiling.py
+------------
+Author: tayja
+Date: 10/19/2026
+
+This module provides the opt-in profiling mode of APIKeyPER, for capturing CPU and memory profiles of slow key loads
+without editing code.
+
+Set `APIKEYPER_PROFILE` to profile these operations:
+
+    - db.export_db_as_json / db.export_db_as_xml: `APIKeyDB` exports.
+    - crypt.load: `CryptDB` loads.
+    - decorator.resolve: Key resolution by `apikey_required` (synchronous functions only).
+
+The value is a comma-separated list of modes:
+
+    - cpu: A deterministic profile with cProfile.
+    - sample: A statistical profile, sampling the profiled thread's stack every millisecond. It slows the operation
+      down far less than cProfile.
+    - memory: The allocations made during the operation, with tracemalloc.
+
+`1` (or `true`) means `cpu,memory`. Each operation is profiled the first `APIKEYPER_PROFILE_COUNT` times it runs (1 by
+default), and only one profile is taken at a time. For each profile, these files are written to
+`APIKEYPER_PROFILE_DIR` (`./apikeyper-profiles` by default), named `apikeyper-<operation>-<time>-<pid>-<n>`:
+
+    - .pstats: The cProfile statistics, for `python -m pstats` or snakeviz.
+    - .cpu.txt: The top `APIKEYPER_PROFILE_TOP` (25) functions by cumulative time.
+    - .samples.txt: The top functions and stacks by number of samples.
+    - .memory.txt: The top allocation sites during the operation, and the peak traced memory.
+
+The command-line tools take a `--profile [MODES]` flag that profiles the whole command the same way (see
+`add_profile_arguments`).
+
+cProfile, pstats and tracemalloc are only imported when a profile is taken.
+"""
+
+import collections
+import functools
+import io
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+PROFILE_ENV = "APIKEYPER_PROFILE"
+PROFILE_DIR_ENV = "APIKEYPER_PROFILE_DIR"
+PROFILE_TOP_ENV = "APIKEYPER_PROFILE_TOP"
+PROFILE_COUNT_ENV = "APIKEYPER_PROFILE_COUNT"
+
+CPU = "cpu"
+SAMPLE = "sample"
+MEMORY = "memory"
+MODES = (CPU, SAMPLE, MEMORY)
+DEFAULT_MODES = (CPU, MEMORY)
+
+DEFAULT_PROFILE_DIR = "apikeyper-profiles"
+DEFAULT_TOP = 25
+DEFAULT_SAMPLE_INTERVAL = 0.001
+
+log = logging.getLogger("APIKeyPER.telemetry.profiling")
+
+# cProfile, the sampler and tracemalloc are process-wide, so only one profile is taken at a time.
+_ACTIVE = threading.Lock()
+# Numbers the profiles of the process, so profiles taken within the same second get their own files.
+_SEQUENCE = itertools.count(1)
+
+
+def parse_modes(value) -> tuple:
+    """
+    Turn a profiling setting into profiling modes.
+
+    Args:
+        value (str or Iterable[str] or None): 'cpu', 'sample' and/or 'memory', comma-separated, or a true value
+            ('1', 'true', 'yes', 'on') for the default modes.
+
+    Returns:
+        tuple[str]: The modes, or an empty tuple if profiling is off.
+
+    Raises:
+        ValueError: If a mode is unknown.
+    """
+    if not value:
+        return ()
+    if isinstance(value, str):
+        if value.strip().lower() in ("0", "false", "no", "off"):
+            return ()
+        if value.strip().lower() in ("1", "true", "yes", "on"):
+            return DEFAULT_MODES
+        value = value.split(",")
+
+    modes = tuple(dict.fromkeys(mode.strip().lower() for mode in value if mode.strip()))
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        raise ValueError(f"Unknown profiling mode(s) {', '.join(unknown)}; use {', '.join(MODES)}.")
+    return modes
+
+
+class StackSampler:
+    """
+    A statistical profiler: a background thread that records the stack of one thread at a fixed interval.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        """
+        Args:
+            thread_id (int, optional): The thread to sample. Defaults to the calling thread.
+            interval (float, optional): Seconds between samples. Defaults to 1 ms.
+        """
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.functions = collections.Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="apikeyper-profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+
+            self.samples += 1
+            self.functions[stack[0]] += 1
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def summary(self, top: int = DEFAULT_TOP) -> str:
+        """
+        Summarize the samples: the functions most often on top of the stack, and the most frequent stacks (as
+        semicolon-separated frames, outermost first, which flame graph tools read).
+
+        Args:
+            top (int, optional): The number of functions and stacks to list.
+
+        Returns:
+            str: The summary.
+        """
+        lines = [f"{self.samples} samples, every {self.interval * 1000:g} ms", "", "Top functions (self):"]
+        lines += [f"{count:>8}  {count / max(self.samples, 1):>6.1%}  {name}" for name, count in self.functions.most_common(top)]
+        lines += ["", "Top stacks:"]
+        lines += [f"{stack} {count}" for stack, count in self.stacks.most_common(top)]
+        return "\n".join(lines) + "\n"
+
+
+class ProfileSession:
+    """
+    Profiles a block of code and writes the results to files::
+
+        with ProfileSession("crypt.load", modes=("cpu", "memory")) as session:
+            db.load()
+        print(session.paths)
+
+    If another profile is being taken, the block runs without being profiled, and `paths` stays empty.
+
+    Attributes:
+        label (str): The name of the profiled operation.
+        modes (tuple[str]): The profiling modes.
+        output_dir (Path): The directory the files are written to.
+        top (int): The number of entries in the summaries.
+        paths (list[Path]): The files written.
+    """
+
+    def __init__(self, label: str, modes: Iterable[str] = DEFAULT_MODES, output_dir=None, top: int = DEFAULT_TOP):
+        self.label = label
+        self.modes = parse_modes(modes)
+        self.output_dir = Path(output_dir or DEFAULT_PROFILE_DIR)
+        self.top = top
+        self.paths = []
+        self._active = False
+        self._profiler = None
+        self._sampler = None
+        self._started_tracemalloc = False
+        self._snapshot = None
+
+    def __enter__(self):
+        self._active = bool(self.modes) and _ACTIVE.acquire(blocking=False)
+        if not self._active:
+            return self
+
+        if MEMORY in self.modes:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+                self._started_tracemalloc = True
+            tracemalloc.reset_peak()
+            self._snapshot = tracemalloc.take_snapshot()
+        if SAMPLE in self.modes:
+            self._sampler = StackSampler()
+            self._sampler.start()
+        if CPU in self.modes:
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if not self._active:
+            return False
+
+        try:
+            if self._profiler is not None:
+                self._profiler.disable()
+            if self._sampler is not None:
+                self._sampler.stop()
+            snapshot = peak = None
+            if self._snapshot is not None:
+                import tracemalloc
+
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                if self._started_tracemalloc:
+                    tracemalloc.stop()
+        finally:
+            _ACTIVE.release()
+
+        self._write(snapshot, peak)
+        log.info("Profiled %s: %s", self.label, ", ".join(str(path) for path in self.paths))
+        return False
+
+    def _write(self, snapshot, peak):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = self.output_dir / (
+            f"apikeyper-{self.label}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_SEQUENCE)}"
+        )
+
+        if self._profiler is not None:
+            import pstats
+
+            self._profiler.dump_stats(f"{stem}.pstats")
+            summary = io.StringIO()
+            pstats.Stats(self._profiler, stream=summary).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+            self._save(f"{stem}.cpu.txt", summary.getvalue(), f"{stem}.pstats")
+
+        if self._sampler is not None:
+            self._save(f"{stem}.samples.txt", self._sampler.summary(self.top))
+
+        if snapshot is not None:
+            import tracemalloc
+
+            lines = [f"Peak traced memory: {peak / 1024:.1f} KiB", "", f"Top {self.top} allocation sites:"]
+            ignored = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+            for stat in snapshot.filter_traces(ignored).compare_to(self._snapshot.filter_traces(ignored), "lineno")[:self.top]:
+                lines.append(str(stat))
+            self._save(f"{stem}.memory.txt", "\n".join(lines) + "\n")
+
+    def _save(self, path, text, *extra_paths):
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+        self.paths.extend(Path(extra) for extra in extra_paths)
+        self.paths.append(Path(path))
+
+
+class _Inactive:
+    __slots__ = ()
+    paths = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_INACTIVE = _Inactive()
+
+
+class ProfilingHooks:
+    """
+    The profiling settings of the process, read from the environment.
+
+    Attributes:
+        enabled (bool): Whether profiled operations are profiled. Instrumented code checks this first.
+        modes (tuple[str]): The profiling modes.
+        output_dir (str): The directory profiles are written to.
+        top (int): The number of entries in the summaries.
+        count (int): How many times each operation is profiled.
+    """
+
+    def __init__(self, modes=(), output_dir=None, top=DEFAULT_TOP, count=1):
+        self.configure(modes, output_dir, top, count)
+
+    def configure(self, modes=(), output_dir=None, top=DEFAULT_TOP, count=1) -> None:
+        """
+        Change the profiling settings. Passing no modes turns profiling off.
+        """
+        self.modes = parse_modes(modes)
+        self.output_dir = output_dir or DEFAULT_PROFILE_DIR
+        self.top = top
+        self.count = count
+        self.enabled = bool(self.modes)
+        self._taken = collections.Counter()
+
+    def session(self, label: str):
+        """
+        Get a session profiling an operation, if profiling is on and the operation has not been profiled `count`
+        times yet::
+
+            with PROFILING.session("crypt.load"):
+                ...
+
+        Args:
+            label (str): The operation name.
+
+        Returns:
+            A context manager: a `ProfileSession`, or one that does nothing.
+        """
+        if not self.enabled or self._taken[label] >= self.count:
+            return _INACTIVE
+        self._taken[label] += 1
+        return ProfileSession(label, self.modes, self.output_dir, self.top)
+
+    def operation(self, label: str):
+        """
+        Decorate a function so that its calls are profiled as `label` while profiling is on.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.session(label):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+
+def _from_environment(environ=None) -> ProfilingHooks:
+    environ = os.environ if environ is None else environ
+    return ProfilingHooks(
+        modes=environ.get(PROFILE_ENV),
+        output_dir=environ.get(PROFILE_DIR_ENV),
+        top=int(environ.get(PROFILE_TOP_ENV) or DEFAULT_TOP),
+        count=int(environ.get(PROFILE_COUNT_ENV) or 1),
+    )
+
+
+PROFILING = _from_environment()
+
+
+def add_profile_arguments(parser) -> None:
+    """
+    Add the `--profile [MODES]`, `--profile-dir DIR` and `--profile-top N` options to a command-line parser.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser.
+    """
+    parser.add_argument('--profile', nargs='?', const=','.join(DEFAULT_MODES), default=None, metavar='MODES',
+                        help=f"Profile the command ({', '.join(MODES)}; default: {','.join(DEFAULT_MODES)}).")
+    parser.add_argument('--profile-dir', default=None, metavar='DIR',
+                        help=f'Where to write the profile (default: ${PROFILE_DIR_ENV} or ./{DEFAULT_PROFILE_DIR}).')
+    parser.add_argument('--profile-top', type=int, default=None, metavar='N',
+                        help=f'The number of entries in the profile summaries (default: {DEFAULT_TOP}).')
+
+
+def run_profiled(args, label: str, func, *func_args, **func_kwargs):
+    """
+    Run a command's work, profiled if its `--profile` option (see `add_profile_arguments`) was given, and report the
+    files written on stderr.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+        label (str): The name of the command, used in the file names.
+        func (callable): The work.
+        *func_args, **func_kwargs: Passed to `func`.
+
+    Returns:
+        The result of `func`.
+    """
+    if not getattr(args, 'profile', None):
+        return func(*func_args, **func_kwargs)
+
+    session = ProfileSession(
+        label,
+        modes=parse_modes(args.profile),
+        output_dir=args.profile_dir or os.environ.get(PROFILE_DIR_ENV),
+        top=args.profile_top or DEFAULT_TOP,
+    )
+    try:
+        with session:
+            return func(*func_args, **func_kwargs)
+    finally:
+        for path in session.paths:
+            print(f'Profile written to {path}', file=sys.stderr)
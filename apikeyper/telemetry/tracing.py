@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+tracing.py
+----------
+Author: tayja
+Date: 10/19/2026
+
+This module provides the tracing hooks of APIKeyPER, so that traces show how much of a request was spent on API keys.
+
+APIKeyPER opens a span around:
+
+    - apikeyper.decorator.resolve / apikeyper.decorator.aresolve: Key resolution by the decorators ('services',
+      'service_count').
+    - apikeyper.db.<operation>: `APIKeyDB` queries ('service', 'row_count').
+    - apikeyper.encryption_key.load: Loading an `EncryptionKey` ('storage_method').
+    - apikeyper.crypt.load / apikeyper.crypt.save: `CryptDB` loads and saves ('file_path', 'record_count').
+
+The spans go to the installed `Tracer`. By default, that is `NOOP_TRACER`, and instrumented code only checks
+`TRACING.enabled` before going on. Install a tracer with `set_tracer`:
+
+    - `OpenTelemetryTracer()` hands the spans to OpenTelemetry (the `opentelemetry-api` package), as children of the
+      current OpenTelemetry span::
+
+          from apikeyper.telemetry.tracing import OpenTelemetryTracer, set_tracer
+
+          set_tracer(OpenTelemetryTracer())
+
+    - `RecordingTracer(exporter)` records the spans itself and hands each finished one to an exporter, such as the
+      `InMemoryExporter` used by the tests.
+
+Span timings are read with `time.perf_counter_ns`.
+"""
+
+import contextvars
+import time
+from typing import Any, Dict, List, Optional
+
+
+class Span:
+    """
+    A timed operation.
+
+    Attributes:
+        name (str): The span name.
+        attributes (dict): The span attributes.
+        parent (Span or None): The span that was current when this one started.
+        start_ns (int): The `perf_counter_ns` reading when the span started.
+        end_ns (int or None): The `perf_counter_ns` reading when the span ended.
+        error (BaseException or None): The exception that ended the span, if any.
+    """
+
+    __slots__ = ("name", "attributes", "parent", "start_ns", "end_ns", "error", "_token")
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None, parent: Optional["Span"] = None):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.parent = parent
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.error = None
+        self._token = None
+
+    @property
+    def duration_ns(self) -> Optional[int]:
+        return None if self.end_ns is None else self.end_ns - self.start_ns
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, error: BaseException) -> None:
+        self.error = error
+
+    def __repr__(self):
+        return f"<Span {self.name} {self.attributes} {self.duration_ns} ns>"
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key, value):
+        pass
+
+    def record_exception(self, error):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    The hook interface. A tracer starts and ends the spans APIKeyPER opens; subclasses decide what to do with them.
+    """
+
+    enabled = True
+    """Whether APIKeyPER should open spans at all. Instrumented code skips all tracing work when this is False."""
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        """
+        Start a span.
+
+        Args:
+            name (str): The span name.
+            attributes (dict, optional): The span attributes.
+
+        Returns:
+            A span, with `set_attribute(key, value)` and `record_exception(error)` methods.
+        """
+        raise NotImplementedError
+
+    def end_span(self, span) -> None:
+        """
+        End a span returned by `start_span`.
+        """
+        raise NotImplementedError
+
+
+class NoopTracer(Tracer):
+    """
+    A tracer that does nothing. It is installed by default.
+    """
+
+    enabled = False
+
+    def start_span(self, name, attributes=None):
+        return NOOP_SPAN
+
+    def end_span(self, span):
+        pass
+
+
+NOOP_TRACER = NoopTracer()
+
+
+class InMemoryExporter:
+    """
+    Keeps finished spans in a list.
+
+    Attributes:
+        spans (list[Span]): The finished spans, in the order they ended.
+    """
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def find(self, name: str) -> List[Span]:
+        """
+        list[Span]: The finished spans with the given name.
+        """
+        return [span for span in self.spans if span.name == name]
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+_CURRENT_SPAN = contextvars.ContextVar("apikeyper_current_span", default=None)
+
+
+class RecordingTracer(Tracer):
+    """
+    A tracer that records spans itself, nesting them by context (threads and asyncio tasks each have their own current
+    span), and hands each finished span to an exporter.
+    """
+
+    def __init__(self, exporter=None):
+        """
+        Args:
+            exporter (optional): An object with an `export(span)` method. Defaults to a new `InMemoryExporter`.
+        """
+        self.exporter = exporter if exporter is not None else InMemoryExporter()
+
+    def start_span(self, name, attributes=None):
+        span = Span(name, attributes, _CURRENT_SPAN.get())
+        span._token = _CURRENT_SPAN.set(span)
+        return span
+
+    def end_span(self, span):
+        span.end_ns = time.perf_counter_ns()
+        _CURRENT_SPAN.reset(span._token)
+        self.exporter.export(span)
+
+
+class _OpenTelemetrySpan:
+    __slots__ = ("span", "token")
+
+    def __init__(self, span, token):
+        self.span = span
+        self.token = token
+
+    def set_attribute(self, key, value):
+        self.span.set_attribute(key, value)
+
+    def record_exception(self, error):
+        from opentelemetry.trace import Status, StatusCode
+
+        self.span.record_exception(error)
+        self.span.set_status(Status(StatusCode.ERROR, str(error)))
+
+
+class OpenTelemetryTracer(Tracer):
+    """
+    A tracer that hands the spans to OpenTelemetry. Requires the `opentelemetry-api` package.
+
+    OpenTelemetry timestamps are nanoseconds since the epoch. They are computed from `perf_counter_ns`, anchored to
+    the wall clock once when the tracer is created, so span durations are not affected by clock adjustments.
+    """
+
+    def __init__(self, tracer=None, instrumentation_name: str = "apikeyper"):
+        """
+        Args:
+            tracer (opentelemetry.trace.Tracer, optional): The OpenTelemetry tracer. Defaults to the one the global
+                tracer provider gives `instrumentation_name`.
+            instrumentation_name (str, optional): The instrumentation scope name. Defaults to 'apikeyper'.
+
+        Raises:
+            ImportError: If OpenTelemetry is not installed.
+        """
+        try:
+            from opentelemetry import context, trace
+        except ImportError as e:
+            raise ImportError("OpenTelemetryTracer requires the 'opentelemetry-api' package") from e
+
+        self._context = context
+        self._trace = trace
+        self.tracer = tracer if tracer is not None else trace.get_tracer(instrumentation_name)
+        self._epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+
+    def _now(self) -> int:
+        return self._epoch_offset_ns + time.perf_counter_ns()
+
+    def start_span(self, name, attributes=None):
+        span = self.tracer.start_span(name, attributes=attributes, start_time=self._now())
+        token = self._context.attach(self._trace.set_span_in_context(span))
+        return _OpenTelemetrySpan(span, token)
+
+    def end_span(self, span):
+        self._context.detach(span.token)
+        span.span.end(end_time=self._now())
+
+
+class _SpanScope:
+    """
+    A context manager that starts a span on entry and ends it on exit, recording any exception.
+    """
+
+    __slots__ = ("tracer", "name", "attributes", "span")
+
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+
+    def __enter__(self):
+        self.span = self.tracer.start_span(self.name, self.attributes)
+        return self.span
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc is not None:
+            self.span.record_exception(exc)
+        self.tracer.end_span(self.span)
+        return False
+
+
+class _NoopScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NOOP_SCOPE = _NoopScope()
+
+
+class TracingHooks:
+    """
+    Holds the installed tracer.
+
+    Attributes:
+        tracer (Tracer): The installed tracer.
+        enabled (bool): Whether the installed tracer wants spans. Instrumented code checks this first.
+    """
+
+    def __init__(self):
+        self.tracer = NOOP_TRACER
+        self.enabled = False
+
+    def set_tracer(self, tracer: Optional[Tracer]) -> Tracer:
+        """
+        Install a tracer.
+
+        Args:
+            tracer (Tracer or None): The tracer. None installs `NOOP_TRACER`.
+
+        Returns:
+            Tracer: The tracer that was installed before.
+        """
+        previous = self.tracer
+        self.tracer = tracer if tracer is not None else NOOP_TRACER
+        self.enabled = bool(self.tracer.enabled)
+        return previous
+
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        """
+        Open a span around a block::
+
+            with TRACING.span("apikeyper.crypt.save", {"file_path": path}) as span:
+                ...
+                span.set_attribute("record_count", count)
+
+        Args:
+            name (str): The span name.
+            attributes (dict, optional): The span attributes.
+
+        Returns:
+            A context manager that yields the span.
+        """
+        if not self.enabled:
+            return _NOOP_SCOPE
+        return _SpanScope(self.tracer, name, attributes)
+
+
+TRACING = TracingHooks()
+
+
+def set_tracer(tracer: Optional[Tracer]) -> Tracer:
+    """
+    Install a tracer (see `TracingHooks.set_tracer`).
+    """
+    return TRACING.set_tracer(tracer)
+
+
+def get_tracer() -> Tracer:
+    """
+    Get the installed tracer.
+    """
+    return TRACING.tracer
+
+
+def span(name: str, attributes: Optional[Dict[str, Any]] = None):
+    """
+    Open a span around a block, with the installed tracer (see `TracingHooks.span`).
+    """
+    return TRACING.span(name, attributes)
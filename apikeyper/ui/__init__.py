@@ -10,13 +10,25 @@ File:
 import getpass
 from typing import Optional
 from apikeyper import APIKeyPER
-from apikeyper.utils import PackageChecker
 from apikeyper.log_engine import LOG_DEVICE as ROOT_LOGGER
 
-from rich.console import Console
 
+def __getattr__(name: str):
+    """
+    Create the Rich `CONSOLE`, and import `PackageChecker`, on first access (PEP 562), so that importing the UI does
+    not import Rich or the package checker.
+    """
+    if name == 'CONSOLE':
+        from rich.console import Console
+
+        value = Console()
+    elif name == 'PackageChecker':
+        from apikeyper.utils import PackageChecker as value
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
-CONSOLE = Console()
+    globals()[name] = value
+    return value
 
 
 LOG_DEVICE = ROOT_LOGGER.get_child("ui")
@@ -25,7 +37,7 @@ LOGGER = LOG_DEVICE.logger
 
 DEFAULT_PASSWORD_PROMPT = "Enter password: "
 
-LOGGER.debug(f"Default password prompt: {DEFAULT_PASSWORD_PROMPT}")
+LOGGER.debug("Default password prompt: %s", DEFAULT_PASSWORD_PROMPT)
 
 
 class CLI:
@@ -11,23 +11,151 @@ of a list of Python packages within the current environment.
 
 The main functionality of the `PackageChecker` class is to take a list of package names
 as input and return a dictionary indicating which packages are installed and which are not.
+A package name may be followed by a version specifier, in which case the installed version
+must match it.
 
 Usage example::
 
-    checker = PackageChecker(["numpy", "tensorflow"])
+    checker = PackageChecker(["numpy", "tensorflow", "rich>=13"])
     status = checker.check_installed_packages()
-    print(status)  # Output might be: {"numpy": True, "tensorflow": False}
+    print(status)  # Output might be: {"numpy": True, "tensorflow": False, "rich>=13": True}
+
+Names are matched exactly, after PEP 503 normalization (case-insensitive, with runs of
+'-', '_' and '.' treated alike), so "pysimplegui" matches "PySimpleGUI" but "gui" does not.
+
+The installed distributions are looked up with `importlib.metadata` once per process and
+indexed by normalized name (see `installed_distributions`), so checks are dictionary lookups.
+Versions are only read, once, for packages checked against a specifier.
 
 Dependencies:
-    This module requires the `pkg_resources` module to determine the installation status of packages.
+    Version specifiers are evaluated with the `packaging` package, which is only imported
+    when a specifier is checked.
 
 Note:
     Ensure the list of packages provided to the `PackageChecker` class are correctly named
     as they appear in the Python Package Index (PyPI) or your local installation.
 """
 
+import functools
+import re
+from typing import Optional
+
+
+_SEPARATORS = re.compile(r"[-_.]+")
+_REQUIREMENT = re.compile(r"^\s*([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)\s*(?:\[[^\]]*\])?\s*(.*?)\s*$")
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize a package name as PEP 503 does.
+
+    Args:
+        name (str): The package name.
+
+    Returns:
+        str: The name in lower case, with each run of '-', '_' and '.' replaced by '-'.
+    """
+    return _SEPARATORS.sub("-", name).lower()
+
 
-import pkg_resources
+@functools.lru_cache(maxsize=None)
+def installed_distributions() -> dict:
+    """
+    Index the installed distributions by normalized name. The index is built on the first call and cached; call
+    `refresh_installed_packages` after installing or removing packages at run time.
+
+    When a distribution is found more than once on `sys.path`, the first one wins, as with `importlib.metadata`.
+
+    Returns:
+        dict: The distribution of each installed package, by normalized name. Do not modify it.
+    """
+    from importlib import metadata
+
+    index = {}
+    for distribution in metadata.distributions():
+        name = distribution.metadata["Name"]
+        if name:
+            index.setdefault(normalize_name(name), distribution)
+    return index
+
+
+def parse_requirement(requirement: str) -> tuple:
+    """
+    Split a package requirement into its name and version specifier.
+
+    Args:
+        requirement (str): A package name, optionally followed by a version specifier (e.g. 'rich>=13,<14'). Extras
+            ('rich[jupyter]') are ignored.
+
+    Returns:
+        tuple[str, str]: The normalized name and the specifier ('' if there is none).
+
+    Raises:
+        ValueError: If the requirement does not start with a valid package name.
+    """
+    match = _REQUIREMENT.match(requirement)
+    if match is None:
+        raise ValueError(f"Invalid package requirement: {requirement!r}")
+    return normalize_name(match.group(1)), match.group(2)
+
+
+def installed_version(name: str) -> Optional[str]:
+    """
+    Get the installed version of a package. Versions are read from the package metadata once, and cached.
+
+    Args:
+        name (str): The package name.
+
+    Returns:
+        str or None: The version, or None if the package is not installed.
+    """
+    return _installed_version(normalize_name(name))
+
+
+@functools.lru_cache(maxsize=None)
+def _installed_version(normalized_name):
+    distribution = installed_distributions().get(normalized_name)
+    return None if distribution is None else distribution.version
+
+
+def refresh_installed_packages() -> None:
+    """
+    Forget the cached index of installed distributions and their versions, so the next check looks them up again.
+    """
+    installed_distributions.cache_clear()
+    _installed_version.cache_clear()
+
+
+@functools.lru_cache(maxsize=256)
+def _specifier_set(specifier: str):
+    try:
+        from packaging.specifiers import SpecifierSet
+    except ImportError as e:
+        raise ImportError("Checking package versions requires the 'packaging' package") from e
+
+    return SpecifierSet(specifier)
+
+
+def is_installed(requirement: str) -> bool:
+    """
+    Check whether a package is installed, and if the requirement has a version specifier, whether the installed
+    version matches it (pre-releases included).
+
+    Args:
+        requirement (str): A package name, optionally followed by a version specifier (e.g. 'rich>=13').
+
+    Returns:
+        bool: Whether the requirement is met.
+
+    Raises:
+        ValueError: If the requirement is not a valid package name and specifier (`packaging`'s `InvalidSpecifier`
+            is a ValueError).
+    """
+    name, specifier = parse_requirement(requirement)
+    specifier_set = _specifier_set(specifier) if specifier else None
+    if name not in installed_distributions():
+        return False
+    return specifier_set is None or specifier_set.contains(_installed_version(name), prereleases=True)
 
 
 class PackageChecker:
@@ -35,29 +163,22 @@ class PackageChecker:
     A class to check the installation status of a list of Python packages.
 
     Attributes:
-        packages_list (list): A list of package names to check.
+        packages_list (list): A list of package names, each optionally followed by a version specifier, to check.
     """
 
     def __init__(self, packages_list: list):
         """
         Args:
-            packages_list (list): A list of package names to check.
+            packages_list (list): A list of package names, each optionally followed by a version specifier
+                (e.g. 'rich>=13'), to check.
         """
         self.packages_list = packages_list
 
     def check_installed_packages(self) -> dict:
         """
-        Check which packages from the list are installed.
+        Check which packages from the list are installed (in a matching version, if one is specified).
 
         Returns:
             dict: A dictionary with package names as keys and their installation status (True/False) as values.
         """
-        installed_packages = pkg_resources.working_set
-        installed_packages_list = sorted(
-            ["%s==%s" % (i.key, i.version) for i in installed_packages]
-        )
-
-        return {
-            pkg: any([pkg in item for item in installed_packages_list])
-            for pkg in self.packages_list
-        }
+        return {pkg: is_installed(pkg) for pkg in self.packages_list}
@@ -22,10 +22,10 @@ It offers both function-level and class-level decorators:
             If a single string is provided, it's converted to a list.
 
 2. `apikey_required_class(service_names)`:
-    A decorator for classes. When an instance of a class decorated with this is created,
-    it checks if the required API keys are available for the given services.
+    A decorator for classes. It installs a class attribute for each service (e.g. `SERVICE1_API_KEY`) that looks up
+    the API key the first time it is read, from the class or any instance, and then keeps it for that class.
     If a key is not found in the database, it prompts the user for input and saves the provided key.
-    It then sets the API key as a class attribute.
+    Creating instances does not look anything up. `invalidate_api_keys(cls)` makes the next read look again.
 
     Parameters:
         service_names: A list of service names for which API keys are needed.
@@ -42,57 +42,151 @@ Usage example::
         pass
 
 Note:
-    This module uses the APIKeyPER database manager for retrieving and storing API keys.Ensure that the APIKeyPER
-    manager is initialized and connected to the correct database before use.
+    This module uses the APIKeyPER database manager for retrieving and storing API keys. Both decorators take an
+    optional `db_path` (defaulting to `default_apikeys.db` in the current directory). Everything that can be worked
+    out ahead of time, such as the database path and whether the function accepts `api_keys`, is computed when the
+    decorator is applied. Keys are found by a resolver chain (see `apikeyper.utils.resolvers`): environment variables,
+    an optional secrets file, the database (through a process-wide cache shared per database file, see
+    `apikeyper.utils.key_cache`), then a console prompt. Results are remembered, so a decorated call normally costs a
+    few dict lookups. With `strict=True` (or `APIKEYPER_STRICT=1`) there is no prompt, and a missing key raises
+    `MissingAPIKeyError` at once, which is what headless workers want.
+
+    Every use of the decorators is recorded in `apikeyper.utils.registry`, so `apikeyper.warmup()` can load all the
+    keys at startup and report missing ones before the first request. While metrics are enabled, the time spent
+    resolving keys is recorded as the 'decorator' operations of `apikeyper.telemetry.metrics`, and while a tracer is
+    installed, it is traced as 'apikeyper.decorator.resolve' spans (see `apikeyper.telemetry.tracing`). With
+    `APIKEYPER_PROFILE` set, the first resolutions are profiled (see `apikeyper.telemetry.profiling`).
+
+    `apikey_required` also accepts coroutine functions and async generators. Their wrappers are async too: the keys are
+    looked up concurrently without blocking the event loop, and a missing key is either requested from the `prompt`
+    coroutine function given to the decorator or, if there is none, reported by raising `MissingAPIKeyError`::
+
+        async def ask(service_name):
+            return await my_ui.request_secret(service_name)
+
+        @apikey_required(['service1', 'service2'], prompt=ask)
+        async def handler(request, api_keys=None):
+            pass
 
 """
 
+import functools
 import inspect
-from typing import Union, List, Any, Callable
-from apikeyper import APIKeyPER
+import threading
+import time
+from pathlib import Path
+from typing import Union, List, Any, Awaitable, Callable, Optional
 
+from apikeyper.telemetry.metrics import METRICS
+from apikeyper.telemetry.profiling import PROFILING
+from apikeyper.telemetry.tracing import TRACING
+from apikeyper.utils.key_cache import DEFAULT_DECORATOR_DB_FILEPATH
+from apikeyper.utils.registry import REGISTRY
+from apikeyper.utils.resolvers import MissingAPIKeyError, ResolverChain, default_resolver
 
-def apikey_required(service_names: Union[str, List[str]]) -> Callable:
+
+def _normalize_service_names(service_names):
+    if not isinstance(service_names, list):
+        service_names = [service_names]
+    return tuple(service_names)
+
+
+def _accepts_api_keys(func):
+    parameters = inspect.signature(func).parameters
+    return 'api_keys' in parameters or any(param.kind == param.VAR_KEYWORD for param in parameters.values())
+
+
+def apikey_required(
+        service_names: Union[str, List[str]],
+        db_path: Union[str, Path] = DEFAULT_DECORATOR_DB_FILEPATH,
+        cache_ttl: Optional[float] = None,
+        prompt: Optional[Callable[[str], Awaitable[str]]] = None,
+        strict: Optional[bool] = None,
+        secrets_file: Optional[Union[str, Path]] = None,
+        resolver: Optional[ResolverChain] = None,
+) -> Callable:
     """
     A decorator to ensure API keys are available for given services.
-    If a key is not available in the database, it prompts the user for input.
+    If a key is not available in the environment, the secrets file or the database, it prompts the user for input,
+    or raises `MissingAPIKeyError` in strict mode.
+
+    Coroutine functions and async generators get async wrappers that never block the event loop. For those, a
+    missing key is requested by awaiting `prompt`; without one, `MissingAPIKeyError` is raised.
     
     Parameters:
         service_names: A list of service names for which API keys are needed.
             If a single string is provided, it's converted to a list.
+        db_path: The path to the database file. Defaults to `default_apikeys.db` in the current directory.
+        cache_ttl: Seconds between checks of the database file for changes. Defaults to 60.
+        prompt: A coroutine function taking a service name and returning its API key, used by async wrappers when a
+            key is missing.
+        strict: Raise `MissingAPIKeyError` on a missing key instead of prompting. Defaults to `$APIKEYPER_STRICT`.
+        secrets_file: A secrets file to look in before the database. Defaults to `$APIKEYPER_SECRETS_FILE`.
+        resolver: A custom resolver chain, replacing the default one built from the arguments above.
             
     Returns:
         The decorated function with API key management.
     """
-    if not isinstance(service_names, list):
-        service_names = [service_names]
+    service_names = _normalize_service_names(service_names)
+    resolve_metrics = METRICS.operation('decorator', 'resolve')
+    aresolve_metrics = METRICS.operation('decorator', 'aresolve')
 
     def decorator(func: Callable) -> Callable:
+        chain = resolver or default_resolver(db_path, cache_ttl, strict, secrets_file, prompt)
+        REGISTRY.register(service_names, chain, func.__qualname__)
+        # Only inject api_keys if the function accepts it
+        inject = _accepts_api_keys(func)
+        resolve_many = resolve_metrics(chain.resolve_many)
+        span_attributes = {'services': ','.join(service_names), 'service_count': len(service_names)}
+
+        def resolve(names):
+            if not (TRACING.enabled or PROFILING.enabled):
+                return resolve_many(names)
+            with PROFILING.session('decorator.resolve'), TRACING.span('apikeyper.decorator.resolve', span_attributes):
+                return resolve_many(names)
+
+        async def aresolve(names):
+            if not (METRICS.enabled or TRACING.enabled):
+                return await chain.aresolve_many(names)
+
+            with TRACING.span('apikeyper.decorator.aresolve', span_attributes):
+                start = time.perf_counter_ns()
+                try:
+                    return await chain.aresolve_many(names)
+                except Exception:
+                    if METRICS.enabled:
+                        aresolve_metrics.errors.inc()
+                    raise
+                finally:
+                    if METRICS.enabled:
+                        aresolve_metrics.seconds.observe((time.perf_counter_ns() - start) / 1e9)
+
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def async_gen_wrapper(*args, **kwargs):
+                api_keys = await aresolve(service_names)
+                if inject:
+                    kwargs['api_keys'] = api_keys
+                async for item in func(*args, **kwargs):
+                    yield item
+
+            return async_gen_wrapper
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                api_keys = await aresolve(service_names)
+                if inject:
+                    kwargs['api_keys'] = api_keys
+                return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            from apikeyper import APIKeyPER
-            from pathlib import Path
-            api_manager = APIKeyPER(Path("default_apikeys.db"))
-
-
-            api_keys = {}
-            for service_name in service_names:
-                api_key = api_manager.get_key(service_name)
-                if not api_key:
-                    print(
-                        f'No API key found for {service_name}. Please provide the API key:'
-                    )
-                    user_api_key = input()  # Get user input for the API key
-                    api_manager.add_key(service_name, user_api_key)
-                    api_keys[service_name] = user_api_key
-                else:
-                    api_keys[service_name] = api_key[3]  # Get the key field from the tuple
-
-
-            # Only inject api_keys if the function accepts it
-            sig = inspect.signature(func)
-            if 'api_keys' in sig.parameters or any(param.kind == param.VAR_KEYWORD for param in sig.parameters.values()):
+            api_keys = resolve(service_names)
+            if inject:
                 kwargs['api_keys'] = api_keys
-            
             return func(*args, **kwargs)
 
         return wrapper
@@ -100,53 +194,113 @@ def apikey_required(service_names: Union[str, List[str]]) -> Callable:
     return decorator
 
 
-def apikey_required_class(service_names: Union[str, List[str]]) -> Callable:
+@METRICS.operation('decorator', 'resolve_attribute')
+def _resolve_attribute(resolver, service_name):
+    with TRACING.span('apikeyper.decorator.resolve', {'services': service_name, 'service_count': 1}):
+        return resolver.resolve(service_name)
+
+
+class APIKeyAttribute:
+    """
+    A class attribute holding a service's API key, looked up on first read and then kept per class.
+
+    Reads after the first one are a dict lookup and never touch the class, so instances can be created and used from
+    any number of threads.
+
+    Attributes:
+        service_name (str): The service name.
+        resolver (ResolverChain): The resolver chain the key is looked up with.
+    """
+
+    def __init__(self, service_name: str, resolver: ResolverChain):
+        self.service_name = service_name
+        self.resolver = resolver
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def __get__(self, instance, owner=None):
+        owner = owner if owner is not None else type(instance)
+        try:
+            return self._keys[owner]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if owner not in self._keys:
+                self._keys[owner] = _resolve_attribute(self.resolver, self.service_name)
+            return self._keys[owner]
+
+    def invalidate(self, owner: Optional[type] = None) -> None:
+        """
+        Forget the key, for one class or all of them, so the next read looks it up again.
+
+        Args:
+            owner (type, optional): The class to forget the key for. Defaults to all classes.
+        """
+        with self._lock:
+            if owner is None:
+                self._keys.clear()
+            else:
+                self._keys.pop(owner, None)
+            self.resolver.invalidate(self.service_name)
+
+
+def invalidate_api_keys(cls: type, service_names: Optional[Union[str, List[str]]] = None) -> None:
+    """
+    Make a class decorated with `apikey_required_class` look its API keys up again on the next read, e.g. after a
+    key was rotated.
+
+    Parameters:
+        cls: The decorated class (or a subclass of it).
+        service_names: The services to forget. Defaults to all of them.
+    """
+    wanted = None if service_names is None else set(_normalize_service_names(service_names))
+
+    for klass in cls.__mro__:
+        for attribute in vars(klass).values():
+            if isinstance(attribute, APIKeyAttribute) and (wanted is None or attribute.service_name in wanted):
+                attribute.invalidate(cls)
+
+
+def apikey_required_class(
+        service_names: Union[str, List[str]],
+        db_path: Union[str, Path] = DEFAULT_DECORATOR_DB_FILEPATH,
+        cache_ttl: Optional[float] = None,
+        strict: Optional[bool] = None,
+        secrets_file: Optional[Union[str, Path]] = None,
+        resolver: Optional[ResolverChain] = None,
+) -> Callable:
     """
     A class decorator to ensure API keys are available for given services.
-    If a key is not available in the database, it prompts the user for input.
+    If a key is not available in the environment, the secrets file or the database, it prompts the user for input,
+    or raises `MissingAPIKeyError` in strict mode.
     
-    This decorator modifies the class __init__ method to:
-    1. Ensure all required API keys are available before calling the original __init__
-    2. Set instance attributes for each service key (e.g., service1_key)
-    3. Inject service keys into __init__ kwargs if the parameters exist and aren't provided
+    This decorator installs an `APIKeyAttribute` for each service key (e.g., SERVICE1_API_KEY) on the class. The key is
+    looked up the first time the attribute is read and kept for the class until `invalidate_api_keys` is called.
+    `__init__` is left untouched, so creating instances costs nothing extra.
     
     Parameters:
         service_names: A list of service names for which API keys are needed.
             If a single string is provided, it's converted to a list.
+        db_path: The path to the database file. Defaults to `default_apikeys.db` in the current directory.
+        cache_ttl: Seconds between checks of the database file for changes. Defaults to 60.
+        strict: Raise `MissingAPIKeyError` on a missing key instead of prompting. Defaults to `$APIKEYPER_STRICT`.
+        secrets_file: A secrets file to look in before the database. Defaults to `$APIKEYPER_SECRETS_FILE`.
+        resolver: A custom resolver chain, replacing the default one built from the arguments above.
             
     Returns:
         The decorated class with API key management.
     """
-    if not isinstance(service_names, list):
-        service_names = [service_names]
+    service_names = _normalize_service_names(service_names)
+    attribute_names = {service_name: f"{service_name.upper()}_API_KEY" for service_name in service_names}
 
     def decorator(cls: Any) -> Any:
-        original_init = cls.__init__
-
-        def new_init(self, *args, **kwargs):
-            from apikeyper import APIKeyPER
-            from pathlib import Path
-            api_manager = APIKeyPER(Path("default_apikeys.db"))
-
-
-            # Collect API keys and ensure they're available
-            collected_keys = {}
-            for service_name in service_names:
-                api_key = api_manager.get_key(service_name)
-                if not api_key:
-                    print(
-                        f'No API key found for {service_name}. Please provide the API key:'
-                    )
-                    user_api_key = input()  # Get user input for the API key
-                    api_manager.add_key(service_name, user_api_key)
-                    collected_keys[service_name] = user_api_key
-                else:
-                    setattr(cls, f"{service_name.upper()}_API_KEY", api_key[3])
-
+        chain = resolver or default_resolver(db_path, cache_ttl, strict, secrets_file)
+        REGISTRY.register(service_names, chain, cls.__qualname__)
 
-            original_init(self, *args, **kwargs)
+        for service_name, attribute_name in attribute_names.items():
+            setattr(cls, attribute_name, APIKeyAttribute(service_name, chain))
 
-        cls.__init__ = new_init
         return cls
 
     return decorator
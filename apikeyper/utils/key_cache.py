@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+key_cache.py
+------------
+Author: tayja
+Date: 10/19/2026
+
+This module provides the process-wide API key cache used by the decorators in `apikeyper.utils.decorators`.
+
+There is one `KeyCache` (and one `APIKeyPER` manager) per database file, shared by every decorator that uses that
+file. Keys are served from memory. Once `ttl` seconds have passed, the next lookup checks whether the database file
+changed (its inode, size, mtime, or the change counter SQLite keeps in the file header); only if it did are the cached
+keys dropped and the database reopened. The same check is made before every lookup of a key that is not cached yet.
+Keys added through the cache are visible immediately.
+
+Coroutines use `aget_many` and `aadd`, which run any database access in worker threads so the event loop never blocks.
+They import asyncio themselves, so synchronous programs never load it.
+
+Usage example::
+
+    cache = get_key_cache("default_apikeys.db")
+    cache.get("github")  # -> "ghp_..." or None
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from apikeyper import APIKeyPER
+
+
+DEFAULT_DECORATOR_DB_FILEPATH = Path("default_apikeys.db")
+DEFAULT_KEY_CACHE_TTL = 60.0
+
+# The index of the key column in the rows returned by `APIKeyPER.get_key`.
+KEY_COLUMN = 3
+
+# SQLite increments this big-endian counter in the database header on every committed write.
+CHANGE_COUNTER_OFFSET = 24
+CHANGE_COUNTER_SIZE = 4
+
+
+def _file_signature(path):
+    try:
+        with open(path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            file.seek(CHANGE_COUNTER_OFFSET)
+            counter = file.read(CHANGE_COUNTER_SIZE)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns, counter
+
+
+class KeyCache:
+    """
+    A thread-safe TTL cache of the API keys stored in one database file.
+
+    Attributes:
+        db_path (Path): The path to the database file.
+        ttl (float): Seconds between checks of the database file for changes.
+    """
+
+    def __init__(self, db_path: Union[str, Path], ttl: float = DEFAULT_KEY_CACHE_TTL):
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self._keys = {}
+        self._manager = None
+        self._signature = None
+        self._expires = 0.0
+        self._lock = threading.RLock()
+
+    @property
+    def manager(self) -> APIKeyPER:
+        """
+        APIKeyPER: The manager for the database file, opened on first use and shared by all threads.
+        """
+        with self._lock:
+            if self._manager is None:
+                # All access goes through `self._lock`, so the connection can safely be shared between threads.
+                self._manager = APIKeyPER(self.db_path, check_same_thread=False)
+                self._signature = _file_signature(self.db_path)
+            return self._manager
+
+    def _revalidate(self, now):
+        signature = _file_signature(self.db_path)
+        if signature != self._signature:
+            self._keys.clear()
+            self.close()
+            self._signature = signature
+        self._expires = now + self.ttl
+
+    def get(self, service: str) -> Optional[str]:
+        """
+        Get the API key for a service.
+
+        Args:
+            service (str): The service name.
+
+        Returns:
+            str or None: The API key, or None if the database has none for the service.
+        """
+        if time.monotonic() < self._expires and (key := self._keys.get(service)) is not None:
+            return key
+
+        with self._lock:
+            now = time.monotonic()
+            # A miss goes to the database anyway, so make sure it is still the same file first.
+            if now >= self._expires or service not in self._keys:
+                self._revalidate(now)
+
+            if (key := self._keys.get(service)) is None and (row := self.manager.get_key(service)):
+                key = self._keys[service] = row[KEY_COLUMN]
+            return key
+
+    def get_many(self, services: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Get the API keys for several services. When all of them are cached and fresh, this is a few dict lookups.
+
+        Args:
+            services (Iterable[str]): The service names.
+
+        Returns:
+            dict: The API key of each service, or None for services the database has no key for.
+        """
+        if time.monotonic() < self._expires:
+            keys = self._keys
+            try:
+                return {service: keys[service] for service in services}
+            except KeyError:
+                pass
+
+        return {service: self.get(service) for service in services}
+
+    def prefetch(self, services: Iterable[str]) -> List[str]:
+        """
+        Load the API keys of several services into the cache with one batched query.
+
+        Args:
+            services (Iterable[str]): The service names.
+
+        Returns:
+            list[str]: The services the database has no key for.
+        """
+        services = list(services)
+
+        with self._lock:
+            now = time.monotonic()
+            self._revalidate(now)
+            for service, row in self.manager.get_keys(services).items():
+                self._keys[service] = row[KEY_COLUMN]
+            return [service for service in services if service not in self._keys]
+
+    async def aget_many(self, services: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Like `get_many`, but for coroutines. Cached keys are returned without leaving the event loop; the others are
+        looked up concurrently in worker threads.
+
+        Args:
+            services (Iterable[str]): The service names.
+
+        Returns:
+            dict: The API key of each service, or None for services the database has no key for.
+        """
+        services = tuple(services)
+        if time.monotonic() < self._expires:
+            keys = self._keys
+            try:
+                return {service: keys[service] for service in services}
+            except KeyError:
+                pass
+
+        import asyncio
+
+        api_keys = await asyncio.gather(*(asyncio.to_thread(self.get, service) for service in services))
+        return dict(zip(services, api_keys))
+
+    def add(self, service: str, api_key: str) -> None:
+        """
+        Add an API key to the database and the cache.
+
+        Args:
+            service (str): The service name.
+            api_key (str): The API key.
+        """
+        with self._lock:
+            self.manager.add_key(service, api_key)
+            self._keys[service] = api_key
+            # Our own write is not a reason to drop the cache.
+            self._signature = _file_signature(self.db_path)
+
+    async def aadd(self, service: str, api_key: str) -> None:
+        """
+        Like `add`, but for coroutines. The database write runs in a worker thread.
+
+        Args:
+            service (str): The service name.
+            api_key (str): The API key.
+        """
+        import asyncio
+
+        await asyncio.to_thread(self.add, service, api_key)
+
+    def invalidate(self, service: Optional[str] = None) -> None:
+        """
+        Forget a cached key, or all of them, so the next lookup goes to the database.
+
+        Args:
+            service (str, optional): The service to forget. Defaults to all services.
+        """
+        with self._lock:
+            if service is None:
+                self._keys.clear()
+            else:
+                self._keys.pop(service, None)
+
+    def close(self) -> None:
+        """
+        Close the database connection. It is reopened on the next lookup that needs it.
+        """
+        with self._lock:
+            if self._manager is not None:
+                self._manager.db.close()
+                self._manager = None
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_key_cache(db_path: Union[str, Path] = DEFAULT_DECORATOR_DB_FILEPATH, ttl: Optional[float] = None) -> KeyCache:
+    """
+    Get the shared key cache for a database file, creating it on first use.
+
+    Args:
+        db_path (str or Path, optional): The path to the database file. Defaults to `default_apikeys.db` in the
+            current directory.
+        ttl (float, optional): Seconds between checks of the database file for changes. Updates the TTL of an
+            existing cache; defaults to 60 seconds for a new one.
+
+    Returns:
+        KeyCache: The key cache.
+    """
+    path = os.path.abspath(db_path)
+
+    with _CACHES_LOCK:
+        if (cache := _CACHES.get(path)) is None:
+            cache = _CACHES[path] = KeyCache(path, DEFAULT_KEY_CACHE_TTL if ttl is None else ttl)
+        elif ttl is not None:
+            cache.ttl = ttl
+        return cache
+
+
+def clear_key_caches() -> None:
+    """
+    Drop every shared key cache and close their database connections.
+    """
+    with _CACHES_LOCK:
+        caches = list(_CACHES.values())
+        _CACHES.clear()
+
+    for cache in caches:
+        cache.close()
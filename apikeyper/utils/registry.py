@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+registry.py
+-----------
+Author: tayja
+Date: 10/19/2026
+
+This module records the services every use of `apikey_required` and `apikey_required_class` needs keys for, so that
+they can all be loaded ahead of time by `warmup()` (also available as `apikeyper.warmup()`).
+
+`warmup()` loads the registered keys with one batched query per database, fills the resolver chains of the decorators,
+and reports the services that have no key anywhere. Call it at process start, or in the parent process before forking
+workers, after the modules with decorated code are imported::
+
+    import my_service.handlers  # applies the decorators
+    import apikeyper
+
+    missing = apikeyper.warmup()
+    if missing:
+        raise SystemExit(f"Missing API keys: {', '.join(missing)}")
+"""
+
+import threading
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from apikeyper.utils.resolvers import DatabaseResolver, MissingAPIKeyError, ResolverChain
+
+
+class Registration(NamedTuple):
+    """
+    One use of a decorator: the services it needs and the resolver chain it looks them up with.
+    """
+
+    service_names: Tuple[str, ...]
+    resolver: ResolverChain
+    owner: str
+
+
+class ServiceRegistry:
+    """
+    A thread-safe record of the services decorated code needs API keys for.
+    """
+
+    def __init__(self):
+        self._registrations = []
+        self._lock = threading.Lock()
+
+    def register(self, service_names: Iterable[str], resolver: ResolverChain, owner: str = '') -> None:
+        """
+        Record a use of a decorator.
+
+        Args:
+            service_names (Iterable[str]): The services it needs keys for.
+            resolver (ResolverChain): The resolver chain it looks the keys up with.
+            owner (str, optional): The qualified name of the decorated function or class, for reports.
+        """
+        with self._lock:
+            self._registrations.append(Registration(tuple(service_names), resolver, owner))
+
+    def registrations(self) -> List[Registration]:
+        with self._lock:
+            return list(self._registrations)
+
+    def service_names(self) -> List[str]:
+        """
+        list[str]: The names of all registered services, sorted.
+        """
+        return sorted({name for registration in self.registrations() for name in registration.service_names})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._registrations.clear()
+
+
+REGISTRY = ServiceRegistry()
+
+
+def warmup(
+        registry: Optional[ServiceRegistry] = None,
+        raise_on_missing: bool = False,
+        close_connections: bool = True,
+) -> List[str]:
+    """
+    Load the API keys of every registered service ahead of time.
+
+    Each database is read with one batched query. The keys are then resolved through each decorator's resolver chain,
+    skipping interactive prompts, so decorated code finds them already remembered.
+
+    Args:
+        registry (ServiceRegistry, optional): The registry to warm up. Defaults to the global one.
+        raise_on_missing (bool, optional): Raise `MissingAPIKeyError` if any service has no key. Defaults to False.
+        close_connections (bool, optional): Close the database connections afterward, keeping the loaded keys. They
+            are reopened on demand, so this makes it safe to fork worker processes. Defaults to True.
+
+    Returns:
+        list[str]: The services that have no key, sorted.
+
+    Raises:
+        MissingAPIKeyError: If `raise_on_missing` is set and some keys are missing.
+    """
+    registrations = (registry or REGISTRY).registrations()
+
+    # One batched query per database, covering every service any decorator reads from it.
+    caches = {}
+    for registration in registrations:
+        for resolver in registration.resolver.resolvers:
+            if isinstance(resolver, DatabaseResolver):
+                caches.setdefault(id(resolver.cache), (resolver.cache, set()))[1].update(registration.service_names)
+
+    for cache, service_names in caches.values():
+        cache.prefetch(sorted(service_names))
+
+    missing = set()
+    for registration in registrations:
+        missing.update(registration.resolver.prefetch(registration.service_names))
+
+    if close_connections:
+        for cache, _ in caches.values():
+            cache.close()
+
+    missing = sorted(missing)
+    if missing and raise_on_missing:
+        raise MissingAPIKeyError(', '.join(missing))
+    return missing
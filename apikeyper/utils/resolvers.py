@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+resolvers.py
+------------
+Author: tayja
+Date: 10/19/2026
+
+This module provides the resolver chain the decorators in `apikeyper.utils.decorators` use to find API keys.
+
+A `ResolverChain` asks its resolvers in order and takes the first key found. The default chain is:
+
+1. `EnvResolver`: an environment variable named after the service (`GITHUB_API_KEY` for "github").
+2. `SecretsFileResolver`: a secrets file, if one is configured.
+3. `DatabaseResolver`: the APIKeyPER database, through the shared key cache.
+4. `PromptResolver`: ask on the console and store the answer in the database. Left out in strict mode.
+
+The chain is evaluated once per service, and the result (including a miss) is remembered for `ttl` seconds. When no
+resolver has the key, `MissingAPIKeyError` is raised, so in strict mode a missing key fails immediately instead of
+leaving a headless worker waiting for input that never comes.
+
+Strict mode and the secrets file can also be set through the environment, without touching the decorated code::
+
+    APIKEYPER_STRICT=1
+    APIKEYPER_SECRETS_FILE=/run/secrets/apikeys.json
+
+Usage example::
+
+    chain = ResolverChain([EnvResolver(), DatabaseResolver(get_key_cache("keys.db"))])
+    chain.resolve("github")  # -> "ghp_..." or raises MissingAPIKeyError
+"""
+
+import functools
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+from apikeyper.utils.key_cache import DEFAULT_DECORATOR_DB_FILEPATH, DEFAULT_KEY_CACHE_TTL, KeyCache, get_key_cache
+
+
+STRICT_ENV = "APIKEYPER_STRICT"
+SECRETS_FILE_ENV = "APIKEYPER_SECRETS_FILE"
+
+# Marks a cached miss, since None is not a valid key.
+_MISSING = object()
+
+
+class MissingAPIKeyError(LookupError):
+    """
+    Raised when a required API key is not in the database and there is no way to ask for it.
+    """
+
+    def __init__(self, service_name: str):
+        self.service_name = service_name
+        super().__init__(f'No API key found for {service_name}')
+
+
+def env_var_name(service_name: str) -> str:
+    """
+    Get the environment variable name for a service's API key, e.g. `GITHUB_API_KEY` for "github".
+    """
+    return f"{re.sub(r'[^0-9A-Za-z]', '_', service_name).upper()}_API_KEY"
+
+
+def strict_from_env() -> bool:
+    """
+    bool: Whether `$APIKEYPER_STRICT` asks for strict mode.
+    """
+    return os.environ.get(STRICT_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class Resolver:
+    """
+    Base class for the steps of a resolver chain.
+
+    Attributes:
+        blocking (bool): Whether `resolve` may block (e.g. on I/O). Async callers run blocking resolvers in a worker
+            thread.
+        interactive (bool): Whether `resolve` asks a person. Interactive resolvers are skipped by
+            `ResolverChain.prefetch`.
+    """
+
+    blocking = False
+    interactive = False
+
+    def resolve(self, service_name: str) -> Optional[str]:
+        """
+        Look up an API key.
+
+        Args:
+            service_name (str): The service name.
+
+        Returns:
+            str or None: The API key, or None if this resolver does not have it.
+        """
+        raise NotImplementedError
+
+    async def aresolve(self, service_name: str) -> Optional[str]:
+        """
+        Like `resolve`, but never blocks the event loop.
+        """
+        if self.blocking:
+            import asyncio
+
+            return await asyncio.to_thread(self.resolve, service_name)
+        return self.resolve(service_name)
+
+
+class EnvResolver(Resolver):
+    """
+    Reads API keys from environment variables named by `env_var_name`.
+    """
+
+    def resolve(self, service_name):
+        return os.environ.get(env_var_name(service_name)) or None
+
+
+class SecretsFileResolver(Resolver):
+    """
+    Reads API keys from a secrets file: a JSON object mapping service names to keys if the file name ends with
+    `.json`, and `service=key` lines otherwise. The file is read again whenever it changes.
+
+    Attributes:
+        path (Path): The secrets file.
+    """
+
+    blocking = True
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._secrets = {}
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        text = self.path.read_text(encoding="utf-8")
+        if self.path.suffix == ".json":
+            import json
+
+            return {str(name): str(value) for name, value in json.loads(text).items()}
+
+        secrets = {}
+        for line in text.splitlines():
+            line = line.strip()
+            if line and not line.startswith("#") and "=" in line:
+                name, _, value = line.partition("=")
+                secrets[name.strip()] = value.strip()
+        return secrets
+
+    def resolve(self, service_name):
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return None
+
+            signature = stat.st_ino, stat.st_size, stat.st_mtime_ns
+            if signature != self._signature:
+                self._secrets = self._load()
+                self._signature = signature
+            return self._secrets.get(service_name) or None
+
+
+class DatabaseResolver(Resolver):
+    """
+    Reads API keys from an APIKeyPER database through its shared `KeyCache`.
+
+    Attributes:
+        cache (KeyCache): The key cache of the database.
+    """
+
+    blocking = True
+
+    def __init__(self, cache: KeyCache):
+        self.cache = cache
+
+    def resolve(self, service_name):
+        return self.cache.get(service_name)
+
+
+class PromptResolver(Resolver):
+    """
+    Asks for missing API keys and stores the answers in the database.
+
+    Synchronous callers are asked on the console. Async callers await `async_prompt` instead, since `input()` would
+    block the event loop; without one, this resolver has no key for them.
+
+    Attributes:
+        cache (KeyCache): The key cache of the database the answers are stored in.
+        async_prompt (callable): A coroutine function taking a service name and returning its API key.
+    """
+
+    blocking = True
+    interactive = True
+
+    def __init__(self, cache: KeyCache, async_prompt: Optional[Callable[[str], Awaitable[str]]] = None):
+        self.cache = cache
+        self.async_prompt = async_prompt
+
+    def resolve(self, service_name):
+        print(
+            f'No API key found for {service_name}. Please provide the API key:'
+        )
+        user_api_key = input()  # Get user input for the API key
+        self.cache.add(service_name, user_api_key)
+        return user_api_key
+
+    async def aresolve(self, service_name):
+        if self.async_prompt is None:
+            return None
+
+        api_key = await self.async_prompt(service_name)
+        await self.cache.aadd(service_name, api_key)
+        return api_key
+
+
+class ResolverChain:
+    """
+    Resolves API keys by asking a list of resolvers in order, remembering each service's result.
+
+    Attributes:
+        resolvers (list[Resolver]): The resolvers, in order.
+        ttl (float): Seconds a result (key or miss) is remembered.
+    """
+
+    def __init__(self, resolvers: List[Resolver], ttl: float = DEFAULT_KEY_CACHE_TTL):
+        self.resolvers = list(resolvers)
+        self.ttl = ttl
+        self._results = {}
+        self._lock = threading.Lock()
+        # The task resolving each service for async callers, shared by concurrent lookups.
+        self._pending = {}
+
+    def _cached(self, service_name, now):
+        entry = self._results.get(service_name)
+        if entry is not None and now < entry[1]:
+            if entry[0] is _MISSING:
+                raise MissingAPIKeyError(service_name)
+            return entry[0]
+        return None
+
+    def _remember(self, service_name, api_key):
+        self._results[service_name] = (_MISSING if api_key is None else api_key, time.monotonic() + self.ttl)
+        if api_key is None:
+            raise MissingAPIKeyError(service_name)
+        return api_key
+
+    def resolve(self, service_name: str) -> str:
+        """
+        Resolve the API key for a service.
+
+        Args:
+            service_name (str): The service name.
+
+        Returns:
+            str: The API key.
+
+        Raises:
+            MissingAPIKeyError: If no resolver has the key.
+        """
+        if (api_key := self._cached(service_name, time.monotonic())) is not None:
+            return api_key
+
+        # One thread resolves at a time, so each service is looked up (or prompted for) only once.
+        with self._lock:
+            if (api_key := self._cached(service_name, time.monotonic())) is not None:
+                return api_key
+
+            for resolver in self.resolvers:
+                if (api_key := resolver.resolve(service_name)) is not None:
+                    break
+            return self._remember(service_name, api_key)
+
+    def resolve_many(self, service_names: Iterable[str]) -> Dict[str, str]:
+        """
+        Resolve the API keys for several services. When all of them are remembered, this is a few dict lookups.
+
+        Args:
+            service_names (Iterable[str]): The service names.
+
+        Returns:
+            dict: The API key of each service.
+
+        Raises:
+            MissingAPIKeyError: If no resolver has one of the keys.
+        """
+        return {service_name: self.resolve(service_name) for service_name in service_names}
+
+    async def aresolve(self, service_name: str) -> str:
+        """
+        Like `resolve`, but for coroutines. Blocking resolvers run in worker threads. Concurrent lookups of a service
+        in the same event loop share one pass through the chain, so it is looked up (or prompted for) only once.
+        """
+        if (api_key := self._cached(service_name, time.monotonic())) is not None:
+            return api_key
+
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        task = self._pending.get(service_name)
+        if task is None or task.get_loop() is not loop:
+            task = self._pending[service_name] = loop.create_task(self._aresolve_chain(service_name))
+            task.add_done_callback(functools.partial(self._forget_pending, service_name))
+
+        # A cancelled caller must not cancel the lookup the others are waiting for.
+        return await asyncio.shield(task)
+
+    def _forget_pending(self, service_name, task):
+        if self._pending.get(service_name) is task:
+            del self._pending[service_name]
+
+    async def _aresolve_chain(self, service_name):
+        if (api_key := self._cached(service_name, time.monotonic())) is not None:
+            return api_key
+
+        for resolver in self.resolvers:
+            if (api_key := await resolver.aresolve(service_name)) is not None:
+                break
+        return self._remember(service_name, api_key)
+
+    async def aresolve_many(self, service_names: Iterable[str]) -> Dict[str, str]:
+        """
+        Like `resolve_many`, but for coroutines. The services are resolved concurrently.
+        """
+        import asyncio
+
+        service_names = tuple(service_names)
+        api_keys = await asyncio.gather(*(self.aresolve(service_name) for service_name in service_names))
+        return dict(zip(service_names, api_keys))
+
+    def prefetch(self, service_names: Iterable[str]) -> List[str]:
+        """
+        Resolve and remember the API keys of several services ahead of time, without asking anyone for them.
+
+        Args:
+            service_names (Iterable[str]): The service names.
+
+        Returns:
+            list[str]: The services none of the non-interactive resolvers has a key for. These misses are not
+                remembered, so a later lookup can still prompt for them.
+        """
+        missing = []
+
+        with self._lock:
+            now = time.monotonic()
+            for service_name in service_names:
+                entry = self._results.get(service_name)
+                if entry is not None and now < entry[1] and entry[0] is not _MISSING:
+                    continue
+
+                for resolver in self.resolvers:
+                    if not resolver.interactive and (api_key := resolver.resolve(service_name)) is not None:
+                        self._remember(service_name, api_key)
+                        break
+                else:
+                    missing.append(service_name)
+
+        return missing
+
+    def invalidate(self, service_name: Optional[str] = None) -> None:
+        """
+        Forget a remembered result, or all of them, so the next lookup goes through the chain again.
+
+        Args:
+            service_name (str, optional): The service to forget. Defaults to all services.
+        """
+        with self._lock:
+            if service_name is None:
+                self._results.clear()
+            else:
+                self._results.pop(service_name, None)
+
+
+def default_resolver(
+        db_path: Union[str, Path] = DEFAULT_DECORATOR_DB_FILEPATH,
+        cache_ttl: Optional[float] = None,
+        strict: Optional[bool] = None,
+        secrets_file: Optional[Union[str, Path]] = None,
+        prompt: Optional[Callable[[str], Awaitable[str]]] = None,
+) -> ResolverChain:
+    """
+    Build the default resolver chain: environment, secrets file, database, then (unless strict) a prompt.
+
+    Args:
+        db_path (str or Path, optional): The path to the database file. Defaults to `default_apikeys.db` in the
+            current directory.
+        cache_ttl (float, optional): Seconds results are remembered, and between checks of the database file for
+            changes. Defaults to 60.
+        strict (bool, optional): Raise `MissingAPIKeyError` on a miss instead of prompting. Defaults to
+            `$APIKEYPER_STRICT`.
+        secrets_file (str or Path, optional): The secrets file. Defaults to `$APIKEYPER_SECRETS_FILE`, if set.
+        prompt (callable, optional): A coroutine function asked for missing keys by async callers.
+
+    Returns:
+        ResolverChain: The resolver chain.
+    """
+    cache = get_key_cache(db_path, cache_ttl)
+    strict = strict_from_env() if strict is None else strict
+    secrets_file = secrets_file or os.environ.get(SECRETS_FILE_ENV)
+
+    resolvers = [EnvResolver()]
+    if secrets_file:
+        resolvers.append(SecretsFileResolver(secrets_file))
+    resolvers.append(DatabaseResolver(cache))
+    if not strict:
+        resolvers.append(PromptResolver(cache, prompt))
+
+    return ResolverChain(resolvers, DEFAULT_KEY_CACHE_TTL if cache_ttl is None else cache_ttl)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_cryptdb_format.py
+-----------------------
+Compares file size, full load time and single-record lookup time of the CryptDB file formats.
+
+Usage::
+
+    python -m benchmarks.bench_cryptdb_format --records 10000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from apikeyper.crypt import CryptDB, EncryptionKey
+from apikeyper.crypt.container import COMPRESSION_NONE, COMPRESSION_ZLIB, FORMAT_BINARY, FORMAT_TEXT
+
+
+VARIANTS = [
+    ("text (previous format)", FORMAT_TEXT, COMPRESSION_NONE),
+    ("binary", FORMAT_BINARY, COMPRESSION_NONE),
+    ("binary + zlib", FORMAT_BINARY, COMPRESSION_ZLIB),
+]
+
+
+def best_of(rounds, func):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(records, rounds):
+    data = {f"service-{i:06d}": f"sk-{os.urandom(24).hex()}" for i in range(records)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        key = EncryptionKey("file", key_file=os.path.join(tmp, "key.pem"))
+
+        print(f"{records} records, best of {rounds} rounds")
+        print(f"{'format':<24}{'size (KiB)':>12}{'load (ms)':>12}{'get (ms)':>12}")
+
+        for label, file_format, compression in VARIANTS:
+            path = os.path.join(tmp, f"{file_format}-{compression}.db")
+            db = CryptDB(path, encryption_key=key, file_format=file_format, compression=compression)
+            db.data.update(data)
+            db.save()
+
+            load = best_of(rounds, lambda: CryptDB(path, encryption_key=key).data)
+            get = best_of(rounds, lambda: CryptDB(path, encryption_key=key).get(f"service-{records - 1:06d}"))
+
+            print(f"{label:<24}{os.path.getsize(path) / 1024:>12.1f}{load * 1000:>12.1f}{get * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[2])
+    parser.add_argument("--records", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    bench(args.records, args.rounds)
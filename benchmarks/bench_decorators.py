@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_decorators.py
+-------------------
+Measures the per-call overhead of functions decorated with `apikey_required`.
+
+Usage::
+
+    python -m benchmarks.bench_decorators --calls 100000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from apikeyper import APIKeyPER
+from apikeyper.utils.decorators import apikey_required
+from apikeyper.utils.key_cache import clear_key_caches
+
+
+SERVICES = ["github", "openai", "aws"]
+
+
+def bench(calls):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "apikeys.db")
+        manager = APIKeyPER(db_path)
+        for service in SERVICES:
+            manager.add_key(service, f"{service}-key")
+        manager.db.close()
+
+        def plain(api_keys=None):
+            return api_keys
+
+        decorated = apikey_required(SERVICES, db_path=db_path)(plain)
+
+        start = time.perf_counter()
+        decorated()
+        first = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(calls):
+            decorated()
+        hot = (time.perf_counter() - start) / calls
+
+        start = time.perf_counter()
+        for _ in range(calls):
+            plain(api_keys=None)
+        baseline = (time.perf_counter() - start) / calls
+
+        clear_key_caches()
+
+    print(f"{len(SERVICES)} services, {calls} calls")
+    print(f"{'first call':<16}{first * 1e6:>12.1f} us")
+    print(f"{'cached call':<16}{hot * 1e6:>12.2f} us")
+    print(f"{'undecorated':<16}{baseline * 1e6:>12.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[2])
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+    bench(args.calls)
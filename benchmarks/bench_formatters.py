@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_formatters.py
+-------------------
+Measures the cost of formatting one record with the text and JSON log file formatters.
+
+Usage::
+
+    python -m benchmarks.bench_formatters --records 100000
+"""
+
+import argparse
+import logging
+import time
+
+from apikeyper.log_engine.helpers import JSONFormatter
+from apikeyper.log_engine.sink import FILE_FORMAT, file_formatter
+
+
+def per_record(count, formatter):
+    record = logging.LogRecord("bench", logging.INFO, __file__, 1, "get_key(%s) took %.3f ms", ("github", 0.2), None)
+    record.op, record.service, record.duration_ms = "get_key", "github", 0.2
+
+    start = time.perf_counter()
+    for _ in range(count):
+        formatter.format(record)
+    return (time.perf_counter() - start) / count
+
+
+def bench(records):
+    rows = [
+        ("logging.Formatter", per_record(records, logging.Formatter(FILE_FORMAT))),
+        ("text", per_record(records, file_formatter("text"))),
+        ("json", per_record(records, JSONFormatter())),
+    ]
+
+    print(f"{records} records")
+    for label, seconds in rows:
+        print(f"{label:<20}{seconds * 1e6:>10.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[2])
+    parser.add_argument("--records", type=int, default=100_000)
+    args = parser.parse_args()
+    bench(args.records)
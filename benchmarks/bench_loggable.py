@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_loggable.py
+-----------------
+Measures the cost of constructing `Loggable` subclasses and of the caller lookup behind `Logger.get_child`.
+
+Usage::
+
+    python -m benchmarks.bench_loggable --objects 10000
+"""
+
+import argparse
+import inspect
+import sys
+import time
+
+from apikeyper.log_engine import LOG_DEVICE, Loggable
+
+
+class Client(Loggable):
+    def __init__(self):
+        super().__init__(parent_log_device=LOG_DEVICE)
+
+
+class Plain:
+    def __init__(self):
+        pass
+
+
+def per_call(count, func):
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - start) / count
+
+
+def bench(objects):
+    rows = [
+        ("Loggable subclass", per_call(objects, Client)),
+        ("plain class", per_call(objects, Plain)),
+        ("sys._getframe(1)", per_call(objects, lambda: sys._getframe(1).f_code.co_name)),
+        ("inspect.stack()[1]", per_call(max(objects // 100, 1), lambda: inspect.stack()[1].function)),
+    ]
+
+    print(f"{objects} objects")
+    for label, seconds in rows:
+        print(f"{label:<22}{seconds * 1e6:>12.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[2])
+    parser.add_argument("--objects", type=int, default=10_000)
+    args = parser.parse_args()
+    bench(args.objects)
@@ -1 +1,17 @@
 from apikeyper.config.arguments import ARGUMENTS
+from apikeyper.telemetry.profiling import run_profiled
+
+
+def main(argv=None):
+    args = ARGUMENTS.parse(argv, force=True)
+
+    if args.command == 'add':
+        from apikeyper import APIKeyPER
+
+        run_profiled(args, 'add', APIKeyPER().add_key, args.service, args.api_key)
+    else:
+        ARGUMENTS.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,6 @@ setup(
     author='Taylor B. <tayjaybabee@gmail.com>',
     url='',
     classifiers=[],
-    packages=['apikeyper', 'apikeyper.config', 'apikeyper.crypt', 'apikeyper.database', 'apikeyper.log_engine', 'apikeyper.ui', 'apikeyper.utils'],
+    packages=['apikeyper', 'apikeyper.config', 'apikeyper.crypt', 'apikeyper.database', 'apikeyper.log_engine', 'apikeyper.telemetry', 'apikeyper.ui', 'apikeyper.utils'],
     install_requires=requirements,
 )
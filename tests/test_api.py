@@ -177,4 +177,23 @@ class TestAPIKeyPER:
         
         # Services list should also be accessible
         services = api2.list_services()
-        assert "persistent_service" in services
\ No newline at end of file
+        assert "persistent_service" in services
+
+    def test_get_keys_batched(self, tmp_path):
+        """Test that get_keys returns the most recent active key of each service that has one."""
+        db_path = tmp_path / "test.db"
+        api = APIKeyPER(db_path)
+
+        # APIKeyPER.add_key picks the name and date itself, so write the rows directly. They are inserted out of
+        # order, so the newest key is neither the first nor the last row.
+        api.db.add_key("github", "middle", "middle_key", "2024-06-01T00:00:00", "active")
+        api.db.add_key("github", "new", "new_key", "2025-01-01T00:00:00", "active")
+        api.db.add_key("github", "old", "old_key", "2023-01-01T00:00:00", "active")
+        api.db.add_key("github", "revoked", "revoked_key", "2026-01-01T00:00:00", "revoked")
+        api.add_key("openai", "sk_key")
+
+        result = api.get_keys(["github", "openai", "missing"])
+        assert set(result) == {"github", "openai"}
+        assert result["github"][1] == "new"
+        assert result["github"][3] == "new_key"
+        assert result["openai"][3] == "sk_key"
@@ -0,0 +1,1197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+test_crypt.py
+-------------
+Tests for the CryptDB encrypted store and its crypto helpers.
+
+This module tests:
+- Batch encrypt/decrypt ordering and round trips
+- Password-derived master keys and the derived-key cache
+- Streaming, resumable master-key rotation
+- Envelope encryption with per-record data keys
+- The versioned binary container format
+- Chunked streaming encryption and single-record reads
+- The record index and lazy loading
+- The local key agent
+- Pooled SFTP sessions and the on-disk SFTP key cache
+- The key-storage backend registry
+"""
+
+import io
+import json
+import os
+import socket
+import stat
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from cryptography.fernet import Fernet, InvalidToken
+from apikeyper.crypt import CryptDB, EncryptionKey
+from apikeyper.crypt import backends, container, kdf
+from apikeyper.crypt import agent as agent_module
+from apikeyper.crypt.agent import AgentClient, AgentError, KeyAgent
+from apikeyper.crypt.sftp import SFTPSessionPool, get_key_from_sftp, put_key_to_sftp
+from apikeyper.crypt.batch import BatchCrypt
+from apikeyper.crypt.envelope import DataKeyCache, Envelope
+from apikeyper.crypt.stream import StreamError, decrypt_stream, encrypt_stream, stream_length
+
+
+@pytest.fixture
+def crypt_db(tmp_path):
+    """A CryptDB backed by a temporary key file and database file."""
+    key = EncryptionKey("file", key_file=str(tmp_path / "key.pem"))
+    return CryptDB(str(tmp_path / "store.db"), encryption_key=key)
+
+
+def sealed_records(path):
+    """Read the (wrapped data key, encrypted payload) pairs of a binary CryptDB file."""
+    with open(path, "rb") as file:
+        container.read_header(file)
+        end = container.read_index_offset(file)
+        return [(wrapped_key, file.read(length)) for wrapped_key, length in container.iter_records(file, end)]
+
+
+def write_v2_file(db):
+    """Save a CryptDB in binary format version 2, which has no index."""
+    db.save()
+    path = Path(db.file_path)
+    with open(path, "rb") as file:
+        _, compression = container.read_header(file)
+        end = container.read_index_offset(file)
+
+    records = path.read_bytes()[container.HEADER.size:end]
+    with open(path, "wb") as file:
+        container.write_header(file, compression, version=2)
+        file.write(records)
+
+
+def write_v1_file(db):
+    """Write the data of a CryptDB in binary format version 1, with one Fernet token per record."""
+    with open(db.file_path, "wb") as file:
+        container.write_header(file, db.compression, version=1)
+        for name, value in db.data.items():
+            record = container.pack_record(name, value, db.compression, version=1)
+            container.write_sealed(file, db.envelope.seal(db.envelope.new_data_key(), record))
+
+
+class TestBatchCrypt:
+    """Test class for the batch encrypt/decrypt engine."""
+
+    def test_round_trip_preserves_order(self, crypt_db):
+        """Test that encrypt_many/decrypt_many keep input order."""
+        messages = [f"secret-{i}" for i in range(500)]
+
+        tokens = list(crypt_db.encrypt_many(messages, max_workers=4, chunk_size=7))
+        assert len(tokens) == len(messages)
+
+        assert list(crypt_db.decrypt_many(tokens, max_workers=4, chunk_size=7)) == messages
+
+    def test_tokens_are_compatible_with_single_calls(self, crypt_db):
+        """Test that batch tokens decrypt with CryptDB.decrypt and vice versa."""
+        tokens = list(crypt_db.encrypt_many(["a", "b"]))
+        assert [crypt_db.decrypt(token) for token in tokens] == ["a", "b"]
+
+        single = crypt_db.encrypt("c")
+        assert list(crypt_db.decrypt_many([single])) == ["c"]
+
+    def test_accepts_generators(self, crypt_db):
+        """Test that inputs are consumed lazily from a generator."""
+        tokens = crypt_db.encrypt_many(str(i) for i in range(100))
+        assert list(crypt_db.decrypt_many(tokens, chunk_size=3)) == [str(i) for i in range(100)]
+
+    def test_single_worker_runs_inline(self):
+        """Test that a single worker does not need a pool."""
+        batch = BatchCrypt(Fernet.generate_key(), max_workers=1)
+        assert list(batch.decrypt_many(batch.encrypt_many(["x", "y"]))) == ["x", "y"]
+
+    def test_process_pool(self):
+        """Test that the process pool produces the same results."""
+        batch = BatchCrypt(Fernet.generate_key(), max_workers=2, chunk_size=5, use_processes=True)
+        messages = [f"secret-{i}" for i in range(20)]
+        assert list(batch.decrypt_many(batch.encrypt_many(messages))) == messages
+
+    def test_invalid_chunk_size(self):
+        """Test that a non-positive chunk size is rejected."""
+        with pytest.raises(ValueError):
+            BatchCrypt(Fernet.generate_key(), chunk_size=0)
+
+    def test_records_process_pool(self):
+        """Test that container records sealed in worker processes open again, in order."""
+        batch = BatchCrypt([Fernet.generate_key()], max_workers=2, chunk_size=3, use_processes=True)
+        records = [(None, f"service-{i}", {"key": i}) for i in range(10)]
+
+        sealed = list(batch.seal_records(records, segment_size=16))
+        opened = list(batch.open_records(sealed))
+        assert [(name, value) for _, name, value in opened] == [(name, value) for _, name, value in records]
+        assert [wrapped_key for wrapped_key, _, _ in opened] == [wrapped_key for wrapped_key, _ in sealed]
+
+    def test_save_and_load_use_the_engine(self, tmp_path):
+        """Test that binary saves and loads go through the batch engine, and match single-threaded ones."""
+        key = EncryptionKey("file", key_file=str(tmp_path / "key.pem"))
+        data = {f"service-{i}": f"secret-{i}" * i for i in range(300)}
+
+        parallel = CryptDB(str(tmp_path / "parallel.db"), encryption_key=key, max_workers=4, segment_size=64)
+        parallel.data.update(data)
+        with patch.object(BatchCrypt, "seal_records", autospec=True, side_effect=BatchCrypt.seal_records) as seal:
+            parallel.save()
+        seal.assert_called_once()
+
+        reader = CryptDB(parallel.file_path, encryption_key=key, max_workers=4)
+        with patch.object(BatchCrypt, "open_records", autospec=True, side_effect=BatchCrypt.open_records) as opened:
+            assert reader.data == data
+        opened.assert_called_once()
+
+        # Saving again reuses the records' data keys; the single-threaded reader sees the same records.
+        reader.save()
+        sequential = CryptDB(parallel.file_path, encryption_key=key, max_workers=1)
+        assert dict(sequential.iter_records()) == data
+        assert sequential.get("service-299") == data["service-299"]
+
+
+class TestPasswordKey:
+    """Test class for password-derived master keys."""
+
+    FAST_SCRYPT = {"n": 2**10, "r": 8, "p": 1}
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        kdf.KEY_CACHE.clear()
+        yield
+        kdf.KEY_CACHE.clear()
+
+    def make_key(self, tmp_path, password="hunter2", **kwargs):
+        return EncryptionKey(
+            "password",
+            password=password,
+            salt_file=str(tmp_path / "key.salt"),
+            kdf_params=self.FAST_SCRYPT,
+            **kwargs,
+        )
+
+    def test_same_password_same_key(self, tmp_path):
+        """Test that the stored salt makes derivation repeatable and the key usable by CryptDB."""
+        first = self.make_key(tmp_path, cache_ttl=0)
+        second = self.make_key(tmp_path, cache_ttl=0)
+        assert first.key == second.key
+
+        db = CryptDB(str(tmp_path / "store.db"), encryption_key=first)
+        db.data["service"] = "value"
+        db.save()
+        assert CryptDB(str(tmp_path / "store.db"), encryption_key=second).data == {"service": "value"}
+
+    def test_wrong_password_different_key(self, tmp_path):
+        """Test that a different password derives a different key, even when cached."""
+        assert self.make_key(tmp_path).key != self.make_key(tmp_path, password="wrong").key
+
+    def test_stored_settings_win(self, tmp_path):
+        """Test that the salt file records the KDF and its parameters."""
+        self.make_key(tmp_path)
+        settings = kdf.load_kdf_settings(str(tmp_path / "key.salt"))
+        assert settings["kdf"] == kdf.SCRYPT
+        assert settings["params"] == self.FAST_SCRYPT
+        assert len(settings["salt"]) == kdf.SALT_LENGTH
+
+    def test_cache_skips_kdf(self, tmp_path, monkeypatch):
+        """Test that repeated opens within the TTL do not re-run the KDF."""
+        calls = []
+        real_derive = kdf.derive_key
+        monkeypatch.setattr(kdf, "derive_key", lambda *a, **kw: calls.append(1) or real_derive(*a, **kw))
+
+        first = self.make_key(tmp_path)
+        second = self.make_key(tmp_path)
+        unlocked = self.make_key(tmp_path, password=None)
+
+        assert first.key == second.key == unlocked.key
+        assert len(calls) == 1
+
+    def test_cache_ttl_expires(self, tmp_path, monkeypatch):
+        """Test that a zero TTL disables the cache."""
+        calls = []
+        real_derive = kdf.derive_key
+        monkeypatch.setattr(kdf, "derive_key", lambda *a, **kw: calls.append(1) or real_derive(*a, **kw))
+
+        self.make_key(tmp_path, cache_ttl=0)
+        self.make_key(tmp_path, cache_ttl=0)
+        assert len(calls) == 2
+
+    def test_pbkdf2(self, tmp_path):
+        """Test that PBKDF2 derivation produces a valid Fernet key."""
+        key = EncryptionKey(
+            "password",
+            password="hunter2",
+            salt_file=str(tmp_path / "key.salt"),
+            kdf=kdf.PBKDF2,
+            kdf_params={"iterations": 1000},
+        )
+        Fernet(key.key)
+
+    def test_calibrate(self):
+        """Test that calibration returns usable parameters."""
+        result = kdf.calibrate_kdf(0.001, kdf.PBKDF2)
+        assert result["iterations"] >= 20_000
+        assert result["seconds"] > 0
+
+
+class TestKeyRotation:
+    """Test class for streaming master-key rotation."""
+
+    @staticmethod
+    def make_db(tmp_path, name, records=10):
+        key = EncryptionKey("file", key_file=str(tmp_path / f"{name}.pem"))
+        db = CryptDB(str(tmp_path / "store.db"), encryption_key=key)
+        db.data.update({f"service-{i}": f"secret-{i}" for i in range(records)})
+        db.save()
+        return db
+
+    def test_rotate_master_key(self, tmp_path):
+        """Test that rotation re-encrypts every record under the new key."""
+        db = self.make_db(tmp_path, "old")
+        old_key = db.encryption_key
+        new_key = EncryptionKey("file", key_file=str(tmp_path / "new.pem"))
+
+        seen = []
+        assert db.rotate_master_key(new_key, batch_size=3, progress=lambda done, total: seen.append((done, total))) == 10
+        assert seen == [(3, 10), (6, 10), (9, 10), (10, 10)]
+
+        assert CryptDB(db.file_path, encryption_key=new_key).data == db.data
+        with pytest.raises(InvalidToken):
+            CryptDB(db.file_path, encryption_key=old_key).data
+
+    def test_previous_keys_during_transition(self, tmp_path):
+        """Test that a reader holding the new key can read a file still encrypted with the old key."""
+        db = self.make_db(tmp_path, "old")
+        new_key = EncryptionKey("file", key_file=str(tmp_path / "new.pem"))
+
+        reader = CryptDB(db.file_path, encryption_key=new_key, previous_keys=[db.encryption_key.key])
+        assert reader.data == db.data
+
+    def test_resume_after_interruption(self, tmp_path):
+        """Test that an interrupted rotation resumes from its journal."""
+        db = self.make_db(tmp_path, "old")
+        expected = dict(db.data)
+        new_key = EncryptionKey("file", key_file=str(tmp_path / "new.pem"))
+
+        def interrupt(done, total):
+            if done >= 4:
+                raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            db.rotate_master_key(new_key, batch_size=4, progress=interrupt)
+
+        # The original file is untouched and still readable with the old key.
+        assert CryptDB(db.file_path, encryption_key=db.encryption_key).data == expected
+
+        seen = []
+        db.rotate_master_key(new_key, batch_size=4, progress=lambda done, total: seen.append(done))
+        assert seen == [8, 10]
+        assert CryptDB(db.file_path, encryption_key=new_key).data == expected
+
+    def test_rewritten_file_restarts_rotation(self, tmp_path):
+        """Test that a journal left before the file was saved again is discarded instead of resumed."""
+        db = self.make_db(tmp_path, "old")
+        new_key = EncryptionKey("file", key_file=str(tmp_path / "new.pem"))
+
+        def interrupt(done, total):
+            if done >= 4:
+                raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            db.rotate_master_key(new_key, batch_size=4, progress=interrupt)
+
+        db.data.update({f"service-{i}": f"changed-{i}" for i in range(6)})
+        del db.data["service-9"]
+        db.save()
+        expected = dict(db.data)
+
+        seen = []
+        assert db.rotate_master_key(new_key, batch_size=4, progress=lambda done, total: seen.append(done)) == 9
+        assert seen == [4, 8, 9]
+        assert CryptDB(db.file_path, encryption_key=new_key).data == expected
+
+    def test_reads_legacy_single_token_file(self, tmp_path):
+        """Test that files holding the whole database as one token are still readable and rotatable."""
+        key = EncryptionKey("file", key_file=str(tmp_path / "old.pem"))
+        path = tmp_path / "legacy.db"
+        path.write_bytes(Fernet(key.key).encrypt(json.dumps({"github": "ghp_123"}).encode("utf-8")))
+
+        db = CryptDB(str(path), encryption_key=key)
+        assert db.data == {"github": "ghp_123"}
+
+        new_key = EncryptionKey("file", key_file=str(tmp_path / "new.pem"))
+        db.rotate_master_key(new_key)
+        assert CryptDB(str(path), encryption_key=new_key).data == {"github": "ghp_123"}
+
+
+class TestEnvelopeEncryption:
+    """Test class for per-record data keys wrapped by the master key."""
+
+    def test_records_use_distinct_data_keys(self, crypt_db):
+        """Test that every record gets its own wrapped data key, kept across saves."""
+        crypt_db.data.update({"github": "ghp_1", "openai": "sk-1"})
+        crypt_db.save()
+        first = sealed_records(crypt_db.file_path)
+
+        wrapped_keys = [wrapped_key for wrapped_key, _ in first]
+        assert len(set(wrapped_keys)) == 2
+
+        crypt_db.save()
+        second = sealed_records(crypt_db.file_path)
+        assert [wrapped_key for wrapped_key, _ in second] == wrapped_keys
+
+    def test_rotation_only_rewraps_data_keys(self, tmp_path, crypt_db):
+        """Test that master-key rotation leaves the encrypted records untouched."""
+        crypt_db.data.update({f"service-{i}": f"secret-{i}" for i in range(5)})
+        crypt_db.save()
+        before = sealed_records(crypt_db.file_path)
+
+        new_key = EncryptionKey("file", key_file=str(tmp_path / "new.pem"))
+        crypt_db.rotate_master_key(new_key)
+        after = sealed_records(crypt_db.file_path)
+
+        assert [payload for _, payload in after] == [payload for _, payload in before]
+        assert [wrapped_key for wrapped_key, _ in after] != [wrapped_key for wrapped_key, _ in before]
+        assert CryptDB(crypt_db.file_path, encryption_key=new_key).data == crypt_db.data
+
+    def test_opening_one_record_unwraps_one_key(self, crypt_db):
+        """Test that decrypting a record only needs that record's data key."""
+        crypt_db.data.update({"github": "ghp_1", "openai": "sk-1"})
+        crypt_db.save()
+        wrapped_key, _ = sealed_records(crypt_db.file_path)[0]
+
+        envelope = Envelope(crypt_db.cipher_suite)
+        sealed = envelope.seal(wrapped_key, "ghp_1")
+        assert envelope.open(sealed) == (wrapped_key, b"ghp_1")
+        assert len(envelope.cache) == 1
+
+    def test_data_key_cache_is_bounded(self):
+        """Test that the LRU cache evicts the least recently used data key."""
+        cache = DataKeyCache(maxsize=2)
+        cache.put(b"a", "A")
+        cache.put(b"b", "B")
+        cache.get(b"a")
+        cache.put(b"c", "C")
+
+        assert len(cache) == 2
+        assert cache.get(b"b") is None
+        assert cache.get(b"a") == "A"
+
+    def test_reads_records_without_data_keys(self, tmp_path, crypt_db):
+        """Test that records encrypted directly with the master key are still read."""
+        Path(crypt_db.file_path).write_bytes(crypt_db.encrypt(json.dumps(["github", "ghp_1"])) + b"\n")
+
+        db = CryptDB(crypt_db.file_path, encryption_key=crypt_db.encryption_key)
+        assert db.data == {"github": "ghp_1"}
+
+        db.save()
+        assert all(wrapped_key for wrapped_key, _ in sealed_records(crypt_db.file_path))
+
+
+class TestBinaryContainer:
+    """Test class for the versioned binary CryptDB format."""
+
+    @staticmethod
+    def make_db(tmp_path, **kwargs):
+        key = EncryptionKey("file", key_file=str(tmp_path / "key.pem"))
+        return CryptDB(str(tmp_path / "store.db"), encryption_key=key, **kwargs)
+
+    def test_header(self, tmp_path):
+        """Test that saved files start with the magic and the format version."""
+        db = self.make_db(tmp_path, compression=container.COMPRESSION_ZLIB)
+        db.save()
+
+        with open(db.file_path, "rb") as file:
+            assert container.read_header(file) == (container.FORMAT_VERSION, container.COMPRESSION_ZLIB)
+
+    @pytest.mark.parametrize("compression", [container.COMPRESSION_NONE, container.COMPRESSION_ZLIB])
+    def test_round_trip(self, tmp_path, compression):
+        """Test that string and structured values survive a save/load cycle."""
+        db = self.make_db(tmp_path, compression=compression)
+        db.data.update({"github": "ghp_1", "aws": {"id": "AKIA", "secret": "s3cr3t"}, "ünïcode": "✓"})
+        db.save()
+
+        assert self.make_db(tmp_path).data == db.data
+
+    def test_zstd(self, tmp_path):
+        """Test zstd compression when the optional package is installed."""
+        pytest.importorskip("zstandard")
+        db = self.make_db(tmp_path, compression=container.COMPRESSION_ZSTD)
+        db.data["github"] = "ghp_1" * 50
+        db.save()
+        assert self.make_db(tmp_path).data == db.data
+
+    def test_smaller_than_text_format(self, tmp_path):
+        """Test that the binary container is smaller than the text format."""
+        db = self.make_db(tmp_path, file_format=container.FORMAT_TEXT)
+        db.data.update({f"service-{i}": f"secret-{i}" for i in range(50)})
+        db.save()
+        text_size = Path(db.file_path).stat().st_size
+
+        db.file_format = container.FORMAT_BINARY
+        db.save()
+        assert Path(db.file_path).stat().st_size < text_size * 0.8
+
+    def test_reads_text_format(self, tmp_path):
+        """Test that text files are read transparently and converted on save."""
+        db = self.make_db(tmp_path, file_format=container.FORMAT_TEXT)
+        db.data["github"] = "ghp_1"
+        db.save()
+        assert not Path(db.file_path).read_bytes().startswith(container.MAGIC)
+
+        converted = self.make_db(tmp_path)
+        assert converted.data == {"github": "ghp_1"}
+        converted.save()
+        assert Path(db.file_path).read_bytes().startswith(container.MAGIC)
+
+    def test_long_record_names(self, tmp_path):
+        """Test that names up to the format's limit are stored, and longer ones are refused with a clear error."""
+        db = self.make_db(tmp_path)
+        longest = "é" * (container.MAX_NAME_LENGTH // 2)
+        db.data[longest] = "value"
+        db.save()
+        assert self.make_db(tmp_path).get(longest) == "value"
+
+        db.data[longest + "é"] = "value"
+        with pytest.raises(ValueError, match="65535"):
+            db.save()
+        assert self.make_db(tmp_path).data == {longest: "value"}
+
+    def test_rejects_newer_version(self, tmp_path):
+        """Test that files from a newer format version are refused."""
+        path = tmp_path / "store.db"
+        path.write_bytes(container.HEADER.pack(container.MAGIC, container.FORMAT_VERSION + 1, 0))
+
+        with pytest.raises(container.ContainerError):
+            self.make_db(tmp_path).data
+
+    @pytest.mark.parametrize("file_format", [container.FORMAT_BINARY, container.FORMAT_TEXT])
+    def test_rotation_keeps_format(self, tmp_path, file_format):
+        """Test that master-key rotation works on, and preserves, both formats."""
+        db = self.make_db(tmp_path, file_format=file_format, compression=container.COMPRESSION_NONE)
+        db.data.update({f"service-{i}": f"secret-{i}" for i in range(5)})
+        db.save()
+
+        new_key = EncryptionKey("file", key_file=str(tmp_path / "new.pem"))
+        db.rotate_master_key(new_key, batch_size=2)
+
+        assert Path(db.file_path).read_bytes().startswith(container.MAGIC) == (file_format == container.FORMAT_BINARY)
+        assert CryptDB(db.file_path, encryption_key=new_key).data == db.data
+
+
+class TestStreamEncryption:
+    """Test class for chunked streaming encryption and single-record reads."""
+
+    KEY = Fernet.generate_key()
+
+    @classmethod
+    def encrypt(cls, plaintext, segment_size=16, chunk_size=7):
+        chunks = (plaintext[i:i + chunk_size] for i in range(0, len(plaintext), chunk_size))
+        return b"".join(encrypt_stream(cls.KEY, chunks, segment_size))
+
+    @classmethod
+    def decrypt(cls, ciphertext):
+        return b"".join(decrypt_stream(cls.KEY, io.BytesIO(ciphertext).read, len(ciphertext)))
+
+    @pytest.mark.parametrize("length", [0, 1, 15, 16, 17, 32, 100])
+    def test_round_trip(self, length):
+        """Test round trips across segment boundaries, including empty and exact-multiple plaintexts."""
+        plaintext = bytes(range(256))[:length]
+        ciphertext = self.encrypt(plaintext)
+
+        assert len(ciphertext) == stream_length(length, 16)
+        assert self.decrypt(ciphertext) == plaintext
+
+    def test_segments_are_bounded(self):
+        """Test that decryption yields one segment at a time."""
+        ciphertext = self.encrypt(b"x" * 100)
+        segments = list(decrypt_stream(self.KEY, io.BytesIO(ciphertext).read, len(ciphertext)))
+        assert [len(segment) for segment in segments] == [16] * 6 + [4]
+
+    @pytest.mark.parametrize("cut", [1, 16, 16 + 32])
+    def test_truncation_is_detected(self, cut):
+        """Test that dropping trailing bytes or whole segments fails authentication."""
+        ciphertext = self.encrypt(b"x" * 100)
+        with pytest.raises(StreamError):
+            self.decrypt(ciphertext[:-cut])
+
+    def test_reordering_is_detected(self):
+        """Test that swapping two segments fails authentication."""
+        ciphertext = self.encrypt(b"a" * 16 + b"b" * 16 + b"c" * 4)
+        start, size = len(ciphertext) - 2 * 32 - 20, 32
+        first, second = ciphertext[start:start + size], ciphertext[start + size:start + 2 * size]
+        swapped = ciphertext[:start] + second + first + ciphertext[start + 2 * size:]
+
+        with pytest.raises(StreamError):
+            self.decrypt(swapped)
+
+    def test_tampering_is_detected(self):
+        """Test that flipping a ciphertext bit fails authentication."""
+        ciphertext = bytearray(self.encrypt(b"x" * 40))
+        ciphertext[-1] ^= 1
+        with pytest.raises(StreamError):
+            self.decrypt(bytes(ciphertext))
+
+    def test_large_values_span_segments(self, tmp_path):
+        """Test that values larger than a segment are stored and read back."""
+        key = EncryptionKey("file", key_file=str(tmp_path / "key.pem"))
+        db = CryptDB(str(tmp_path / "store.db"), encryption_key=key, segment_size=64)
+        db.data.update({"cert": "-----BEGIN-----" + "A" * 1000, "aws": {"id": "AKIA"}})
+        db.save()
+
+        assert CryptDB(db.file_path, encryption_key=key).data == db.data
+
+    def test_read_record(self, crypt_db, monkeypatch):
+        """Test that reading one record without an index decrypts only the first segment of the others."""
+        crypt_db.segment_size = 32
+        crypt_db.data.update({"a": "x" * 500, "b": "y" * 500, "github": "ghp_1"})
+        write_v2_file(crypt_db)
+
+        db = CryptDB(crypt_db.file_path, encryption_key=crypt_db.encryption_key)
+
+        segments = []
+        original = container.read_record_name
+
+        def counting(chunks):
+            def counted():
+                for chunk in chunks:
+                    segments.append(chunk)
+                    yield chunk
+
+            return original(counted())
+
+        monkeypatch.setattr(container, "read_record_name", counting)
+
+        assert db.read_record("github") == "ghp_1"
+        assert len(segments) == 3
+        with pytest.raises(KeyError):
+            db.read_record("missing")
+
+    def test_reads_version_1_files(self, crypt_db):
+        """Test that files in binary format version 1 are read and upgraded on save."""
+        crypt_db.data.update({"github": "ghp_1", "aws": {"id": "AKIA"}})
+        write_v1_file(crypt_db)
+
+        db = CryptDB(crypt_db.file_path, encryption_key=crypt_db.encryption_key)
+        assert db.data == crypt_db.data
+        assert db.read_record("aws") == {"id": "AKIA"}
+
+        db.save()
+        with open(db.file_path, "rb") as file:
+            assert container.read_header(file)[0] == container.FORMAT_VERSION
+        assert CryptDB(db.file_path, encryption_key=db.encryption_key).data == crypt_db.data
+
+    def test_rotates_version_1_files(self, tmp_path, crypt_db):
+        """Test that rotation works on, and preserves, binary format version 1."""
+        crypt_db.data.update({f"service-{i}": f"secret-{i}" for i in range(5)})
+        write_v1_file(crypt_db)
+
+        new_key = EncryptionKey("file", key_file=str(tmp_path / "new.pem"))
+        crypt_db.rotate_master_key(new_key, batch_size=2)
+
+        with open(crypt_db.file_path, "rb") as file:
+            assert container.read_header(file)[0] == 1
+        assert CryptDB(crypt_db.file_path, encryption_key=new_key).data == crypt_db.data
+
+
+class TestIndexedLoading:
+    """Test class for the record index and lazy loading."""
+
+    @staticmethod
+    def make_db(tmp_path, records=20):
+        key = EncryptionKey("file", key_file=str(tmp_path / "key.pem"))
+        db = CryptDB(str(tmp_path / "store.db"), encryption_key=key)
+        db.data.update({f"service-{i}": f"secret-{i}" for i in range(records)})
+        db.data["aws"] = {"id": "AKIA"}
+        db.save()
+        return CryptDB(db.file_path, encryption_key=key)
+
+    def test_get_decrypts_index_and_one_record(self, tmp_path, monkeypatch):
+        """Test that get() decrypts only the index and the requested record, and leaves data unloaded."""
+        db = self.make_db(tmp_path)
+
+        opened = []
+        original = CryptDB._CryptDB__decrypt_payload
+
+        def counting(self, file, wrapped_key, length):
+            opened.append(wrapped_key)
+            return original(self, file, wrapped_key, length)
+
+        monkeypatch.setattr(CryptDB, "_CryptDB__decrypt_payload", counting)
+
+        assert db.get("service-7") == "secret-7"
+        assert db.get("aws") == {"id": "AKIA"}
+        assert db.get("missing", "default") == "default"
+        # The index once, then one record per lookup.
+        assert len(opened) == 3
+        assert db._CryptDB__data is None
+
+    def test_data_loads_lazily(self, tmp_path, monkeypatch):
+        """Test that the file is only fully decrypted when data is first used."""
+        db = self.make_db(tmp_path)
+        monkeypatch.setattr(CryptDB, "load", lambda self: pytest.fail("loaded eagerly"))
+        CryptDB(db.file_path, encryption_key=db.encryption_key)
+
+        monkeypatch.undo()
+        assert len(db.data) == 21
+        assert db.get("service-3") == "secret-3"
+
+    def test_get_sees_unsaved_changes(self, tmp_path):
+        """Test that get() answers from data once it has been loaded."""
+        db = self.make_db(tmp_path)
+        db.data["github"] = "ghp_1"
+        assert db.get("github") == "ghp_1"
+
+    def test_index_follows_file_changes(self, tmp_path):
+        """Test that a cached index is re-read when another writer replaces the file."""
+        db = self.make_db(tmp_path)
+        assert db.get("service-1") == "secret-1"
+
+        writer = CryptDB(db.file_path, encryption_key=db.encryption_key)
+        writer.data["new"] = "value"
+        writer.data.pop("service-0")
+        writer.save()
+
+        assert db.get("new") == "value"
+        assert db.get("service-0") is None
+
+    def test_get_without_file(self, crypt_db):
+        """Test that get() on a database without a file returns the default."""
+        assert crypt_db.get("github") is None
+
+    def test_rotation_keeps_index(self, tmp_path):
+        """Test that rotating the master key keeps the index usable."""
+        db = self.make_db(tmp_path)
+        new_key = EncryptionKey("file", key_file=str(tmp_path / "new.pem"))
+        db.rotate_master_key(new_key, batch_size=6)
+
+        rotated = CryptDB(db.file_path, encryption_key=new_key)
+        assert rotated.get("service-19") == "secret-19"
+        assert rotated.data["aws"] == {"id": "AKIA"}
+
+    def test_reads_unindexed_files(self, crypt_db):
+        """Test that get() falls back to scanning files without an index."""
+        crypt_db.data.update({"github": "ghp_1", "openai": "sk-1"})
+        write_v2_file(crypt_db)
+
+        db = CryptDB(crypt_db.file_path, encryption_key=crypt_db.encryption_key)
+        assert db.get("openai") == "sk-1"
+        assert db.data == crypt_db.data
+
+
+class TestKeyAgent:
+    """Test class for the local key agent."""
+
+    @pytest.fixture
+    def agent(self, tmp_path):
+        key = Fernet.generate_key()
+        agent = KeyAgent(key, str(tmp_path / "agent" / "agent.sock"), idle_timeout=5)
+        thread = threading.Thread(target=agent.serve, daemon=True)
+        thread.start()
+
+        client = AgentClient(agent.socket_path)
+        deadline = time.monotonic() + 5
+        while not client.is_running():
+            assert time.monotonic() < deadline, "agent did not start"
+            time.sleep(0.01)
+
+        yield key, agent, client
+
+        if client.is_running():
+            client.stop()
+        thread.join(5)
+
+    def test_serves_key(self, agent):
+        """Test that the 'agent' storage method gets the key from the agent."""
+        key, agent, _ = agent
+        assert EncryptionKey("agent", agent_socket=agent.socket_path).key == key
+
+    def test_encrypt_decrypt(self, agent):
+        """Test that the agent encrypts and decrypts on behalf of clients."""
+        key, _, client = agent
+        token = client.encrypt(b"secret")
+        assert Fernet(key).decrypt(token) == b"secret"
+        assert client.decrypt(Fernet(key).encrypt(b"other")) == b"other"
+
+        with pytest.raises(AgentError):
+            client.decrypt(Fernet.generate_key())
+
+    def test_socket_permissions(self, agent):
+        """Test that only the owner can access the socket."""
+        _, agent, _ = agent
+        assert stat.S_IMODE(os.stat(agent.socket_path).st_mode) == 0o600
+        assert stat.S_IMODE(os.stat(os.path.dirname(agent.socket_path)).st_mode) == 0o700
+
+    def test_shared_directory_is_refused(self, tmp_path):
+        """Test that the agent refuses, and leaves alone, an existing socket directory open to others."""
+        directory = tmp_path / "shared"
+        directory.mkdir()
+        directory.chmod(0o775)
+
+        with pytest.raises(AgentError, match="0775"):
+            KeyAgent(Fernet.generate_key(), str(directory / "agent.sock"))._prepare_socket()
+        assert stat.S_IMODE(os.stat(directory).st_mode) == 0o775
+
+    def test_default_socket_has_its_own_directory(self):
+        """Test that the default socket is not put directly in the shared data directory."""
+        assert os.path.basename(os.path.dirname(agent_module.DEFAULT_AGENT_SOCKET)) == "agent"
+
+    def test_detach_waits_for_the_agent(self, tmp_path, capsys):
+        """Test that --detach only reports success once the agent answers, and reports a failed start."""
+        key_file = str(tmp_path / "key.pem")
+        socket_path = str(tmp_path / "agent" / "agent.sock")
+        agent_module.main(["start", "--detach", "--key-file", key_file, "--socket", socket_path])
+        try:
+            assert "Agent started" in capsys.readouterr().out
+            assert AgentClient(socket_path).get_key() == EncryptionKey("file", key_file=key_file).key
+        finally:
+            AgentClient(socket_path).stop()
+
+        shared = tmp_path / "shared"
+        shared.mkdir()
+        shared.chmod(0o755)
+        with pytest.raises(SystemExit) as exit_info:
+            agent_module.main(["start", "--detach", "--key-file", key_file, "--socket", str(shared / "agent.sock")])
+        assert exit_info.value.code == 1
+        assert "Agent failed to start" in capsys.readouterr().err
+
+    def test_directory_owned_by_another_user(self, tmp_path, monkeypatch):
+        """Test that the agent refuses a socket directory owned by someone else."""
+        monkeypatch.setattr(os, "getuid", lambda: os.stat(tmp_path).st_uid + 1)
+        with pytest.raises(AgentError, match="not owned"):
+            KeyAgent(Fernet.generate_key(), str(tmp_path / "agent.sock"))._prepare_socket()
+
+    def test_refuses_second_agent(self, agent):
+        """Test that a second agent does not take over a live socket."""
+        _, agent, _ = agent
+        with pytest.raises(AgentError):
+            KeyAgent(Fernet.generate_key(), agent.socket_path).serve()
+
+    def test_stop_removes_socket(self, agent):
+        """Test that stopping the agent removes its socket."""
+        _, agent, client = agent
+        client.stop()
+
+        deadline = time.monotonic() + 5
+        while os.path.exists(agent.socket_path):
+            assert time.monotonic() < deadline, "socket was not removed"
+            time.sleep(0.01)
+
+        with pytest.raises(AgentError):
+            EncryptionKey("agent", agent_socket=agent.socket_path)
+
+    def test_idle_timeout(self, tmp_path):
+        """Test that the agent exits after the idle timeout."""
+        agent = KeyAgent(Fernet.generate_key(), str(tmp_path / "agent.sock"), idle_timeout=0.05)
+        start = time.monotonic()
+        agent.serve()
+
+        assert time.monotonic() - start < 5
+        assert not os.path.exists(agent.socket_path)
+
+
+class LocalSFTPServer:
+    """A real paramiko SSH/SFTP server on localhost, serving the files of a directory."""
+
+    def __init__(self, paramiko, root, host_key):
+        self.root = root
+        self.connections = 0
+        self.reads = 0
+        self.stats = 0
+        self.transports = []
+        server = self
+
+        class Handle(paramiko.SFTPHandle):
+            def stat(self):
+                return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+        class SFTPInterface(paramiko.SFTPServerInterface):
+            def _real(self, path):
+                return os.path.join(server.root, path.lstrip("/"))
+
+            def stat(self, path):
+                server.stats += 1
+                return paramiko.SFTPAttributes.from_stat(os.stat(self._real(path)))
+
+            lstat = stat
+
+            def open(self, path, flags, attr):
+                writing = flags & (os.O_WRONLY | os.O_RDWR)
+                if not writing:
+                    server.reads += 1
+                fd = os.open(self._real(path), flags, 0o600)
+                handle = Handle(flags)
+                handle.readfile = handle.writefile = os.fdopen(fd, "wb" if flags & os.O_WRONLY else "rb+" if writing else "rb")
+                return handle
+
+        class SSHInterface(paramiko.ServerInterface):
+            def get_allowed_auths(self, username):
+                return "password"
+
+            def check_auth_password(self, username, password):
+                if password != "hunter2":
+                    return paramiko.AUTH_FAILED
+                server.connections += 1
+                return paramiko.AUTH_SUCCESSFUL
+
+            def check_channel_request(self, kind, chanid):
+                return paramiko.OPEN_SUCCEEDED if kind == "session" else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+
+        def accept():
+            while True:
+                try:
+                    connection, _ = self.listener.accept()
+                except OSError:
+                    return
+                transport = paramiko.Transport(connection)
+                transport.add_server_key(host_key)
+                transport.set_subsystem_handler("sftp", paramiko.SFTPServer, SFTPInterface)
+                transport.start_server(server=SSHInterface())
+                self.transports.append(transport)
+
+        threading.Thread(target=accept, daemon=True).start()
+
+    def drop_connections(self):
+        """Close the server side of every connection."""
+        for transport in self.transports:
+            transport.close()
+
+    def close(self):
+        self.listener.close()
+        self.drop_connections()
+
+
+@pytest.fixture(scope="module")
+def sftp_host_key():
+    paramiko = pytest.importorskip("paramiko")
+    return paramiko.RSAKey.generate(2048)
+
+
+class TestSFTPKeyStorage:
+    """Test class for pooled SFTP sessions and the on-disk SFTP key cache, against a local paramiko server."""
+
+    @pytest.fixture
+    def server(self, tmp_path, sftp_host_key):
+        import paramiko
+
+        root = tmp_path / "remote"
+        root.mkdir()
+        (root / "key.pem").write_bytes(Fernet.generate_key())
+
+        server = LocalSFTPServer(paramiko, str(root), sftp_host_key)
+        self.details = {**self.details, "port": server.port}
+        yield server
+        server.close()
+
+    details = {"host": "127.0.0.1", "port": 22, "username": "me", "password": "hunter2", "remote_key_path": "key.pem"}
+
+    def remote_key(self, server):
+        return Path(server.root, "key.pem").read_bytes()
+
+    def test_sessions_are_reused(self, server):
+        """Test that repeated key loads share one authenticated session."""
+        pool = SFTPSessionPool()
+        for _ in range(3):
+            assert get_key_from_sftp(self.details, pool=pool) == self.remote_key(server)
+
+        assert server.connections == 1
+        assert len(pool) == 1
+
+        pool.close_all()
+        get_key_from_sftp(self.details, pool=pool)
+        assert server.connections == 2
+        pool.close_all()
+
+    def test_idle_sessions_are_closed(self, server):
+        """Test that sessions unused for longer than max_idle are replaced."""
+        pool = SFTPSessionPool(max_idle=0)
+        get_key_from_sftp(self.details, pool=pool)
+        time.sleep(0.01)
+        get_key_from_sftp(self.details, pool=pool)
+        assert server.connections == 2
+        pool.close_all()
+
+    def test_reconnect_after_break(self, server):
+        """Test that a session whose connection broke is replaced by a new one."""
+        pool = SFTPSessionPool()
+        get_key_from_sftp(self.details, pool=pool)
+        transport = next(iter(pool._sessions.values())).transport
+
+        server.drop_connections()
+        deadline = time.monotonic() + 5
+        while transport.is_active() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert get_key_from_sftp(self.details, pool=pool) == self.remote_key(server)
+        assert server.connections == 2 and len(pool) == 1
+        pool.close_all()
+
+    def test_cache_skips_network_within_ttl(self, server, tmp_path):
+        """Test that a fresh cache entry is used without contacting the server."""
+        pool = SFTPSessionPool()
+        kwargs = {"cache_ttl": 60, "cache_dir": str(tmp_path / "cache"), "pool": pool}
+        key = get_key_from_sftp(self.details, **kwargs)
+
+        pool.close_all()
+        assert get_key_from_sftp(self.details, **kwargs) == key
+        assert (server.connections, server.reads) == (1, 1)
+
+        # The cache is encrypted.
+        for entry in (tmp_path / "cache").iterdir():
+            assert key not in entry.read_bytes()
+            assert stat.S_IMODE(entry.stat().st_mode) == 0o600
+
+    def test_cache_revalidates_after_ttl(self, server, tmp_path):
+        """Test that an expired entry costs a stat, and a download only if the remote key changed."""
+        pool = SFTPSessionPool()
+        kwargs = {"cache_ttl": 0, "cache_dir": str(tmp_path / "cache"), "pool": pool}
+        key = get_key_from_sftp(self.details, **kwargs)
+
+        assert get_key_from_sftp(self.details, **kwargs) == key
+        assert (server.stats, server.reads) == (2, 1)
+
+        new_key = Fernet.generate_key()
+        Path(server.root, "key.pem").write_bytes(new_key)
+        os.utime(Path(server.root, "key.pem"), (0, 0))
+        assert get_key_from_sftp(self.details, **kwargs) == new_key
+        assert server.reads == 2
+        pool.close_all()
+
+    def test_cache_needs_the_password(self, server, tmp_path):
+        """Test that a cache entry cannot be used with the wrong credentials."""
+        import paramiko
+
+        pool = SFTPSessionPool()
+        kwargs = {"cache_ttl": 60, "cache_dir": str(tmp_path / "cache"), "pool": pool}
+        get_key_from_sftp(self.details, **kwargs)
+
+        with pytest.raises(paramiko.AuthenticationException):
+            get_key_from_sftp({**self.details, "password": "wrong"}, **kwargs)
+        pool.close_all()
+
+    def test_cache_key_is_stretched(self, server, tmp_path):
+        """Test that cache entries are protected by the memory-hard KDF, and the KDF runs once per process."""
+        kdf.KEY_CACHE.clear()
+        cache_dir = tmp_path / "cache"
+        pool = SFTPSessionPool()
+        calls = []
+        derive_key = kdf.derive_key
+
+        def counting_derive_key(*args, **kwargs):
+            calls.append(args[2] if len(args) > 2 else kwargs.get("kdf"))
+            return derive_key(*args, **kwargs)
+
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            monkeypatch.setattr("apikeyper.crypt.sftp.derive_key", counting_derive_key)
+            for _ in range(3):
+                get_key_from_sftp(self.details, cache_ttl=0, cache_dir=str(cache_dir), pool=pool)
+        pool.close_all()
+
+        entry, = (json.loads(path.read_text()) for path in cache_dir.iterdir())
+        assert (entry["kdf"], entry["params"]) == (kdf.DEFAULT_KDF, kdf.DEFAULT_KDF_PARAMS[kdf.DEFAULT_KDF])
+        assert calls == [kdf.DEFAULT_KDF]
+
+    def test_export_updates_cache(self, server, tmp_path):
+        """Test that exporting a key writes it remotely and refreshes the cache."""
+        cache_dir = str(tmp_path / "cache")
+        pool = SFTPSessionPool()
+        get_key_from_sftp(self.details, cache_ttl=60, cache_dir=cache_dir, pool=pool)
+
+        new_key = Fernet.generate_key()
+        put_key_to_sftp(self.details, new_key, cache_ttl=60, cache_dir=cache_dir, pool=pool)
+
+        assert self.remote_key(server) == new_key
+        assert get_key_from_sftp(self.details, cache_ttl=60, cache_dir=cache_dir, pool=pool) == new_key
+        pool.close_all()
+
+    def test_encryption_key_sftp(self, server):
+        """Test the 'sftp' storage method of EncryptionKey."""
+        from apikeyper.crypt.sftp import SFTP_POOL
+
+        assert EncryptionKey("sftp", sftp_details=self.details).key == self.remote_key(server)
+        SFTP_POOL.close_all()
+
+
+class PoolTestTransport:
+    """A transport for exercising the pool's bookkeeping, without a network."""
+
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+    def close(self):
+        self.active = False
+
+
+class PoolTestSFTPClient:
+    def close(self):
+        pass
+
+
+class ScriptedPool(SFTPSessionPool):
+    """A session pool whose connections are scripted per host, to test its locking."""
+
+    def __init__(self, gates=None, **kwargs):
+        super().__init__(**kwargs)
+        self.gates = gates or {}
+        self.connects = []
+
+    def _connect(self, sftp_details):
+        self.connects.append(sftp_details["host"])
+        if (gate := self.gates.get(sftp_details["host"])) is not None:
+            assert gate.wait(5)
+        return PoolTestTransport(), PoolTestSFTPClient()
+
+
+class TestSFTPSessionPool:
+    """Test class for the locking of the SFTP session pool."""
+
+    def details(self, host):
+        return {"host": host, "port": 22, "username": "me", "password": "hunter2"}
+
+    def test_connect_outside_the_pool_lock(self):
+        """Test that a slow connection only holds up the callers for that server."""
+        gate = threading.Event()
+        pool = ScriptedPool({"slow": gate})
+        results = []
+
+        def use(host):
+            with pool.session(self.details(host)) as sftp:
+                results.append((host, sftp))
+
+        slow_callers = [threading.Thread(target=use, args=("slow",)) for _ in range(3)]
+        for thread in slow_callers:
+            thread.start()
+        use("fast")
+        assert [host for host, _ in results] == ["fast"]
+
+        gate.set()
+        for thread in slow_callers:
+            thread.join(5)
+
+        assert pool.connects.count("slow") == 1
+        assert len({sftp for host, sftp in results if host == "slow"}) == 1
+
+    def test_failed_connection_reaches_waiters(self):
+        """Test that callers waiting for a connection get its error, and the next caller tries again."""
+        pool = ScriptedPool()
+        pool._connect = lambda details: (_ for _ in ()).throw(ConnectionRefusedError("down"))
+
+        with pytest.raises(ConnectionRefusedError):
+            with pool.session(self.details("down")):
+                pass
+        assert len(pool) == 0 and not pool._pending
+
+    def test_borrowed_sessions_are_not_closed_when_idle(self):
+        """Test that the idle sweep skips sessions in use, and closes them once they are returned and idle."""
+        pool = ScriptedPool(max_idle=0)
+        with pool.session(self.details("first")):
+            entry = pool._sessions[next(iter(pool._sessions))]
+            time.sleep(0.01)
+            with pool.session(self.details("second")):
+                pass
+            assert entry.transport.is_active()
+
+        time.sleep(0.01)
+        with pool.session(self.details("third")):
+            pass
+        assert not entry.transport.is_active()
+
+    def test_close_all_waits_for_borrowers(self):
+        """Test that close_all closes a borrowed session only once it is returned."""
+        pool = ScriptedPool()
+        with pool.session(self.details("host")):
+            entry = next(iter(pool._sessions.values()))
+            pool.close_all()
+            assert entry.transport.is_active() and len(pool) == 0
+        assert not entry.transport.is_active()
+
+
+class VaultBackend(backends.KeyBackend):
+    """A third-party backend, as it would be installed through an entry point."""
+
+    capabilities = frozenset({backends.READ, backends.WRITE})
+    vault = {}
+
+    def load(self, encryption_key):
+        return self.vault.setdefault(encryption_key.backend_options["path"], Fernet.generate_key())
+
+    def store(self, encryption_key, key):
+        self.vault[encryption_key.backend_options["path"]] = key
+
+
+class TestKeyBackends:
+    """Test class for the key-storage backend registry."""
+
+    def test_unknown_backend(self):
+        """Test that unknown storage methods are rejected."""
+        with pytest.raises(ValueError):
+            EncryptionKey("carrier-pigeon")
+
+    def test_entry_point_discovery(self, monkeypatch):
+        """Test that backends are discovered through entry points and imported on first use."""
+        entry_point = type("EntryPoint", (), {"name": "vault", "value": f"{__name__}:VaultBackend"})
+        monkeypatch.setattr(
+            backends, "entry_points", lambda group: [entry_point] if group == backends.ENTRY_POINT_GROUP else []
+        )
+
+        registry = backends.BackendRegistry()
+        assert "vault" in registry.names()
+        assert registry.capabilities("vault") == {backends.READ, backends.WRITE}
+
+        key = EncryptionKey("vault", backends=registry, path="secret/master")
+        assert key.key == VaultBackend.vault["secret/master"]
+        assert registry.get("vault").name == "vault"
+
+    def test_register(self):
+        """Test that backends can be registered by class."""
+        registry = backends.BackendRegistry(builtins={}, group=None)
+        registry.register("vault", VaultBackend)
+
+        key = EncryptionKey("vault", backends=registry, path="other")
+        key.key = Fernet.generate_key()
+        key.store()
+        assert VaultBackend.vault["other"] == key.key
+
+    def test_env_backend(self, monkeypatch):
+        """Test the read-only environment variable backend."""
+        key = Fernet.generate_key()
+        monkeypatch.setenv("MY_MASTER_KEY", key.decode("utf-8"))
+
+        encryption_key = EncryptionKey("env", env_var="MY_MASTER_KEY")
+        assert encryption_key.key == key
+        with pytest.raises(ValueError):
+            encryption_key.store()
+
+        monkeypatch.delenv("MY_MASTER_KEY")
+        with pytest.raises(KeyError):
+            EncryptionKey("env", env_var="MY_MASTER_KEY")
+
+    def test_unused_backends_are_not_imported(self, tmp_path):
+        """Test that loading a key from a file does not import the other backends or their dependencies."""
+        code = (
+            "import sys\n"
+            "from apikeyper.crypt import CryptDB, EncryptionKey\n"
+            f"EncryptionKey('file', key_file={str(tmp_path / 'key.pem')!r})\n"
+            "print(sorted(m for m in ('apikeyper.crypt.sftp', 'apikeyper.crypt.agent', 'paramiko', 'keyring')"
+            " if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=str(tmp_path),
+                                env={**os.environ, "PYTHONPATH": str(Path(__file__).resolve().parents[1])})
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip().splitlines()[-1] == "[]"
+
+    def test_benchmark_backend(self, tmp_path):
+        """Test that a backend can be timed on its own."""
+        result = backends.benchmark_backend("file", rounds=3, key_file=str(tmp_path / "key.pem"))
+        assert 0 < result["best"] <= result["mean"]
+        assert result["import"] >= 0
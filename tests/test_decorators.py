@@ -10,14 +10,44 @@ This module tests the decorator functionality including:
 - apikey_required function injection behavior
 - apikey_required_class attribute setting behavior 
 - Function parameter inspection and injection logic
+- The shared, TTL-based key cache behind both decorators
+- Async wrappers for coroutine functions and async generators
+- The resolver chain (environment, secrets file, database, prompt) and strict mode
+- The lazy, per-class API key attributes installed by apikey_required_class
+- The registry of decorated services and warmup()
 """
 
+import asyncio
+import inspect
+import time
+
 import pytest
 import tempfile
 from pathlib import Path
 from unittest.mock import patch, MagicMock
+import apikeyper
 from apikeyper import APIKeyPER
-from apikeyper.utils.decorators import apikey_required, apikey_required_class
+from apikeyper.utils.decorators import (
+    APIKeyAttribute,
+    MissingAPIKeyError,
+    apikey_required,
+    apikey_required_class,
+    invalidate_api_keys,
+)
+from apikeyper.utils import key_cache
+from apikeyper.utils.key_cache import clear_key_caches, get_key_cache
+from apikeyper.utils.registry import REGISTRY
+from apikeyper.utils.resolvers import DatabaseResolver, EnvResolver, ResolverChain, default_resolver, env_var_name
+
+
+@pytest.fixture(autouse=True)
+def fresh_key_caches():
+    """Start every test with empty key caches and registry, since tests replace the database file within the cache TTL."""
+    clear_key_caches()
+    REGISTRY.clear()
+    yield
+    clear_key_caches()
+    REGISTRY.clear()
 
 
 class TestAPIKeyRequiredDecorator:
@@ -364,4 +394,506 @@ class TestDecoratorIntegration:
             assert func_result["shared_service"] == "shared_key_123"
             assert TestClass.SHARED_SERVICE_API_KEY == "shared_key_123"
         finally:
-            Path("default_apikeys.db").unlink(missing_ok=True)
\ No newline at end of file
+            Path("default_apikeys.db").unlink(missing_ok=True)
+
+class TestKeyCache:
+    """Test class for the shared key cache and the decorators' fast path."""
+
+    def test_signature_inspected_once(self, tmp_path):
+        """Test that the function signature is inspected at decoration time only."""
+        db = tmp_path / "keys.db"
+        APIKeyPER(db).add_key("github", "ghp_1")
+
+        with patch("apikeyper.utils.decorators.inspect.signature", wraps=__import__("inspect").signature) as signature:
+            @apikey_required("github", db_path=db)
+            def call(api_keys=None):
+                return api_keys
+
+            for _ in range(5):
+                assert call() == {"github": "ghp_1"}
+
+        assert signature.call_count == 1
+
+    def test_one_manager_per_database(self, tmp_path):
+        """Test that all decorators on one database share a manager, and hot calls skip the database."""
+        db = tmp_path / "keys.db"
+        APIKeyPER(db).add_key("github", "ghp_1")
+
+        @apikey_required("github", db_path=db)
+        def first(**kwargs):
+            return kwargs["api_keys"]
+
+        @apikey_required_class("github", db_path=str(db))
+        class Client:
+            pass
+
+        with patch.object(key_cache, "APIKeyPER", wraps=APIKeyPER) as manager:
+            for _ in range(100):
+                first()
+                Client()
+
+        assert manager.call_count == 1
+        cache = get_key_cache(db)
+        with patch.object(cache.manager, "get_key") as get_key:
+            assert first() == {"github": "ghp_1"}
+        get_key.assert_not_called()
+
+    def test_refreshes_on_change(self, tmp_path):
+        """Test that a change to the database file is picked up once the TTL has passed."""
+        db = tmp_path / "keys.db"
+        APIKeyPER(db).add_key("github", "ghp_old")
+
+        @apikey_required("github", db_path=db, cache_ttl=0)
+        def call(api_keys=None):
+            return api_keys["github"]
+
+        assert call() == "ghp_old"
+
+        # The most recently added key wins.
+        APIKeyPER(db).add_key("github", "ghp_new")
+        assert call() == "ghp_new"
+
+    def test_keeps_keys_within_ttl(self, tmp_path):
+        """Test that cached keys are served without checking the file until the TTL expires."""
+        db = tmp_path / "keys.db"
+        APIKeyPER(db).add_key("github", "ghp_1")
+        cache = get_key_cache(db, ttl=3600)
+        assert cache.get("github") == "ghp_1"
+
+        with patch.object(key_cache, "_file_signature") as signature:
+            assert cache.get_many(["github"]) == {"github": "ghp_1"}
+        signature.assert_not_called()
+
+    def test_prompted_key_is_cached(self, tmp_path):
+        """Test that a key entered at the prompt is stored and not asked for again."""
+        db = tmp_path / "keys.db"
+
+        @apikey_required("new_service", db_path=db)
+        def call(api_keys=None):
+            return api_keys["new_service"]
+
+        with patch("builtins.input", return_value="typed_key") as prompt, patch("builtins.print"):
+            assert call() == "typed_key"
+            assert call() == "typed_key"
+
+        assert prompt.call_count == 1
+        assert APIKeyPER(db).get_key("new_service")[3] == "typed_key"
+
+    def test_shared_across_threads(self, tmp_path):
+        """Test that the shared manager can be used from several threads."""
+        import threading
+
+        db = tmp_path / "keys.db"
+        APIKeyPER(db).add_key("github", "ghp_1")
+        cache = get_key_cache(db, ttl=0)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get("github"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == ["ghp_1"] * 8
+
+    def test_wraps_function(self):
+        """Test that the decorated function keeps its name and docstring."""
+        @apikey_required("github")
+        def documented():
+            """Docstring."""
+
+        assert documented.__name__ == "documented"
+        assert documented.__doc__ == "Docstring."
+
+
+class TestAsyncDecorator:
+    """Test class for apikey_required applied to coroutine functions and async generators."""
+
+    def test_coroutine_function(self, tmp_path):
+        """Test that a coroutine function gets an async wrapper with the keys injected."""
+        db = tmp_path / "keys.db"
+        api = APIKeyPER(db)
+        api.add_key("github", "ghp_1")
+        api.add_key("openai", "sk_1")
+
+        @apikey_required(["github", "openai"], db_path=db)
+        async def handler(request, api_keys=None):
+            return request, api_keys
+
+        assert inspect.iscoroutinefunction(handler)
+        assert asyncio.run(handler("req")) == ("req", {"github": "ghp_1", "openai": "sk_1"})
+
+    def test_async_generator(self, tmp_path):
+        """Test that an async generator gets an async generator wrapper with the keys injected."""
+        db = tmp_path / "keys.db"
+        APIKeyPER(db).add_key("github", "ghp_1")
+
+        @apikey_required("github", db_path=db)
+        async def stream(count, api_keys=None):
+            for i in range(count):
+                yield f"{api_keys['github']}-{i}"
+
+        async def consume():
+            return [item async for item in stream(3)]
+
+        assert inspect.isasyncgenfunction(stream)
+        assert asyncio.run(consume()) == ["ghp_1-0", "ghp_1-1", "ghp_1-2"]
+
+    def test_missing_key_fails_fast(self, tmp_path):
+        """Test that a missing key raises instead of blocking on input() when there is no prompt."""
+        @apikey_required("missing", db_path=tmp_path / "keys.db")
+        async def handler(**kwargs):
+            return kwargs
+
+        with patch("builtins.input") as console:
+            with pytest.raises(MissingAPIKeyError) as error:
+                asyncio.run(handler())
+
+        console.assert_not_called()
+        assert error.value.service_name == "missing"
+
+    def test_async_prompt(self, tmp_path):
+        """Test that a missing key is requested from the async prompt and stored."""
+        db = tmp_path / "keys.db"
+        asked = []
+
+        async def prompt(service_name):
+            asked.append(service_name)
+            return f"{service_name}_key"
+
+        @apikey_required("new_service", db_path=db, prompt=prompt)
+        async def handler(api_keys=None):
+            return api_keys["new_service"]
+
+        assert asyncio.run(handler()) == "new_service_key"
+        assert asyncio.run(handler()) == "new_service_key"
+        assert asked == ["new_service"]
+        assert APIKeyPER(db).get_key("new_service")[3] == "new_service_key"
+
+    def test_concurrent_lookups_prompt_once(self, tmp_path):
+        """Test that concurrent lookups of a missing key share one prompt, and a cancelled caller does not stop it."""
+        asked = []
+
+        async def prompt(service_name):
+            asked.append(service_name)
+            await asyncio.sleep(0.05)
+            return f"{service_name}_key"
+
+        chain = default_resolver(tmp_path / "keys.db", strict=False, prompt=prompt)
+
+        async def main():
+            first = asyncio.create_task(chain.aresolve("new_service"))
+            await asyncio.sleep(0)
+            others = [asyncio.create_task(chain.aresolve("new_service")) for _ in range(4)]
+            await asyncio.sleep(0)
+            first.cancel()
+            return await asyncio.gather(*others)
+
+        assert asyncio.run(main()) == ["new_service_key"] * 4
+        assert asked == ["new_service"]
+        assert asyncio.run(chain.aresolve("new_service")) == "new_service_key"
+
+    def test_lookups_do_not_block_the_loop(self, tmp_path):
+        """Test that database lookups run concurrently, off the event loop."""
+        db = tmp_path / "keys.db"
+        api = APIKeyPER(db)
+        for service in ("a", "b", "c"):
+            api.add_key(service, f"{service}_key")
+
+        cache = get_key_cache(db)
+        get = cache.get
+
+        def slow_get(service):
+            time.sleep(0.05)
+            return get(service)
+
+        @apikey_required(["a", "b", "c"], db_path=db)
+        async def handler(api_keys=None):
+            return api_keys
+
+        async def main():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.005)
+
+            task = asyncio.create_task(ticker())
+            api_keys = await handler()
+            task.cancel()
+            return api_keys, ticks
+
+        with patch.object(cache, "get", side_effect=slow_get):
+            api_keys, ticks = asyncio.run(main())
+
+        assert api_keys == {"a": "a_key", "b": "b_key", "c": "c_key"}
+        assert ticks > 1
+
+
+class TestResolverChain:
+    """Test class for the resolver chain behind the decorators."""
+
+    def test_environment_comes_first(self, tmp_path, monkeypatch):
+        """Test that an environment variable wins over the database."""
+        db = tmp_path / "keys.db"
+        APIKeyPER(db).add_key("github", "from_db")
+        monkeypatch.setenv("GITHUB_API_KEY", "from_env")
+
+        @apikey_required("github", db_path=db)
+        def call(api_keys=None):
+            return api_keys["github"]
+
+        assert call() == "from_env"
+
+    def test_env_var_name(self):
+        """Test that service names map to upper-case *_API_KEY variables."""
+        assert env_var_name("github") == "GITHUB_API_KEY"
+        assert env_var_name("my-service.v2") == "MY_SERVICE_V2_API_KEY"
+
+    def test_secrets_file(self, tmp_path):
+        """Test that keys are read from JSON and key=value secrets files, before the database."""
+        db = tmp_path / "keys.db"
+        APIKeyPER(db).add_key("github", "from_db")
+        json_file = tmp_path / "secrets.json"
+        json_file.write_text('{"github": "from_json"}')
+        env_file = tmp_path / "secrets.env"
+        env_file.write_text("# comment\nopenai = from_env_file\n")
+
+        @apikey_required("github", db_path=db, secrets_file=json_file)
+        def github(api_keys=None):
+            return api_keys["github"]
+
+        @apikey_required("openai", db_path=db, secrets_file=env_file)
+        def openai(api_keys=None):
+            return api_keys["openai"]
+
+        assert github() == "from_json"
+        assert openai() == "from_env_file"
+
+    def test_strict_mode_raises_without_prompting(self, tmp_path):
+        """Test that strict mode raises MissingAPIKeyError instead of calling input()."""
+        @apikey_required("missing", db_path=tmp_path / "keys.db", strict=True)
+        def call(**kwargs):
+            return kwargs
+
+        with patch("builtins.input") as console:
+            with pytest.raises(MissingAPIKeyError):
+                call()
+        console.assert_not_called()
+
+    def test_strict_mode_from_environment(self, tmp_path, monkeypatch):
+        """Test that APIKEYPER_STRICT turns on strict mode for both decorators."""
+        monkeypatch.setenv("APIKEYPER_STRICT", "1")
+
+        @apikey_required_class("missing", db_path=tmp_path / "keys.db")
+        class Client:
+            pass
+
+        with patch("builtins.input") as console:
+            with pytest.raises(MissingAPIKeyError):
+                Client.MISSING_API_KEY
+        console.assert_not_called()
+
+    def test_evaluated_once_per_service(self, tmp_path):
+        """Test that each service goes through the chain once, including misses."""
+        cache = get_key_cache(tmp_path / "keys.db")
+        cache.add("github", "ghp_1")
+        database = DatabaseResolver(cache)
+        chain = ResolverChain([EnvResolver(), database])
+
+        with patch.object(database, "resolve", wraps=database.resolve) as resolve:
+            assert chain.resolve_many(["github"]) == {"github": "ghp_1"}
+            assert chain.resolve_many(["github"]) == {"github": "ghp_1"}
+            for _ in range(2):
+                with pytest.raises(MissingAPIKeyError):
+                    chain.resolve("missing")
+
+        assert resolve.call_count == 2
+
+    def test_invalidate(self, tmp_path):
+        """Test that invalidate() makes the chain look a service up again."""
+        cache = get_key_cache(tmp_path / "keys.db")
+        chain = ResolverChain([DatabaseResolver(cache)])
+
+        with pytest.raises(MissingAPIKeyError):
+            chain.resolve("github")
+        cache.add("github", "ghp_1")
+        chain.invalidate("github")
+        assert chain.resolve("github") == "ghp_1"
+
+
+class TestLazyKeyAttributes:
+    """Test class for the API key attributes installed by apikey_required_class."""
+
+    def test_installed_at_decoration_time(self, tmp_path):
+        """Test that the attributes are descriptors and __init__ is left alone."""
+        class Client:
+            def __init__(self, name):
+                self.name = name
+
+        original_init = Client.__init__
+        apikey_required_class(["github", "openai"], db_path=tmp_path / "keys.db")(Client)
+
+        assert Client.__init__ is original_init
+        assert isinstance(vars(Client)["GITHUB_API_KEY"], APIKeyAttribute)
+        assert isinstance(vars(Client)["OPENAI_API_KEY"], APIKeyAttribute)
+
+    def test_instances_do_not_look_up_keys(self, tmp_path):
+        """Test that creating instances performs no lookups, and the first read performs one."""
+        db = tmp_path / "keys.db"
+        APIKeyPER(db).add_key("github", "ghp_1")
+        cache = get_key_cache(db)
+
+        @apikey_required_class("github", db_path=db)
+        class Client:
+            pass
+
+        with patch.object(cache, "get", wraps=cache.get) as get:
+            clients = [Client() for _ in range(1000)]
+            get.assert_not_called()
+
+            assert all(client.GITHUB_API_KEY == "ghp_1" for client in clients)
+            assert Client.GITHUB_API_KEY == "ghp_1"
+
+        assert get.call_count == 1
+
+    def test_first_read_is_thread_safe(self, tmp_path):
+        """Test that concurrent first reads resolve the key once."""
+        import threading
+
+        db = tmp_path / "keys.db"
+        APIKeyPER(db).add_key("github", "ghp_1")
+        cache = get_key_cache(db)
+        get = cache.get
+
+        def slow_get(service):
+            time.sleep(0.02)
+            return get(service)
+
+        @apikey_required_class("github", db_path=db)
+        class Client:
+            pass
+
+        results = []
+        with patch.object(cache, "get", side_effect=slow_get) as patched:
+            threads = [threading.Thread(target=lambda: results.append(Client().GITHUB_API_KEY)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert results == ["ghp_1"] * 8
+        assert patched.call_count == 1
+
+    def test_invalidate_api_keys(self, tmp_path):
+        """Test that invalidate_api_keys makes the next read fetch the current key."""
+        db = tmp_path / "keys.db"
+        APIKeyPER(db).add_key("github", "ghp_old")
+        cache = get_key_cache(db)
+
+        @apikey_required_class(["github"], db_path=db)
+        class Client:
+            pass
+
+        assert Client.GITHUB_API_KEY == "ghp_old"
+        cache.add("github", "ghp_new")
+        assert Client.GITHUB_API_KEY == "ghp_old"
+
+        invalidate_api_keys(Client, "github")
+        assert Client.GITHUB_API_KEY == "ghp_new"
+
+    def test_cached_per_class(self, tmp_path):
+        """Test that subclasses keep their own copy of the key."""
+        db = tmp_path / "keys.db"
+        APIKeyPER(db).add_key("github", "ghp_old")
+        cache = get_key_cache(db)
+
+        @apikey_required_class(["github"], db_path=db)
+        class Base:
+            pass
+
+        class Child(Base):
+            pass
+
+        assert Base.GITHUB_API_KEY == "ghp_old"
+        assert Child.GITHUB_API_KEY == "ghp_old"
+
+        cache.add("github", "ghp_new")
+        invalidate_api_keys(Child)
+        assert Child.GITHUB_API_KEY == "ghp_new"
+        assert Base.GITHUB_API_KEY == "ghp_old"
+
+
+class TestWarmup:
+    """Test class for the service registry and apikeyper.warmup()."""
+
+    def test_decorators_register_services(self, tmp_path):
+        """Test that both decorators record the services they need."""
+        db = tmp_path / "keys.db"
+
+        @apikey_required(["github", "openai"], db_path=db)
+        def call(**kwargs):
+            pass
+
+        @apikey_required_class("aws", db_path=db)
+        class Client:
+            pass
+
+        assert REGISTRY.service_names() == ["aws", "github", "openai"]
+        assert [registration.owner for registration in REGISTRY.registrations()][-1].endswith("Client")
+
+    def test_warmup_uses_one_query(self, tmp_path):
+        """Test that warmup loads every key with one query and decorated code then skips the database."""
+        db = tmp_path / "keys.db"
+        api = APIKeyPER(db)
+        for service in ("github", "openai", "aws"):
+            api.add_key(service, f"{service}_key")
+
+        @apikey_required(["github", "openai"], db_path=db)
+        def call(api_keys=None):
+            return api_keys
+
+        @apikey_required_class("aws", db_path=db)
+        class Client:
+            pass
+
+        from apikeyper.database import APIKeyDB
+
+        with patch.object(APIKeyDB, "get_keys", autospec=True, side_effect=APIKeyDB.get_keys) as get_keys, \
+                patch.object(APIKeyDB, "get_key", autospec=True, side_effect=APIKeyDB.get_key) as get_key:
+            assert apikeyper.warmup() == []
+            assert get_keys.call_count == 1
+
+            assert call() == {"github": "github_key", "openai": "openai_key"}
+            assert Client.AWS_API_KEY == "aws_key"
+
+        get_key.assert_not_called()
+
+    def test_warmup_reports_missing_keys(self, tmp_path):
+        """Test that missing keys are reported without prompting."""
+        db = tmp_path / "keys.db"
+        APIKeyPER(db).add_key("github", "ghp_1")
+
+        @apikey_required(["github", "missing", "also_missing"], db_path=db)
+        def call(**kwargs):
+            pass
+
+        with patch("builtins.input") as console:
+            assert apikeyper.warmup() == ["also_missing", "missing"]
+            with pytest.raises(MissingAPIKeyError):
+                apikeyper.warmup(raise_on_missing=True)
+
+        console.assert_not_called()
+
+    def test_warmup_counts_environment_keys(self, tmp_path, monkeypatch):
+        """Test that keys provided by the environment are not reported as missing."""
+        monkeypatch.setenv("GITHUB_API_KEY", "from_env")
+
+        @apikey_required("github", db_path=tmp_path / "keys.db")
+        def call(api_keys=None):
+            return api_keys["github"]
+
+        assert apikeyper.warmup() == []
+        assert call() == "from_env"
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+test_imports.py
+---------------
+Tests for the import cost of APIKeyPER.
+
+This module tests:
+- That importing the package, and looking up a key, only import what a key lookup needs
+- That the lazy attributes of the package still work
+- Import-time budgets, measured with `python -X importtime`
+
+Each measurement runs in a fresh interpreter. The budgets are the best of a few runs, and are several times what the
+imports take on a developer machine, so that they catch regressions (such as a heavy module imported at the top level)
+rather than slow test machines.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import apikeyper
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Modules a key lookup does not need.
+HEAVY_MODULES = (
+    "appdirs",
+    "asyncio",
+    "cryptography",
+    "json",
+    "logging.handlers",
+    "pkg_resources",
+    "rich",
+    "sqlite3",
+    "tracemalloc",
+    "uuid",
+    "xml.etree",
+)
+
+# Import-time budgets, in milliseconds, of the cumulative time `-X importtime` reports for a module.
+IMPORT_BUDGETS_MS = {
+    "apikeyper": 60,
+    "apikeyper.utils.decorators": 150,
+}
+RUNS = 3
+
+
+def run_python(code, *options, cwd=None):
+    """Run code in a fresh interpreter, without any APIKEYPER_ settings, and return the completed process."""
+    env = {key: value for key, value in os.environ.items() if not key.startswith("APIKEYPER_")}
+    env["PYTHONPATH"] = os.pathsep.join([str(ROOT), env.get("PYTHONPATH", "")])
+    return subprocess.run(
+        [sys.executable, *options, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def loaded_modules(code, tmp_path):
+    """The HEAVY_MODULES that are loaded after running code."""
+    code += (
+        "\nimport sys\n"
+        f"print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    return run_python(code, cwd=tmp_path).stdout.strip().splitlines()[-1]
+
+
+def import_time_ms(module):
+    """The cumulative import time of a module in a fresh interpreter, in milliseconds, as `-X importtime` reports."""
+    stderr = run_python(f"import {module}", "-X", "importtime").stderr
+    for line in reversed(stderr.splitlines()):
+        _, _, cumulative, name = (part.strip() for part in line.replace("|", ":", 2).split(":"))
+        if name == module:
+            return int(cumulative) / 1000
+    raise AssertionError(f"{module} is not in the -X importtime output:\n{stderr}")
+
+
+class TestLazyImports:
+    """Test class for what importing APIKeyPER loads."""
+
+    def test_import_package(self, tmp_path):
+        """Test that importing the package loads none of the heavy modules."""
+        assert loaded_modules("import apikeyper", tmp_path) == "[]"
+
+    def test_key_lookup(self, tmp_path):
+        """Test that looking up a key only adds the database modules."""
+        code = (
+            "from apikeyper import APIKeyPER\n"
+            f"APIKeyPER({str(tmp_path / 'keys.db')!r}).get_key('github')\n"
+        )
+        assert loaded_modules(code, tmp_path) == "['appdirs', 'sqlite3']"
+
+    def test_import_decorators(self, tmp_path):
+        """Test that importing the decorators does not load asyncio, the database or the package checker."""
+        assert loaded_modules("import apikeyper.utils.decorators", tmp_path) == "[]"
+
+    def test_lazy_attributes(self):
+        """Test that the lazy attributes of the package are imported on access, and unknown names still fail."""
+        from apikeyper.database import APIKeyDB, DEFAULT_DB_FILEPATH
+
+        assert apikeyper.APIKeyDB is APIKeyDB
+        assert apikeyper.DEFAULT_DB_FILEPATH == DEFAULT_DB_FILEPATH
+        assert apikeyper.DEFAULT_DATA_DIR == DEFAULT_DB_FILEPATH.parent
+        assert apikeyper.crypt.CryptDB is not None
+        assert {"APIKeyDB", "crypt", "APIKeyPER"} <= set(dir(apikeyper))
+        with pytest.raises(AttributeError):
+            apikeyper.missing
+
+
+class TestImportBudget:
+    """Test class for the import-time budgets."""
+
+    @pytest.mark.parametrize("module", sorted(IMPORT_BUDGETS_MS))
+    def test_import_time(self, module):
+        """Test that importing a module stays within its budget."""
+        best = min(import_time_ms(module) for _ in range(RUNS))
+        assert best <= IMPORT_BUDGETS_MS[module], f"import {module} took {best:.1f} ms"
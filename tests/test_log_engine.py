@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+test_log_engine.py
+------------------
+Tests for the APIKeyPER logging engine.
+
+This module tests:
+- Child logger naming and lookup
+- Loggable construction
+- The shared, queue-based log sink
+- Side-effect-free imports and environment/config-driven settings
+- Size/time-based rotation and background compression of log files
+- The JSON-lines file format and the structured fields of database calls
+"""
+
+import gzip
+import inspect
+import json
+import logging
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import apikeyper.database
+from apikeyper.database import APIKeyDB
+from apikeyper.log_engine import LOG_DEVICE, Loggable, Logger
+from apikeyper.log_engine.helpers import JSONFormatter, clean_pathname
+from apikeyper.log_engine.rotation import DEFAULT_ROTATION, RotatingFileHandler, RotationPolicy, check_policy
+from apikeyper.log_engine.settings import load_settings
+from apikeyper.log_engine.sink import SINK
+
+
+class TestChildLoggers:
+    """Test class for Logger.get_child."""
+
+    def test_name_defaults_to_caller(self):
+        """Test that a child logger is named after the calling function."""
+        def fetch_keys():
+            return LOG_DEVICE.get_child()
+
+        assert fetch_keys().logger.name == f"{LOG_DEVICE.logger.name}.fetch_keys"
+
+    def test_method_separator(self):
+        """Test that a child named after a method of the caller uses ':' as separator."""
+        class Service:
+            def connect(self):
+                return LOG_DEVICE.get_child("connect")
+
+        assert Service().connect().logger.name == f"{LOG_DEVICE.logger.name}:connect"
+
+    def test_children_are_reused(self):
+        """Test that asking for the same child twice returns the same logger."""
+        first = LOG_DEVICE.get_child("reused_child")
+        assert LOG_DEVICE.get_child("reused_child") is first
+        assert LOG_DEVICE.children[first.logger.name] is first
+        assert first.logger.name in LOG_DEVICE.get_child_names()
+
+    def test_find_child_by_name(self):
+        """Test that children can be found by full or relative name."""
+        child = LOG_DEVICE.get_child("findable_child")
+        assert LOG_DEVICE.find_child_by_name(child.logger.name) is child
+        assert LOG_DEVICE.find_child_by_name("findable_child") is child
+        assert LOG_DEVICE.find_child_by_name("no_such_child") is None
+
+    def test_does_not_build_the_stack(self):
+        """Test that caller discovery does not use inspect.stack()."""
+        with patch.object(inspect, "stack", side_effect=AssertionError("inspect.stack() called")):
+            LOG_DEVICE.get_child()
+
+
+class TestLoggable:
+    """Test class for Loggable."""
+
+    def test_construction(self):
+        """Test that a Loggable subclass gets a child of its parent log device."""
+        class Client(Loggable):
+            def __init__(self):
+                super().__init__(parent_log_device=LOG_DEVICE)
+
+        client = Client()
+        assert isinstance(client.log_device, Logger)
+        assert client.log_device.logger.name == f"{LOG_DEVICE.logger.name}.Client"
+        assert Client().log_device is client.log_device
+
+    def test_create_child_logger_uses_caller_name(self):
+        """Test that create_child_logger names the child after the calling method."""
+        class Client(Loggable):
+            def __init__(self):
+                super().__init__(parent_log_device=LOG_DEVICE)
+
+            def refresh(self):
+                return self.create_child_logger()
+
+        assert Client().refresh().logger.name.endswith("Client:refresh")
+
+
+class TestSharedSink:
+    """Test class for the shared queue handler/QueueListener sink."""
+
+    def test_loggers_only_enqueue(self):
+        """Test that every logger has the one shared queue handler and no handler of its own."""
+        child = LOG_DEVICE.get_child("sink_child")
+        for device in (LOG_DEVICE, child):
+            # pytest may attach its own capture handlers; ignore those.
+            handlers = [handler for handler in device.logger.handlers if not type(handler).__module__.startswith("_pytest")]
+            assert handlers == [SINK.handler]
+        assert SINK.handler.queue is SINK.queue
+
+    def test_one_file_handler_per_file(self, tmp_path):
+        """Test that loggers writing to the same file share one file handler."""
+        filename = str(tmp_path / "shared.log")
+        first = Logger("sink_test.first", logging.CRITICAL, logging.DEBUG, filename=filename)
+        second = Logger("sink_test.second", logging.CRITICAL, logging.DEBUG, filename=filename)
+
+        first.logger.info("from first")
+        second.logger.info("from %s", "second")
+        SINK.flush()
+
+        assert list(SINK.files).count(filename) == 1
+        lines = (tmp_path / "shared.log").read_text().splitlines()
+        assert [line.split(" - ")[-1] for line in lines] == ["from first", "from second"]
+
+    def test_levels_are_routed_per_logger(self, tmp_path):
+        """Test that set_level changes what a logger writes, without affecting other loggers."""
+        filename = str(tmp_path / "levels.log")
+        quiet = Logger("sink_test.quiet", logging.CRITICAL, logging.DEBUG, filename=filename)
+        loud = Logger("sink_test.loud", logging.CRITICAL, logging.DEBUG, filename=filename)
+
+        quiet.set_level(file_level=logging.ERROR)
+        quiet.logger.info("dropped")
+        loud.logger.info("kept")
+        SINK.flush()
+
+        assert not quiet.logger.isEnabledFor(logging.INFO)
+        assert (tmp_path / "levels.log").read_text().splitlines()[-1].endswith("kept")
+
+    def test_records_are_rendered_when_logged(self, tmp_path):
+        """Test that arguments changed after the call are logged as they were, and tracebacks are not queued."""
+        filename = str(tmp_path / "rendered.log")
+        device = Logger("sink_test.rendered", logging.CRITICAL, logging.DEBUG, filename=filename)
+        services = ["github"]
+        prepare, queued = SINK.handler.prepare, []
+
+        def recording_prepare(record):
+            queued.append(prepare(record))
+            return queued[-1]
+
+        with patch.object(SINK.handler, "prepare", recording_prepare):
+            device.logger.info("services: %s", services)
+            services.append("openai")
+            try:
+                raise RuntimeError("boom")
+            except RuntimeError:
+                device.logger.exception("failed")
+        SINK.flush()
+
+        assert len(queued) == 2 and all(record.args is None and record.exc_info is None for record in queued)
+        text = (tmp_path / "rendered.log").read_text()
+        assert "services: ['github']\n" in text
+        assert "failed\nTraceback" in text and "RuntimeError: boom" in text
+
+    def test_json_keeps_exceptions(self, tmp_path):
+        """Test that tracebacks still reach JSON log files after their exc_info is dropped."""
+        filename = str(tmp_path / "errors.log")
+        device = Logger("sink_test.errors", logging.CRITICAL, logging.DEBUG, filename=filename, file_format="json")
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            device.logger.exception("failed")
+        SINK.flush()
+
+        parsed = json.loads((tmp_path / "errors.log").read_text())
+        assert parsed["message"] == "failed" and "RuntimeError: boom" in parsed["exc"]
+
+
+class TestSettings:
+    """Test class for lazy, environment-driven logging configuration."""
+
+    def test_import_has_no_side_effects(self, tmp_path):
+        """Test that importing the package creates no log file and starts no thread."""
+        code = (
+            "import os, sys, threading, apikeyper, apikeyper.crypt, apikeyper.utils.decorators\n"
+            "print(sorted(os.listdir('.')), threading.active_count(), 'rich.logging' in sys.modules)\n"
+        )
+        env = {key: value for key, value in os.environ.items() if not key.startswith("APIKEYPER_")}
+        env["PYTHONPATH"] = os.pathsep.join([str(Path(__file__).resolve().parents[1]), env.get("PYTHONPATH", "")])
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=tmp_path, env=env, capture_output=True, text=True, check=True
+        ).stdout
+
+        assert output.strip() == "[] 1 False"
+
+    def test_defaults(self):
+        """Test that both levels default to WARNING and the file to app.log."""
+        assert load_settings({}) == {
+            "console_level": logging.WARNING,
+            "file_level": logging.WARNING,
+            "filename": "app.log",
+            "file_format": "text",
+            "rotation": DEFAULT_ROTATION,
+        }
+
+    def test_environment(self):
+        """Test that environment variables set the levels and the file, most specific first."""
+        settings = load_settings({
+            "APIKEYPER_LOG_LEVEL": "info",
+            "APIKEYPER_FILE_LOG_LEVEL": "DEBUG",
+            "APIKEYPER_LOG_FILE": "/var/log/apikeyper.log",
+        })
+        assert settings == {
+            "console_level": logging.INFO,
+            "file_level": logging.DEBUG,
+            "filename": "/var/log/apikeyper.log",
+            "file_format": "text",
+            "rotation": DEFAULT_ROTATION,
+        }
+
+    def test_config_file(self, tmp_path):
+        """Test that a config file named by APIKEYPER_LOG_CONFIG is used, below the environment."""
+        config = tmp_path / "logging.json"
+        config.write_text(json.dumps({"level": "ERROR", "console_level": 10, "file": "service.log"}))
+
+        settings = load_settings({"APIKEYPER_LOG_CONFIG": str(config)})
+        assert settings == {
+            "console_level": logging.DEBUG,
+            "file_level": logging.ERROR,
+            "filename": "service.log",
+            "file_format": "text",
+            "rotation": DEFAULT_ROTATION,
+        }
+
+        settings = load_settings({"APIKEYPER_LOG_CONFIG": str(config), "APIKEYPER_CONSOLE_LOG_LEVEL": "WARNING"})
+        assert settings["console_level"] == logging.WARNING
+
+    @pytest.mark.parametrize("name, value", [
+        ("APIKEYPER_LOG_FORMAT", "xml"),
+        ("APIKEYPER_LOG_MAX_BYTES", "10Q"),
+        ("APIKEYPER_LOG_MAX_BYTES", "-1"),
+        ("APIKEYPER_LOG_ROTATE_WHEN", "weekly"),
+        ("APIKEYPER_LOG_ROTATE_INTERVAL", "0"),
+        ("APIKEYPER_LOG_BACKUP_COUNT", "five"),
+        ("APIKEYPER_LOG_COMPRESS", "maybe"),
+    ])
+    def test_bad_values_fall_back(self, name, value):
+        """Test that a bad value is reported and replaced by the default."""
+        with pytest.warns(RuntimeWarning, match=name):
+            settings = load_settings({name: value})
+
+        assert settings["file_format"] == "text" and settings["rotation"] == DEFAULT_ROTATION
+
+    def test_bad_environment_falls_back_to_config_file(self, tmp_path):
+        """Test that a bad environment value gives way to the config file, and a bad config file is ignored."""
+        config = tmp_path / "logging.json"
+        config.write_text(json.dumps({"format": "json", "interval": "two", "backup_count": 3}))
+        with pytest.warns(RuntimeWarning) as caught:
+            settings = load_settings({"APIKEYPER_LOG_CONFIG": str(config), "APIKEYPER_LOG_FORMAT": "yaml"})
+        assert settings["file_format"] == "json"
+        assert settings["rotation"] == DEFAULT_ROTATION._replace(backup_count=3)
+        assert len(caught) == 2
+
+        config.write_text("{not json")
+        with pytest.warns(RuntimeWarning, match="APIKEYPER_LOG_CONFIG"):
+            assert load_settings({"APIKEYPER_LOG_CONFIG": str(config)})["file_format"] == "text"
+
+    def test_bad_environment_does_not_break_imports(self, tmp_path):
+        """Test that the database layer still imports, and logs, with malformed logging settings."""
+        env = {key: value for key, value in os.environ.items() if not key.startswith("APIKEYPER_")}
+        env["PYTHONPATH"] = os.pathsep.join([str(Path(__file__).resolve().parents[1]), env.get("PYTHONPATH", "")])
+        env.update({"APIKEYPER_LOG_MAX_BYTES": "lots", "APIKEYPER_LOG_FORMAT": "xml"})
+        subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", "import apikeyper.database; apikeyper.database.APIKeyDB('keys.db')"],
+            cwd=tmp_path, env=env, capture_output=True, text=True, check=True,
+        )
+
+    def test_debug_is_not_formatted_when_disabled(self):
+        """Test that disabled debug calls never format their arguments."""
+        class Expensive:
+            def __str__(self):
+                raise AssertionError("formatted")
+
+        device = Logger("settings_test.quiet", logging.WARNING, logging.WARNING)
+        device.logger.debug("value: %s", Expensive())
+        SINK.flush()
+
+
+class TestRotation:
+    """Test class for rotated, compressed log files."""
+
+    def test_size_rotation_compresses_and_prunes(self, tmp_path):
+        """Test that a file is rotated by size, segments are compressed, and only backup_count are kept."""
+        filename = str(tmp_path / "rotated.log")
+        device = Logger("rotation_test.size", logging.CRITICAL, logging.INFO, filename=filename,
+                        max_bytes=300, backup_count=2)
+
+        for number in range(40):
+            device.logger.info("record %02d", number)
+        SINK.flush()
+
+        segments = SINK.file_handler(filename).segments()
+        assert sorted(segments) == sorted(str(path) for path in tmp_path.iterdir() if path.name != "rotated.log")
+        assert len(segments) == 2
+        assert all(name.endswith(".gz") for name in segments)
+        assert (tmp_path / "rotated.log").stat().st_size <= 300
+
+        newest = gzip.decompress(Path(segments[-1]).read_bytes()).decode().splitlines()
+        current = (tmp_path / "rotated.log").read_text().splitlines()
+        assert newest[-1].endswith("record %02d" % (39 - len(current)))
+
+    def test_time_rotation(self, tmp_path):
+        """Test that a file is rotated once its time is up, and left uncompressed if asked."""
+        handler = RotatingFileHandler(str(tmp_path / "timed.log"), RotationPolicy(max_bytes=0, when="h", compress=False))
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        record = logging.LogRecord("timed", logging.INFO, __file__, 1, "entry", None, None)
+
+        handler.handle(record)
+        assert handler.policy.when == "H"
+        handler.rollover_at = 0
+        handler.handle(record)
+        handler.close()
+
+        segments = handler.segments()
+        assert len(segments) == 1 and not segments[0].endswith(".gz")
+        assert (tmp_path / "timed.log").read_text() == "entry\n"
+        assert handler.rollover_at > 0
+
+    def test_set_rotation_updates_the_shared_handler(self, tmp_path):
+        """Test that set_rotation changes the policy of a file already in use, for every logger writing to it."""
+        filename = str(tmp_path / "shared_rotation.log")
+        first = Logger("rotation_test.first", logging.CRITICAL, logging.INFO, filename=filename)
+        second = Logger("rotation_test.second", logging.CRITICAL, logging.INFO, filename=filename)
+        first.logger.info("open the file")
+        SINK.flush()
+
+        second.set_rotation(max_bytes=1024, when="midnight", backup_count=3)
+        assert first.rotation == second.rotation == RotationPolicy(1024, "MIDNIGHT", 1, 3, True)
+        assert SINK.file_handler(filename).policy == first.rotation
+
+    def test_invalid_policy(self):
+        """Test that nonsensical rotation policies are rejected."""
+        with pytest.raises(ValueError):
+            check_policy(RotationPolicy(when="weekly"))
+        with pytest.raises(ValueError):
+            check_policy(RotationPolicy(max_bytes=-1))
+
+    def test_settings(self):
+        """Test that the rotation policy can be set from the environment."""
+        settings = load_settings({
+            "APIKEYPER_LOG_MAX_BYTES": "50M",
+            "APIKEYPER_LOG_ROTATE_WHEN": "midnight",
+            "APIKEYPER_LOG_BACKUP_COUNT": "14",
+            "APIKEYPER_LOG_COMPRESS": "false",
+        })
+        assert settings["rotation"] == RotationPolicy(50 * 1024 * 1024, "midnight", 1, 14, False)
+
+
+class TestJSONFormat:
+    """Test class for the JSON-lines log file format."""
+
+    def test_formatter(self):
+        """Test that a record becomes one JSON object with its structured fields."""
+        record = logging.LogRecord("json_test", logging.INFO, "<ipython-input-3-abc>", 7, "got %s", ("key",), None)
+        record.op, record.service, record.duration_ms = "get_key", "github", 0.25
+
+        line = JSONFormatter().format(record)
+        assert "\n" not in line
+        parsed = json.loads(line)
+        assert parsed["time"].endswith("Z") and parsed["level"] == "INFO" and parsed["logger"] == "json_test"
+        assert parsed["message"] == "got key" and parsed["path"] == "iPython" and parsed["line"] == 7
+        assert (parsed["op"], parsed["service"], parsed["duration_ms"]) == ("get_key", "github", 0.25)
+
+    def test_exceptions(self):
+        """Test that exceptions are included as text, and fields that are not set are left out."""
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            record = logging.LogRecord("json_test", logging.ERROR, __file__, 1, "failed", None, sys.exc_info())
+
+        parsed = json.loads(JSONFormatter().format(record))
+        assert "RuntimeError: boom" in parsed["exc"]
+        assert "op" not in parsed and "service" not in parsed
+
+    def test_pathnames_are_cached(self):
+        """Test that cleaning a pathname twice only runs the regex once."""
+        clean_pathname.cache_clear()
+        assert clean_pathname("<module>") == clean_pathname("<module>") == "iPython"
+        assert clean_pathname.cache_info().hits == 1
+
+    def test_json_log_file(self, tmp_path):
+        """Test that a logger can switch its file to JSON lines."""
+        filename = str(tmp_path / "structured.log")
+        device = Logger("json_test.file", logging.CRITICAL, logging.INFO, filename=filename, file_format="json")
+        assert device.file_format == "json"
+
+        device.logger.info("stored", extra={"op": "add_key", "service": "openai"})
+        SINK.flush()
+
+        parsed = json.loads((tmp_path / "structured.log").read_text())
+        assert (parsed["message"], parsed["op"], parsed["service"]) == ("stored", "add_key", "openai")
+
+        with pytest.raises(ValueError):
+            device.set_file_format("xml")
+
+    def test_database_calls_are_logged_with_fields(self, tmp_path):
+        """Test that APIKeyDB calls log their operation, service and duration at DEBUG level."""
+        records = []
+        capture = logging.Handler()
+        capture.emit = records.append
+        log = apikeyper.database.log
+        level = log.level
+        log.addHandler(capture)
+        log.setLevel(logging.DEBUG)
+        try:
+            db = APIKeyDB(str(tmp_path / "keys.db"))
+            db.add_key("github", "default", "ghp_example", "2026-01-01", "active")
+            db.get_key("github")
+            db.close()
+        finally:
+            log.removeHandler(capture)
+            log.setLevel(level)
+
+        fields = [(record.op, record.service) for record in records]
+        assert fields == [("add_key", "github"), ("get_key", "github")]
+        assert all(record.duration_ms >= 0 for record in records)
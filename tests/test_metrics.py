@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+test_metrics.py
+---------------
+Tests for the APIKeyPER metrics registry.
+
+This module tests:
+- Counters and fixed-bucket histograms, across threads
+- The operation metrics of APIKeyDB, APIKeyPER, CryptDB and the decorators
+- apikeyper.stats() and the Prometheus text output
+"""
+
+import math
+import threading
+
+import pytest
+
+import apikeyper
+from apikeyper import APIKeyPER
+from apikeyper.crypt import CryptDB, EncryptionKey
+from apikeyper.telemetry.metrics import METRICS, MetricsRegistry
+from apikeyper.utils.decorators import apikey_required
+from apikeyper.utils.key_cache import clear_key_caches
+from apikeyper.utils.registry import REGISTRY
+
+
+@pytest.fixture
+def metrics():
+    """Record metrics, from zero, for the duration of a test."""
+    METRICS.reset()
+    METRICS.enable()
+    yield METRICS
+    METRICS.disable()
+    METRICS.reset()
+
+
+def operation_count(component, op):
+    """The number of recorded calls of an operation."""
+    return METRICS.operation(component, op).seconds.snapshot()["count"]
+
+
+class TestMetricTypes:
+    """Test class for counters and histograms."""
+
+    def test_counter_adds_up_threads(self):
+        """Test that increments from many threads are all counted."""
+        counter = MetricsRegistry().counter("test_total")
+
+        def work():
+            for _ in range(1000):
+                counter.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.value == 8000
+
+    def test_finished_threads_are_folded(self):
+        """Test that the shards of finished threads are folded into the totals instead of piling up."""
+        counter = MetricsRegistry().counter("test_total")
+        histogram = MetricsRegistry().histogram("test_seconds", buckets=(1.0,))
+
+        def work():
+            counter.inc(2)
+            histogram.observe(0.5)
+
+        for _ in range(200):
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+
+        assert len(counter._shards) <= 1 and len(histogram._shards) <= 1
+        assert counter.value == 400
+        assert histogram.snapshot()["buckets"] == {1.0: 200, math.inf: 200}
+
+        counter.reset()
+        assert counter.value == 0
+
+    def test_histogram_buckets(self):
+        """Test that observations land in cumulative buckets by upper bound."""
+        histogram = MetricsRegistry().histogram("test_seconds", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        assert snapshot["buckets"] == {0.1: 2, 1.0: 3, math.inf: 4}
+        assert snapshot["count"] == 4
+        assert snapshot["sum"] == pytest.approx(3.65)
+
+    def test_metrics_are_shared_by_name_and_labels(self):
+        """Test that asking for the same metric twice returns it, and kinds cannot be mixed."""
+        registry = MetricsRegistry()
+        assert registry.counter("calls_total", op="a") is registry.counter("calls_total", op="a")
+        assert registry.counter("calls_total", op="a") is not registry.counter("calls_total", op="b")
+        with pytest.raises(ValueError):
+            registry.histogram("calls_total")
+
+
+class TestInstrumentation:
+    """Test class for the operation metrics of the instrumented classes."""
+
+    def test_disabled_records_nothing(self, tmp_path):
+        """Test that nothing is recorded while metrics are off."""
+        METRICS.reset()
+        api = APIKeyPER(str(tmp_path / "keys.db"))
+        api.add_key("github", "ghp_example")
+        api.get_key("github")
+
+        assert operation_count("api", "get_key") == 0
+        assert operation_count("db", "get_key") == 0
+
+    def test_database_and_api_operations(self, tmp_path, metrics):
+        """Test that APIKeyPER calls are recorded along with the APIKeyDB calls they make."""
+        api = APIKeyPER(str(tmp_path / "keys.db"))
+        api.add_key("github", "ghp_example")
+        api.get_key("github")
+        api.get_key("github")
+        api.db.export_db_as_json(str(tmp_path / "export.json"))
+
+        assert operation_count("api", "add_key") == 1
+        assert operation_count("api", "get_key") == 2
+        assert operation_count("db", "get_key") == 2
+        assert operation_count("db", "export_db_as_json") == 1
+
+    def test_errors_are_counted(self, tmp_path, metrics):
+        """Test that operations that raise are counted as errors and still timed."""
+        api = APIKeyPER(str(tmp_path / "keys.db"))
+        api.db.close()
+        with pytest.raises(Exception):
+            api.get_key("github")
+
+        assert METRICS.operation("api", "get_key").errors.value == 1
+        assert operation_count("api", "get_key") == 1
+
+    def test_crypt_operations(self, tmp_path, metrics):
+        """Test that CryptDB encryption and saving are recorded."""
+        db = CryptDB(str(tmp_path / "store.db"), encryption_key=EncryptionKey("file", key_file=str(tmp_path / "key.pem")))
+        db.decrypt(db.encrypt("secret"))
+        db.data["github"] = "ghp_example"
+        db.save()
+
+        assert operation_count("crypt", "encrypt") == 1
+        assert operation_count("crypt", "decrypt") == 1
+        assert operation_count("crypt", "save") == 1
+
+    def test_decorator_resolution(self, tmp_path, metrics):
+        """Test that the key resolution of decorated calls is recorded."""
+        clear_key_caches()
+        db_path = tmp_path / "decorated.db"
+        APIKeyPER(str(db_path)).add_key("github", "ghp_example")
+
+        @apikey_required("github", db_path=db_path)
+        def call(api_keys=None):
+            return api_keys["github"]
+
+        try:
+            assert call() == call() == "ghp_example"
+        finally:
+            REGISTRY.clear()
+            clear_key_caches()
+        assert operation_count("decorator", "resolve") == 2
+
+
+class TestExposition:
+    """Test class for apikeyper.stats() and the Prometheus text output."""
+
+    def test_stats(self, tmp_path, metrics):
+        """Test that apikeyper.stats() reports the operation histograms."""
+        APIKeyPER(str(tmp_path / "keys.db")).list_services()
+
+        family = apikeyper.stats()["apikeyper_operation_seconds"]
+        assert family["type"] == "histogram"
+        sample = next(row for row in family["samples"] if row["labels"] == {"component": "api", "op": "list_services"})
+        assert sample["count"] == 1 and sample["buckets"][math.inf] == 1
+
+    def test_prometheus_text(self):
+        """Test the Prometheus text exposition format."""
+        registry = MetricsRegistry(enabled=True)
+        registry.counter("jobs_total", "Jobs run.", queue='a"b').inc(2)
+        registry.histogram("job_seconds", "Job latency.", buckets=(1.0,)).observe(0.5)
+
+        assert registry.render_prometheus().splitlines() == [
+            "# HELP job_seconds Job latency.",
+            "# TYPE job_seconds histogram",
+            'job_seconds_bucket{le="1.0"} 1',
+            'job_seconds_bucket{le="+Inf"} 1',
+            "job_seconds_sum 0.5",
+            "job_seconds_count 1",
+            "# HELP jobs_total Jobs run.",
+            "# TYPE jobs_total counter",
+            'jobs_total{queue="a\\"b"} 2',
+        ]
+
+    def test_prometheus_file(self, tmp_path):
+        """Test that the Prometheus file is written periodically and once more when stopped."""
+        registry = MetricsRegistry(enabled=True)
+        counter = registry.counter("ticks_total")
+        path = tmp_path / "apikeyper.prom"
+
+        registry.start_prometheus_file(path, interval=60)
+        counter.inc()
+        registry.stop_prometheus_file()
+
+        assert "ticks_total 1" in path.read_text().splitlines()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+test_package_checker.py
+-----------------------
+Tests for the APIKeyPER package checker.
+
+This module tests:
+- PEP 503 name normalization and exact name matching
+- Version specifiers
+- The cached index of installed distributions
+"""
+
+from importlib import metadata
+
+import pytest
+
+from apikeyper.utils import (
+    PackageChecker,
+    installed_distributions,
+    installed_version,
+    is_installed,
+    normalize_name,
+    parse_requirement,
+    refresh_installed_packages,
+)
+
+
+class FakeDistribution:
+    """A distribution with a name and a version, counting how often its version is read."""
+
+    def __init__(self, name, version):
+        self.metadata = {"Name": name}
+        self._version = version
+        self.version_reads = 0
+
+    @property
+    def version(self):
+        self.version_reads += 1
+        return self._version
+
+
+@pytest.fixture
+def installed(monkeypatch):
+    """Pretend that a few distributions are installed, and count the scans of the environment."""
+    distributions = [
+        FakeDistribution("PySimpleGUI", "4.60.5"),
+        FakeDistribution("zope.interface", "6.0"),
+        FakeDistribution("rich", "13.5.2"),
+        FakeDistribution("rich", "12.0.0"),
+        FakeDistribution("cryptography", "41.0.0rc1"),
+    ]
+    scans = []
+
+    def fake_distributions():
+        scans.append(1)
+        return iter(distributions)
+
+    monkeypatch.setattr(metadata, "distributions", fake_distributions)
+    refresh_installed_packages()
+    yield scans
+    refresh_installed_packages()
+
+
+class TestNames:
+    """Test class for package names and requirements."""
+
+    @pytest.mark.parametrize("name, normalized", [
+        ("PySimpleGUI", "pysimplegui"),
+        ("zope.interface", "zope-interface"),
+        ("Friendly__Bard", "friendly-bard"),
+        ("a-._b", "a-b"),
+    ])
+    def test_normalize_name(self, name, normalized):
+        """Test PEP 503 normalization."""
+        assert normalize_name(name) == normalized
+
+    def test_parse_requirement(self):
+        """Test that requirements are split into a normalized name and a specifier, ignoring extras."""
+        assert parse_requirement("Rich") == ("rich", "")
+        assert parse_requirement(" rich[jupyter] >=13, <14 ") == ("rich", ">=13, <14")
+        with pytest.raises(ValueError):
+            parse_requirement(">=1")
+
+
+class TestChecks:
+    """Test class for installation checks."""
+
+    def test_exact_names(self, installed):
+        """Test that names match exactly after normalization, and substrings do not match."""
+        status = PackageChecker(["gui", "pysimplegui", "ZOPE_interface", "rich", "numpy"]).check_installed_packages()
+        assert status == {"gui": False, "pysimplegui": True, "ZOPE_interface": True, "rich": True, "numpy": False}
+
+    def test_version_specifiers(self, installed):
+        """Test that specifiers are checked against the first distribution found, including pre-releases."""
+        assert installed_version("Rich") == "13.5.2"
+        assert is_installed("rich>=13,<14")
+        assert not is_installed("rich<13")
+        assert is_installed("cryptography>=40")
+        assert not is_installed("numpy>=1")
+        with pytest.raises(ValueError):
+            is_installed("rich>>13")
+        with pytest.raises(ValueError):
+            is_installed("numpy>>1")
+
+    def test_index_is_cached(self, installed):
+        """Test that the environment is scanned once, and versions are read once, until the index is refreshed."""
+        checker = PackageChecker(["rich>=13", "pysimplegui", "numpy"])
+        for _ in range(3):
+            checker.check_installed_packages()
+
+        assert len(installed) == 1
+        assert installed_version("Rich") == "13.5.2"
+        assert installed_distributions()["rich"].version_reads == 1
+
+        refresh_installed_packages()
+        checker.check_installed_packages()
+        assert len(installed) == 2
+
+    def test_real_environment(self):
+        """Test a check against the packages that are really installed."""
+        refresh_installed_packages()
+        assert PackageChecker(["pytest", "PyTest>=1", "pytes"]).check_installed_packages() == {
+            "pytest": True,
+            "PyTest>=1": True,
+            "pytes": False,
+        }
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+test_profiling.py
+-----------------
+Tests for the APIKeyPER profiling mode.
+
+This module tests:
+- Parsing the profiling modes
+- Profile sessions writing pstats, sample and allocation summaries
+- Profiling of APIKeyDB exports and CryptDB loads, limited to the first calls
+- The --profile flag of the command-line tools
+"""
+
+import pstats
+import runpy
+import time
+from pathlib import Path
+
+import pytest
+
+from apikeyper.crypt import CryptDB, EncryptionKey
+from apikeyper import database
+from apikeyper.crypt import backends
+from apikeyper.database import APIKeyDB
+from apikeyper.telemetry.profiling import DEFAULT_MODES, PROFILING, ProfileSession, parse_modes
+
+
+@pytest.fixture
+def profiling(tmp_path):
+    """Profile the instrumented operations into a temporary directory for the duration of a test."""
+    PROFILING.configure("cpu,memory", output_dir=tmp_path / "profiles", top=5)
+    yield PROFILING
+    PROFILING.configure()
+
+
+def written(directory, pattern="*"):
+    """The names of the files written to a profile directory."""
+    return sorted(path.name for path in directory.glob(pattern))
+
+
+class TestModes:
+    """Test class for the profiling settings."""
+
+    @pytest.mark.parametrize("value, modes", [
+        (None, ()),
+        ("", ()),
+        ("off", ()),
+        ("1", DEFAULT_MODES),
+        ("true", DEFAULT_MODES),
+        ("sample", ("sample",)),
+        (" CPU, memory,cpu ", ("cpu", "memory")),
+    ])
+    def test_parse_modes(self, value, modes):
+        """Test that settings are turned into modes, in order and without duplicates."""
+        assert parse_modes(value) == modes
+
+    def test_unknown_mode(self):
+        """Test that unknown modes are rejected."""
+        with pytest.raises(ValueError):
+            parse_modes("cpu,gpu")
+
+    def test_off_by_default(self):
+        """Test that profiling is off unless APIKEYPER_PROFILE is set."""
+        assert not PROFILING.enabled
+
+
+class TestSession:
+    """Test class for profile sessions."""
+
+    def test_all_modes(self, tmp_path):
+        """Test that a session writes a loadable pstats file and the text summaries."""
+        with ProfileSession("work", modes=("cpu", "sample", "memory"), output_dir=tmp_path, top=3) as session:
+            blocks = [bytearray(1024) for _ in range(200)]
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        suffixes = sorted("".join(path.suffixes) for path in session.paths)
+        assert suffixes == [".cpu.txt", ".memory.txt", ".pstats", ".samples.txt"]
+        assert all(path.parent == tmp_path and path.name.startswith("apikeyper-work-") for path in session.paths)
+
+        stats_path, = tmp_path.glob("*.pstats")
+        assert pstats.Stats(str(stats_path)).total_calls > 0
+        memory, = tmp_path.glob("*.memory.txt")
+        assert "Peak traced memory" in memory.read_text() and "test_profiling.py" in memory.read_text()
+        samples, = tmp_path.glob("*.samples.txt")
+        assert "test_all_modes" in samples.read_text()
+        assert len(blocks) == 200
+
+    def test_one_profile_at_a_time(self, tmp_path):
+        """Test that a session started while another one runs does not profile."""
+        with ProfileSession("outer", modes=("cpu",), output_dir=tmp_path) as outer:
+            with ProfileSession("inner", modes=("cpu",), output_dir=tmp_path) as inner:
+                pass
+
+        assert inner.paths == [] and len(outer.paths) == 2
+
+
+class TestInstrumentation:
+    """Test class for the profiled operations."""
+
+    def test_export_profiled_once(self, tmp_path, profiling):
+        """Test that only the first export is profiled by default."""
+        db = APIKeyDB(str(tmp_path / "keys.db"))
+        db.add_key("github", "default", "ghp_example", "2026-01-01", "active")
+        db.export_db_as_json(str(tmp_path / "first.json"))
+        db.export_db_as_json(str(tmp_path / "second.json"))
+        db.close()
+
+        profiles = tmp_path / "profiles"
+        assert len(written(profiles, "apikeyper-db.export_db_as_json-*.pstats")) == 1
+        assert len(written(profiles, "apikeyper-db.export_db_as_json-*.memory.txt")) == 1
+
+    def test_crypt_load(self, tmp_path, profiling):
+        """Test that CryptDB loads are profiled, up to the configured count."""
+        profiling.configure("cpu", output_dir=tmp_path / "profiles", count=2)
+        key = EncryptionKey("file", key_file=str(tmp_path / "key.pem"))
+        db = CryptDB(str(tmp_path / "store.db"), encryption_key=key)
+        db.data["github"] = "ghp_example"
+        db.save()
+        for _ in range(3):
+            CryptDB(str(tmp_path / "store.db"), encryption_key=key).load()
+
+        assert len(written(tmp_path / "profiles", "apikeyper-crypt.load-*.cpu.txt")) == 2
+
+
+class TestCommandLine:
+    """Test class for the --profile flag."""
+
+    def test_backend_benchmark(self, tmp_path, capsys):
+        """Test that --profile profiles the command and reports the files written."""
+        backends.main(["--benchmark", "file", "--rounds", "2", "--key-file", str(tmp_path / "key.pem"),
+                       "--profile", "--profile-dir", str(tmp_path / "cli"), "--profile-top", "3"])
+
+        names = written(tmp_path / "cli")
+        assert len(names) == 3 and all(name.startswith("apikeyper-backend-file-") for name in names)
+        assert capsys.readouterr().err.count("Profile written to") == 3
+
+    def test_main(self, tmp_path, monkeypatch, capsys):
+        """Test that the commands of main.py take --profile, and still do their work."""
+        monkeypatch.setattr(database, "DEFAULT_DB_FILEPATH", tmp_path / "keys.db")
+        main = runpy.run_path(str(Path(__file__).resolve().parents[1] / "main.py"))["main"]
+        main(["add", "github", "ghp_example", "--profile", "cpu", "--profile-dir", str(tmp_path / "cli")])
+
+        assert len(written(tmp_path / "cli", "apikeyper-add-*.pstats")) == 1
+        assert capsys.readouterr().err.count("Profile written to") == 2
+        assert APIKeyDB(str(tmp_path / "keys.db")).get_key("github")[3] == "ghp_example"
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+test_tracing.py
+---------------
+Tests for the APIKeyPER tracing hooks.
+
+This module tests:
+- The no-op default tracer
+- Spans of APIKeyDB queries, decorator key resolution, EncryptionKey loading and CryptDB load/save, recorded with an
+  in-memory exporter
+- The OpenTelemetry adapter, when OpenTelemetry is installed
+"""
+
+import asyncio
+
+import pytest
+
+from apikeyper import APIKeyPER
+from apikeyper.crypt import CryptDB, EncryptionKey
+from apikeyper.database import APIKeyDB
+from apikeyper.telemetry.tracing import (
+    NOOP_SPAN,
+    NOOP_TRACER,
+    TRACING,
+    InMemoryExporter,
+    RecordingTracer,
+    get_tracer,
+    set_tracer,
+    span,
+)
+from apikeyper.utils.decorators import apikey_required
+from apikeyper.utils.key_cache import clear_key_caches
+from apikeyper.utils.registry import REGISTRY
+
+
+@pytest.fixture
+def exporter():
+    """Record spans in memory for the duration of a test."""
+    exporter = InMemoryExporter()
+    previous = set_tracer(RecordingTracer(exporter))
+    yield exporter
+    set_tracer(previous)
+
+
+class TestHooks:
+    """Test class for the tracer hooks themselves."""
+
+    def test_noop_by_default(self):
+        """Test that no tracer is installed by default, and spans cost nothing."""
+        assert get_tracer() is NOOP_TRACER and not TRACING.enabled
+        with span("anything", {"key": "value"}) as current:
+            assert current is NOOP_SPAN
+
+    def test_nesting_and_timing(self, exporter):
+        """Test that spans nest, are timed in nanoseconds, and record exceptions."""
+        with pytest.raises(RuntimeError):
+            with span("outer") as outer:
+                with span("inner", {"step": 1}):
+                    pass
+                raise RuntimeError("boom")
+
+        inner, = exporter.find("inner")
+        assert inner.parent is outer and inner.attributes == {"step": 1}
+        assert isinstance(inner.duration_ns, int) and 0 <= inner.duration_ns <= outer.duration_ns
+        assert isinstance(outer.error, RuntimeError)
+
+    def test_set_tracer_returns_previous(self):
+        """Test that installing a tracer returns the one it replaces, and None restores the no-op tracer."""
+        tracer = RecordingTracer()
+        assert set_tracer(tracer) is NOOP_TRACER
+        assert TRACING.enabled
+        assert set_tracer(None) is tracer
+        assert not TRACING.enabled
+
+
+class TestInstrumentation:
+    """Test class for the spans APIKeyPER opens."""
+
+    def test_database_queries(self, tmp_path, exporter):
+        """Test that APIKeyDB queries are traced with their service and row count."""
+        db = APIKeyDB(str(tmp_path / "keys.db"))
+        db.add_key("github", "default", "ghp_example", "2026-01-01", "active")
+        db.get_key("github")
+        db.get_keys(["github", "openai"])
+        db.close()
+
+        added, = exporter.find("apikeyper.db.add_key")
+        fetched, = exporter.find("apikeyper.db.get_key")
+        batch, = exporter.find("apikeyper.db.get_keys")
+        assert added.attributes == {"service": "github", "row_count": 1}
+        assert fetched.attributes == {"service": "github", "row_count": 1}
+        assert batch.attributes == {"row_count": 1}
+
+    def test_decorator_resolution(self, tmp_path, exporter):
+        """Test that decorator key resolution is traced, with the database lookup as a child span."""
+        clear_key_caches()
+        db_path = tmp_path / "decorated.db"
+        APIKeyPER(str(db_path)).add_key("github", "ghp_example")
+        exporter.clear()
+
+        @apikey_required(["github"], db_path=db_path)
+        def call(api_keys=None):
+            return api_keys["github"]
+
+        try:
+            assert call() == "ghp_example"
+        finally:
+            REGISTRY.clear()
+            clear_key_caches()
+
+        resolution, = exporter.find("apikeyper.decorator.resolve")
+        assert resolution.attributes == {"services": "github", "service_count": 1}
+        assert any(query.parent is resolution for query in exporter.find("apikeyper.db.get_key"))
+
+    def test_async_decorator_resolution(self, monkeypatch, exporter):
+        """Test that async key resolution is traced too."""
+        monkeypatch.setenv("GITHUB_API_KEY", "ghp_from_env")
+
+        @apikey_required(["github"])
+        async def call(api_keys=None):
+            return api_keys["github"]
+
+        try:
+            assert asyncio.run(call()) == "ghp_from_env"
+        finally:
+            REGISTRY.clear()
+
+        assert len(exporter.find("apikeyper.decorator.aresolve")) == 1
+
+    def test_crypt_operations(self, tmp_path, exporter):
+        """Test that loading the encryption key and loading/saving a CryptDB are traced."""
+        key = EncryptionKey("file", key_file=str(tmp_path / "key.pem"))
+        db = CryptDB(str(tmp_path / "store.db"), encryption_key=key)
+        db.data["github"] = "ghp_example"
+        db.data["openai"] = "sk_example"
+        db.save()
+        CryptDB(str(tmp_path / "store.db"), encryption_key=key).load()
+
+        assert exporter.find("apikeyper.encryption_key.load")[0].attributes == {"storage_method": "file"}
+        saved, = exporter.find("apikeyper.crypt.save")
+        loaded = exporter.find("apikeyper.crypt.load")[-1]
+        assert saved.attributes["record_count"] == loaded.attributes["record_count"] == 2
+        assert loaded.attributes["file_path"] == str(tmp_path / "store.db")
+
+
+class TestOpenTelemetry:
+    """Test class for the OpenTelemetry adapter."""
+
+    def test_spans_reach_opentelemetry(self, tmp_path):
+        """Test that spans are handed to OpenTelemetry, with their attributes."""
+        pytest.importorskip("opentelemetry.sdk")
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+        from apikeyper.telemetry.tracing import OpenTelemetryTracer
+
+        otel_exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(otel_exporter))
+
+        previous = set_tracer(OpenTelemetryTracer(provider.get_tracer("test")))
+        try:
+            with span("outer"):
+                APIKeyDB(str(tmp_path / "keys.db")).list_services()
+        finally:
+            set_tracer(previous)
+
+        spans = {finished.name: finished for finished in otel_exporter.get_finished_spans()}
+        assert spans["apikeyper.db.list_services"].attributes["row_count"] == 0
+        assert spans["apikeyper.db.list_services"].parent.span_id == spans["outer"].context.span_id